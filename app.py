@@ -1,17 +1,31 @@
+import os
 import sys
 import fitz
-import pytesseract
-import pandas
-import json
-import docx
-from PIL import Image
+import bisect
+import hashlib
+import multiprocessing
+
+from ocr_core import (ParallelOCRBatch, EnginePool, run_page_ocr, native_page_data, available_engines, resolve_ocr_zoom, DEFAULT_ENGINE,
+                      DEFAULT_OCR_ZOOM, AUTO_ZOOM)
+from ocr_cache import OCRResultCache, default_cache_dir
+from exporters import export_pages, export_workers, ExportCanceled, EXPORT_FORMATS, EXPORT_FORMAT_NAMES
+from preprocessing import PREPROCESS_STEPS
+from perf_trace import TRACER, now
+from rendering import RenderedPageCache, PagePrefetcher, render_page_image, TILE_SIZE
+from page_words import PageWords, TextAlignment
+from text_index import TextIndex
+from library import OCRLibrary, default_library_path, LIBRARY_BATCH_PAGES
+from project_io import (OCRPageStore, PROJECT_EXTENSION, JOURNAL_SUFFIX, AutosaveJournal, journal_path_for, load_project_file,
+                        replay_journal, save_project_archive, save_json_project)
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QHBoxLayout,
                              QLabel, QSplitter, QAction, QFileDialog,
                              QVBoxLayout, QPushButton, QScrollArea, QTextEdit,
-                             QStackedWidget, QSpacerItem, QSizePolicy, QProgressBar, QMessageBox)
-from PyQt5.QtGui import QPixmap, QImage, QPainter, QColor, QTextCursor, QFont
-from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal, pyqtSlot, QRect, QEvent
+                             QStackedWidget, QSpacerItem, QSizePolicy, QProgressBar, QMessageBox,
+                             QInputDialog, QActionGroup, QLineEdit, QGraphicsView, QGraphicsScene, QGraphicsItem,
+                             QGraphicsPixmapItem, QGraphicsRectItem)
+from PyQt5.QtGui import QPixmap, QImage, QPainter, QColor, QTextCursor, QFont, QKeySequence, QPen, QBrush, QTransform
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal, pyqtSlot, QRect, QRectF, QSizeF, QEvent, QTimer
 
 # =====================================================================
 #  Dark Theme Stylesheet and Helper Function (Unchanged)
@@ -56,7 +70,7 @@ QPushButton:disabled {
     background-color: #444444;
     color: #888888;
 }
-QTextEdit, QScrollArea {
+QTextEdit, QScrollArea, QGraphicsView {
     background-color: #3c3c3c;
     border: 1px solid #555555;
     border-radius: 3px;
@@ -83,89 +97,93 @@ QProgressBar::chunk {
 }
 """
 
-def is_rtl_char(char):
-    return '\u0590' <= char <= '\u05FF'
-
 # =====================================================================
-#  OCR Workers (Single and Batch) - Unchanged
+#  OCR Workers (Single and Batch)
 # =====================================================================
 class OCRWorker(QObject):
     finished = pyqtSignal(dict)
     error = pyqtSignal(str)
-    def __init__(self, page_pixmap, zoom_factor):
+    def __init__(self, page_pixmap, zoom_factor, result_cache=None, engine_pool=None, preprocess=()):
         super().__init__()
         self.page_pixmap = page_pixmap
         self.zoom_factor = zoom_factor
+        self.result_cache = result_cache
+        self.engine_pool = engine_pool or EnginePool()
+        self.preprocess = tuple(preprocess)
     @pyqtSlot()
     def run(self):
         try:
-            pil_image = Image.frombytes("RGB", (self.page_pixmap.width, self.page_pixmap.height), self.page_pixmap.samples)
-            data = pytesseract.image_to_data(pil_image, lang='heb', output_type=pytesseract.Output.DATAFRAME, timeout=30)
-            data = data.dropna(subset=['text']); data = data[data.conf > 30]
-            full_text = ""; word_data = []; last_block, last_par, last_line = -1, -1, -1
-            for index, row in data.iterrows():
-                if last_block != -1:
-                    block, par, line = row['block_num'], row['par_num'], row['line_num']
-                    separator = " ";
-                    if block != last_block or par != last_par: separator = '\n\n'
-                    full_text += separator
-                    for _ in separator: word_data.append(None)
-                last_block, last_par, last_line = row['block_num'], row['par_num'], row['line_num']
-                word_text = str(row['text']); full_text += word_text
-                x, y, w, h = row['left'], row['top'], row['width'], row['height']
-                normalized_word_bbox = [c / self.zoom_factor for c in [x, y, x + w, y + h]]; char_bboxes = []
-                if len(word_text) > 0:
-                    char_width = w / len(word_text)
-                    for i, char in enumerate(word_text):
-                        char_x = x + (i * char_width); char_bboxes.append([c / self.zoom_factor for c in [char_x, y, char_x + char_width, y + h]])
-                if any(is_rtl_char(c) for c in word_text): char_bboxes.reverse()
-                for char_bbox in char_bboxes: word_data.append({'word_bbox': normalized_word_bbox, 'char_bbox': char_bbox})
-            self.finished.emit({'text': full_text, 'word_data': word_data})
+            with self.engine_pool.engine() as engine: page_data, info = run_page_ocr(self.page_pixmap, self.zoom_factor, self.result_cache, engine, self.preprocess)
+            TRACER.record_stages(info['stages'], os.getpid())
+            self.finished.emit({'text': page_data['edited_text'], 'word_data': page_data['word_data'], 'cache_hit': info['cache_hit'],
+                                'preprocess_seconds': info.get('preprocess_seconds'), 'ocr_zoom': self.zoom_factor, 'emitted_at': now()})
         except Exception as e: self.error.emit(f"An unexpected OCR error occurred: {e}")
 
 class OCRAllWorker(QObject):
     finished = pyqtSignal()
     error = pyqtSignal(str)
-    progress_updated = pyqtSignal(int, int, dict)
-    def __init__(self, pdf_data, ocr_zoom_level=2.0):
-        super().__init__(); self._is_canceled = False; self.pdf_data = pdf_data; self.ocr_zoom_level = ocr_zoom_level
+    progress_updated = pyqtSignal(int, int, int, dict, float)  # page_index, pages_done, total_pages, page_data, perf_trace.now() at emit
+    def __init__(self, pdf_path, ocr_zoom_level=DEFAULT_OCR_ZOOM, max_workers=None, cache_dir=None, engine=DEFAULT_ENGINE, use_text_layer=True,
+                 preprocess=(), library_path=None):
+        super().__init__(); self._is_canceled = False; self.pdf_path = pdf_path; self.ocr_zoom_level = ocr_zoom_level; self.library_path = library_path
+        self.max_workers = max_workers; self.cache_dir = cache_dir; self.engine = engine; self.use_text_layer = use_text_layer
+        self.preprocess = tuple(preprocess); self._batch = None; self.cache_hits = 0; self.cache_misses = 0; self.native_pages = 0; self.ocr_pages = 0
     @pyqtSlot()
     def run(self):
-        doc = fitz.open(stream=self.pdf_data, filetype="pdf")
-        total_pages = len(doc)
-        for i in range(total_pages):
-            if self._is_canceled: break
-            page = doc.load_page(i); mat = fitz.Matrix(self.ocr_zoom_level, self.ocr_zoom_level); pix = page.get_pixmap(matrix=mat)
-            try:
-                pil_image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
-                data = pytesseract.image_to_data(pil_image, lang='heb', output_type=pytesseract.Output.DATAFRAME, timeout=30)
-                data = data.dropna(subset=['text']); data = data[data.conf > 30]
-                full_text = ""; word_data = []; last_block, last_par, last_line = -1, -1, -1
-                for index, row in data.iterrows():
-                    if last_block != -1:
-                        block, par, line = row['block_num'], row['par_num'], row['line_num']
-                        separator = " ";
-                        if block != last_block or par != last_par: separator = '\n\n'
-                        full_text += separator
-                        for _ in separator: word_data.append(None)
-                    last_block, last_par, last_line = row['block_num'], row['par_num'], row['line_num']
-                    word_text = str(row['text']); full_text += word_text
-                    x, y, w, h = row['left'], row['top'], row['width'], row['height']
-                    normalized_word_bbox = [c / self.ocr_zoom_level for c in [x, y, x + w, y + h]]; char_bboxes = []
-                    if len(word_text) > 0:
-                        char_width = w / len(word_text)
-                        for i, char in enumerate(word_text):
-                            char_x = x + (i * char_width); char_bboxes.append([c / self.ocr_zoom_level for c in [char_x, y, char_x + char_width, y + h]])
-                    if any(is_rtl_char(c) for c in word_text): char_bboxes.reverse()
-                    for char_bbox in char_bboxes: word_data.append({'word_bbox': normalized_word_bbox, 'char_bbox': char_bbox})
-                page_data = {'word_data': word_data, 'edited_text': full_text}
-                self.progress_updated.emit(i + 1, total_pages, page_data)
-            except Exception as e:
-                self.error.emit(f"Error on page {i+1}: {e}"); break
-        doc.close()
+        library = None; document_id = None; pending = []
+        try:
+            with fitz.open(self.pdf_path) as doc: total_pages = len(doc)
+            page_numbers = range(total_pages)
+            if self.library_path:
+                # The connection is opened here because it belongs to this thread; stored pages and other runs' claims are skipped.
+                library = OCRLibrary(self.library_path); document_id = library.add_document(self.pdf_path)
+                page_numbers = library.claim_pages(document_id, page_numbers)
+            tasks = [(self.pdf_path, page_number) for page_number in page_numbers]
+            self._batch = ParallelOCRBatch(tasks, self.ocr_zoom_level, self.max_workers, cache_dir=self.cache_dir, engine=self.engine,
+                                           use_text_layer=self.use_text_layer, preprocess=self.preprocess)
+            if self._is_canceled: self._batch.cancel()
+            pages_done = total_pages - len(page_numbers)
+            for page_index, page_data, error, info in self._batch.results():
+                if error: self.error.emit(f"Error on page {page_index+1}: {error}"); break
+                pages_done += 1
+                if library:
+                    pending.append((str(page_index), page_data))
+                    if len(pending) >= LIBRARY_BATCH_PAGES: library.put_pages(document_id, pending); pending = []
+                self.progress_updated.emit(page_index, pages_done, total_pages, page_data, now())
+        except Exception as e:
+            self.error.emit(f"Batch OCR failed: {e}")
+        finally:
+            if library:
+                try: library.put_pages(document_id, pending); library.release_claims(document_id)
+                except Exception as e: self.error.emit(f"Could not store pages in the OCR library: {e}")
+                library.close()
+            if self._batch: self._batch.close(); self.cache_hits = self._batch.cache_hits; self.cache_misses = self._batch.cache_misses
+            if self._batch: self.native_pages = self._batch.native_pages; self.ocr_pages = self._batch.ocr_pages
         self.finished.emit()
+    def cancel(self):
+        self._is_canceled = True
+        if self._batch: self._batch.cancel()
+
+class ExportWorker(QObject):
+    finished = pyqtSignal(str)
+    error = pyqtSignal(str)
+    progress_updated = pyqtSignal(int, int)  # pages_done, total_pages
+    def __init__(self, store, targets, pdf_path=None, workers=1):
+        super().__init__(); self._is_canceled = False; self.store = store; self.targets = targets; self.pdf_path = pdf_path; self.workers = workers
+    @pyqtSlot()
+    def run(self):
+        message = ""; paths = ', '.join(path for _, path in self.targets)
+        try:
+            with TRACER.span('export', pages=len(self.store), formats=','.join(f for f, _ in self.targets)):
+                count = export_pages(self.store.iter_sorted(), self.targets, self.pdf_path, total=len(self.store), workers=self.workers,
+                                     progress=self.progress_updated.emit, is_canceled=lambda: self._is_canceled)
+            message = f"Exported {count} pages to {paths}"
+        except ExportCanceled: message = "Export canceled."
+        except Exception as e: self.error.emit(f"Export failed: {e}")
+        finally: self.store.clear()
+        self.finished.emit(message)
     def cancel(self): self._is_canceled = True
-        
+
 # =====================================================================
 #  InteractiveTextEdit (MODIFIED with final arrow key fix)
 # =====================================================================
@@ -176,7 +194,8 @@ class InteractiveTextEdit(QTextEdit):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setLineWrapMode(QTextEdit.WidgetWidth)
-        self.word_data = []
+        self.word_data = PageWords(); self.hover_position = -1; self.alignment = TextAlignment(); self._shadow_text = self.toPlainText()
+        self.document().contentsChange.connect(self.on_contents_change)
         self.cursorPositionChanged.connect(self.on_cursor_position_changed)
         self.textChanged.connect(self.on_text_changed)
 
@@ -202,7 +221,34 @@ class InteractiveTextEdit(QTextEdit):
             super().keyPressEvent(event)
 
 
-    def set_word_data(self, data): self.word_data = data
+    def set_word_data(self, data, alignment=None):
+        """Call after setText(): alignment maps the shown text onto data's OCR positions (identity if omitted or stale)."""
+        self.word_data = data; self._shadow_text = self.toPlainText()
+        self.alignment = alignment if alignment is not None and len(alignment) == len(self._shadow_text) else TextAlignment(len(data))
+        self.show_hover_position(-1, force=True)
+    def on_contents_change(self, position, chars_removed, chars_added):
+        # Qt reports format-only changes and sometimes a wider range than what really changed,
+        # so the reported window is trimmed to the actual edit against a shadow copy of the text.
+        old = self._shadow_text; new_length = self.document().characterCount() - 1
+        removed = max(0, min(chars_removed, len(old) - position)); added = max(0, min(chars_added, new_length - position))
+        cursor = QTextCursor(self.document()); cursor.setPosition(position); cursor.setPosition(position + added, QTextCursor.KeepAnchor)
+        inserted = cursor.selectedText().replace('\u2029', '\n'); deleted = old[position:position + removed]
+        prefix = 0; limit = min(removed, added)
+        while prefix < limit and inserted[prefix] == deleted[prefix]: prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and inserted[added - 1 - suffix] == deleted[removed - 1 - suffix]: suffix += 1
+        if removed - prefix - suffix or added - prefix - suffix:
+            self.alignment.apply_edit(position + prefix, removed - prefix - suffix, added - prefix - suffix)
+        self._shadow_text = old[:position] + inserted + old[position + removed:]
+    def show_hover_position(self, pos, force=False):
+        """Marks the character under the mouse on the page image without moving the cursor (-1 clears)."""
+        if pos == self.hover_position and not force: return
+        self.hover_position = pos; selections = []
+        if 0 <= pos < self.document().characterCount() - 1:
+            selection = QTextEdit.ExtraSelection(); selection.format.setBackground(QColor(0, 150, 255, 100))
+            selection.cursor = QTextCursor(self.document()); selection.cursor.setPosition(pos); selection.cursor.setPosition(pos + 1, QTextCursor.KeepAnchor)
+            selections.append(selection)
+        self.setExtraSelections(selections)
     @pyqtSlot()
     def on_cursor_position_changed(self): self.update_highlight()
     def on_text_changed(self): self.text_changed_by_user.emit()
@@ -211,37 +257,135 @@ class InteractiveTextEdit(QTextEdit):
         pos = cursor.position()
         if cursor.hasSelection():
             pos = cursor.selectionEnd() if cursor.position() == cursor.selectionEnd() else cursor.selectionStart()
-        if 0 <= pos < len(self.word_data):
-            data_item = self.word_data[pos]
-            if data_item: self.elements_hovered.emit(data_item['word_bbox'], data_item['char_bbox'])
-            else: self.elements_hovered.emit([], [])
+        boxes = self.word_data.boxes_at(self.alignment.to_original(pos))
+        if boxes: self.elements_hovered.emit(boxes[0], boxes[1])
         else: self.elements_hovered.emit([], [])
 
 # =====================================================================
-#  PdfViewerWidget and PdfScrollArea are UNCHANGED
+#  PageCanvas: the single-page view as a scene graph, in page points
 # =====================================================================
-class PdfViewerWidget(QLabel):
-    request_scroll = pyqtSignal(QRect)
+# Word box fills by Tesseract confidence: below 50, below 80, the rest. Text-layer words (confidence 100 or unknown) get no fill.
+CONFIDENCE_LEVELS = ((50, QColor(230, 40, 40, 80)), (80, QColor(240, 170, 0, 70)), (100, QColor(40, 180, 80, 50)))
+
+class WordBoxesItem(QGraphicsItem):
+    """
+    Every word box of the page as one scene item. paint() asks the page's spatial index
+    for the words inside the exposed rect only and draws them with one drawRects() call
+    per fill, so thousands of boxes cost no more than the part of the page repainted.
+    """
+    def __init__(self):
+        super().__init__(); self.word_data = PageWords(); self.page_rect = QRectF(); self.colour_by_confidence = False
+        self.pen = QPen(QColor(0, 120, 255, 150), 0)  # cosmetic: one pixel wide at any zoom
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+    def set_words(self, word_data, page_rect):
+        self.prepareGeometryChange(); self.word_data = word_data; self.page_rect = QRectF(page_rect); self.update()
+    def set_colour_by_confidence(self, enabled): self.colour_by_confidence = enabled; self.update()
+    def boundingRect(self): return self.page_rect
+    def fill_level(self, conf):
+        if not self.colour_by_confidence or not 0 <= conf < 100: return -1
+        return next(level for level, (limit, _) in enumerate(CONFIDENCE_LEVELS) if conf < limit)
+    def paint(self, painter, option, widget=None):
+        words = self.word_data; rect = option.exposedRect
+        if not words.word_count: return
+        boxes = words.boxes; conf = words.conf; fills = {}
+        for index in words.spatial_index().words_in(rect.left(), rect.top(), rect.right(), rect.bottom()):
+            x0, y0, x1, y1 = boxes[index * 4:index * 4 + 4]
+            fills.setdefault(self.fill_level(conf[index]), []).append(QRectF(x0, y0, x1 - x0, y1 - y0))
+        painter.setPen(self.pen)
+        for level, rects in fills.items():
+            painter.setBrush(CONFIDENCE_LEVELS[level][1] if level >= 0 else QBrush(Qt.NoBrush)); painter.drawRects(rects)
+
+class TiledPageItem(QGraphicsItem):
+    """High-zoom page: paints the exposed TILE_SIZE tiles from the cache and reports the missing ones through tiles_needed."""
+    def __init__(self, tiles_needed):
+        super().__init__(); self.tiles_needed = tiles_needed; self.source = None; self.page_rect = QRectF()
+        self.requests_paused = False; self._pending_tiles = set()
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+    def set_source(self, cache, page_number, zoom, page_rect):
+        self.prepareGeometryChange(); self.source = (cache, page_number, zoom); self.page_rect = QRectF(page_rect)
+        self.requests_paused = False; self._pending_tiles = set(); self.update()
+    def boundingRect(self): return self.page_rect
+    def tile_rect(self, col, row):
+        size = TILE_SIZE / self.source[2]; return QRectF(col * size, row * size, size, size) & self.page_rect
+    def tile_ready(self, col, row):
+        self._pending_tiles.discard((col, row)); self.update(self.tile_rect(col, row))
+    def paint(self, painter, option, widget=None):
+        if not self.source: return
+        cache, page_number, zoom = self.source; rect = option.exposedRect & self.page_rect; missing = []
+        if rect.isEmpty(): return
+        for row in range(int(rect.top() * zoom) // TILE_SIZE, int(rect.bottom() * zoom) // TILE_SIZE + 1):
+            for col in range(int(rect.left() * zoom) // TILE_SIZE, int(rect.right() * zoom) // TILE_SIZE + 1):
+                image = cache.get(page_number, zoom, (col, row)); target = self.tile_rect(col, row)
+                if image is not None: painter.drawImage(QRectF(target.topLeft(), QSizeF(image.width() / zoom, image.height() / zoom)), image); continue
+                painter.fillRect(target, Qt.white)
+                if not self.requests_paused and (col, row) not in self._pending_tiles: missing.append((col, row))
+        if missing: self._pending_tiles.update(missing); self.tiles_needed(missing)
+
+class PageCanvas(QGraphicsView):
+    """
+    The page on a QGraphicsScene whose units are page points, the same as word_data, so
+    zooming is only the view transform: a zoom step shows the current image scaled at
+    once, word boxes need no rescaling, and the highlights are two small rect items
+    whose moves repaint just their old and new spots (MinimalViewportUpdate).
+    """
+    zoom_requested = pyqtSignal(int)
+    tiles_needed = pyqtSignal(list)
+    page_point_hovered = pyqtSignal(float, float)  # page points; negative when the mouse leaves
+    page_point_clicked = pyqtSignal(float, float)
     def __init__(self, parent=None):
-        super().__init__(parent); self.current_pixmap = None; self.word_highlight_rect = None; self.char_highlight_rect = None
-    def set_pixmap(self, pixmap):
-        self.current_pixmap = pixmap; self.setPixmap(self.current_pixmap); self.word_highlight_rect = None; self.char_highlight_rect = None; self.update()
+        super().__init__(parent); self.setScene(QGraphicsScene(self)); self.scene().setItemIndexMethod(QGraphicsScene.NoIndex)
+        self.setViewportUpdateMode(QGraphicsView.MinimalViewportUpdate); self.setAlignment(Qt.AlignCenter); self.setMouseTracking(True)
+        self.tile_source = None; self.page_rect = QRectF()
+        self.pixmap_item = QGraphicsPixmapItem(); self.pixmap_item.setShapeMode(QGraphicsPixmapItem.BoundingRectShape)
+        self.tiled_item = TiledPageItem(self.tiles_needed.emit); self.boxes_item = WordBoxesItem(); self.boxes_item.setVisible(False)
+        self.word_highlight = QGraphicsRectItem(); self.word_highlight.setBrush(QColor(255, 255, 0, 80))
+        self.char_highlight = QGraphicsRectItem(); self.char_highlight.setBrush(QColor(0, 150, 255, 100))
+        for z, item in enumerate((self.pixmap_item, self.tiled_item, self.boxes_item, self.word_highlight, self.char_highlight)):
+            item.setZValue(z); self.scene().addItem(item)
+        for item in (self.word_highlight, self.char_highlight): item.setPen(QPen(Qt.NoPen)); item.hide()
+    def set_zoom(self, zoom): self.setTransform(QTransform.fromScale(zoom, zoom))
+    def set_page_rect(self, page_rect):
+        self.page_rect = QRectF(page_rect); self.scene().setSceneRect(self.page_rect); self.boxes_item.set_words(self.boxes_item.word_data, self.page_rect)
+        self.word_highlight.hide(); self.char_highlight.hide()
+    def set_page_image(self, image, zoom):
+        """A whole-page render at zoom; the item is scaled back to page points."""
+        self.tile_source = None; self.tiled_item.hide(); self.pixmap_item.setPixmap(QPixmap.fromImage(image)); self.pixmap_item.setScale(1 / zoom)
+        self.pixmap_item.show(); self.set_page_rect(QRectF(0, 0, image.width() / zoom, image.height() / zoom)); self.set_zoom(zoom)
+    def set_tiled_page(self, cache, page_number, zoom, page_rect):
+        """High-zoom mode: no full-page pixmap, only the TILE_SIZE tiles that get painted are fetched from cache."""
+        self.tile_source = (cache, page_number, zoom); self.pixmap_item.hide(); self.pixmap_item.setPixmap(QPixmap())
+        self.set_page_rect(page_rect); self.tiled_item.set_source(cache, page_number, zoom, self.page_rect); self.tiled_item.show(); self.set_zoom(zoom)
+    def preview_zoom(self, zoom):
+        """Shows what is already on screen at the new zoom until the sharp render replaces it; no tiles are asked for meanwhile."""
+        self.tiled_item.requests_paused = True; self.set_zoom(zoom)
+    def tile_ready(self, col, row): self.tiled_item.tile_ready(col, row)
+    def set_word_boxes(self, word_data): self.boxes_item.set_words(word_data, self.page_rect)
+    def set_show_word_boxes(self, enabled): self.boxes_item.setVisible(enabled)
+    def set_colour_by_confidence(self, enabled): self.boxes_item.set_colour_by_confidence(enabled)
     @pyqtSlot(list, list)
-    def highlight_elements(self, word_bbox, char_bbox):
-        if word_bbox: self.word_highlight_rect = QRect(int(word_bbox[0]), int(word_bbox[1]), int(word_bbox[2]-word_bbox[0]), int(word_bbox[3]-word_bbox[1]))
-        else: self.word_highlight_rect = None
-        if char_bbox:
-            self.char_highlight_rect = QRect(int(char_bbox[0]), int(char_bbox[1]), int(char_bbox[2]-char_bbox[0]), int(char_bbox[3]-char_bbox[1])); self.request_scroll.emit(self.char_highlight_rect)
-        else: self.char_highlight_rect = None
-        self.update()
-    def paintEvent(self, event):
-        super().paintEvent(event)
-        if not self.current_pixmap: return
-        painter = QPainter(self)
-        if self.word_highlight_rect:
-            painter.setBrush(QColor(255, 255, 0, 80)); painter.setPen(Qt.NoPen); painter.drawRect(self.word_highlight_rect)
-        if self.char_highlight_rect:
-            painter.setBrush(QColor(0, 150, 255, 100)); painter.setPen(Qt.NoPen); painter.drawRect(self.char_highlight_rect)
+    def highlight_elements(self, word_bbox, char_bbox, scroll=True):
+        """Boxes in page points; with scroll, the view only moves when the character gets near the edge."""
+        for item, box in ((self.word_highlight, word_bbox), (self.char_highlight, char_bbox)):
+            if box: item.setRect(QRectF(box[0], box[1], box[2] - box[0], box[3] - box[1])); item.show()
+            else: item.hide()
+        if char_bbox and scroll:
+            margin = self.viewport().height() / 4 / self.transform().m11()
+            self.ensureVisible(self.char_highlight.rect(), int(margin), int(margin))
+    def mouseMoveEvent(self, event):
+        point = self.mapToScene(event.pos()); self.page_point_hovered.emit(point.x(), point.y()); super().mouseMoveEvent(event)
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            point = self.mapToScene(event.pos())
+            if self.page_rect.contains(point): self.page_point_clicked.emit(point.x(), point.y())
+        super().mousePressEvent(event)
+    def leaveEvent(self, event):
+        self.page_point_hovered.emit(-1.0, -1.0); super().leaveEvent(event)
+    def wheelEvent(self, event):
+        if event.modifiers() == Qt.AltModifier:
+            if event.angleDelta().y() > 0: self.zoom_requested.emit(1)
+            else: self.zoom_requested.emit(-1)
+            event.accept()
+        else: super().wheelEvent(event)
 
 class PdfScrollArea(QScrollArea):
     zoom_requested = pyqtSignal(int)
@@ -252,19 +396,321 @@ class PdfScrollArea(QScrollArea):
             event.accept()
         else: super().wheelEvent(event)
 
+# =====================================================================
+#  Continuous scroll: every page in one column, only the visible ones live
+# =====================================================================
+PAGE_GAP = 12
+NO_OCR_TEXT = "Click 'Run OCR' to extract text from this page."
+
+class ContinuousPageView(QWidget):
+    """
+    All pages stacked in one tall widget. Slot sizes come from the page boxes, so the
+    scrollbar is right before anything is rendered; paintEvent only draws the pages the
+    viewport exposes, straight from RenderedPageCache, and asks for the ones it misses.
+    Until a page arrives its slot is a white placeholder (or the image at the previous
+    zoom, scaled), and the cache's byte budget bounds what is kept however long the PDF.
+    """
+    pages_needed = pyqtSignal(list)
+    page_point_hovered = pyqtSignal(int, float, float)  # page, page points; page -1 when the mouse leaves
+    page_point_clicked = pyqtSignal(int, float, float)
+    def __init__(self, cache, parent=None):
+        super().__init__(parent); self.cache = cache; self.page_sizes = []; self.tops = []; self.zoom = 1.0; self.previous_zoom = None
+        self.highlight_page = -1; self.word_highlight_box = None; self.char_highlight_box = None
+        self.requests_paused = False; self._requested = None
+        self.setMouseTracking(True)
+    def set_document(self, doc, zoom):
+        # Cropboxes are cheap to read for every page; a rotated page gets its real size once it is rendered (page_ready).
+        self.page_sizes = [(box.width, box.height) for box in (doc.page_cropbox(n) for n in range(len(doc)))]
+        self.zoom = zoom; self.previous_zoom = None; self.highlight_page = -1; self._requested = None; self.relayout()
+    def set_zoom(self, zoom):
+        self.previous_zoom = self.zoom; self.zoom = zoom; self._requested = None; self.relayout()
+    def relayout(self):
+        self.tops = []; y = PAGE_GAP; width = 0
+        for page_width, page_height in self.page_sizes:
+            self.tops.append(y); y += int(page_height * self.zoom) + PAGE_GAP; width = max(width, int(page_width * self.zoom))
+        self.setFixedSize(width + 2 * PAGE_GAP, y); self.update()
+    def page_rect(self, page_number):
+        page_width, page_height = self.page_sizes[page_number]; width = int(page_width * self.zoom)
+        return QRect((self.width() - width) // 2, self.tops[page_number], width, int(page_height * self.zoom))
+    def page_at(self, y):
+        return max(0, min(len(self.tops) - 1, bisect.bisect_right(self.tops, y) - 1))
+    def pages_in(self, rect):
+        if not self.tops: return range(0)
+        return range(self.page_at(rect.top()), self.page_at(rect.bottom()) + 1)
+    def page_ready(self, page_number, zoom):
+        """Repaints a page the prefetcher rendered; returns how much its slot grew if the image did not fit (rotated pages)."""
+        if zoom != self.zoom or not 0 <= page_number < len(self.page_sizes): return 0
+        self._requested = None; image = self.cache.get(page_number, zoom); rect = self.page_rect(page_number)
+        if image is not None and (abs(image.width() - rect.width()) > 1 or abs(image.height() - rect.height()) > 1):
+            self.page_sizes[page_number] = (image.width() / zoom, image.height() / zoom); self.relayout()
+            return image.height() - rect.height()
+        self.update(rect); return 0
+    def request_visible(self):
+        """Emits the pages in view whenever that set, or the part of it not rendered yet, changed."""
+        if self.requests_paused: return
+        visible = list(self.pages_in(self.visibleRegion().boundingRect()))
+        key = (tuple(visible), tuple(n for n in visible if (n, self.zoom) not in self.cache))
+        if key != self._requested and key[1]: self._requested = key; self.pages_needed.emit(visible)
+    def set_highlight(self, page_number, word_box, char_box):
+        """Boxes in page points; returns the rect to keep in view (None when nothing is highlighted)."""
+        if not word_box and not char_box and page_number != self.highlight_page: return None
+        if 0 <= self.highlight_page < len(self.tops): self.update(self.page_rect(self.highlight_page))
+        self.highlight_page = page_number; self.word_highlight_box = word_box or None; self.char_highlight_box = char_box or None
+        if not 0 <= page_number < len(self.tops): return None
+        self.update(self.page_rect(page_number)); box = self.char_highlight_box or self.word_highlight_box
+        return self.box_rect(page_number, box) if box else None
+    def box_rect(self, page_number, box):
+        origin = self.page_rect(page_number).topLeft(); z = self.zoom
+        return QRect(origin.x() + int(box[0] * z), origin.y() + int(box[1] * z), int((box[2] - box[0]) * z), int((box[3] - box[1]) * z))
+    def page_point(self, pos):
+        if self.tops:
+            page_number = self.page_at(pos.y()); rect = self.page_rect(page_number)
+            if rect.contains(pos): return page_number, (pos.x() - rect.x()) / self.zoom, (pos.y() - rect.y()) / self.zoom
+        return -1, -1.0, -1.0
+    def mouseMoveEvent(self, event):
+        self.page_point_hovered.emit(*self.page_point(event.pos())); super().mouseMoveEvent(event)
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            page_number, x, y = self.page_point(event.pos())
+            if page_number >= 0: self.page_point_clicked.emit(page_number, x, y)
+        super().mousePressEvent(event)
+    def leaveEvent(self, event):
+        self.page_point_hovered.emit(-1, -1.0, -1.0); super().leaveEvent(event)
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        for page_number in self.pages_in(event.rect()):
+            rect = self.page_rect(page_number); image = self.cache.get(page_number, self.zoom)
+            if image is None and self.previous_zoom: image = self.cache.get(page_number, self.previous_zoom)
+            if image is not None: painter.drawImage(rect, image)
+            else:
+                painter.fillRect(rect, Qt.white); painter.setPen(QColor(160, 160, 160)); painter.drawText(rect, Qt.AlignCenter, f"Page {page_number + 1}")
+            if page_number == self.highlight_page:
+                painter.setPen(Qt.NoPen)
+                if self.word_highlight_box: painter.setBrush(QColor(255, 255, 0, 80)); painter.drawRect(self.box_rect(page_number, self.word_highlight_box))
+                if self.char_highlight_box: painter.setBrush(QColor(0, 150, 255, 100)); painter.drawRect(self.box_rect(page_number, self.char_highlight_box))
+        painter.end(); self.request_visible()
+
+class ContinuousTextColumn(QWidget):
+    """The tall widget inside ContinuousTextView: page headers, and a placeholder where a page has no editor."""
+    def __init__(self, view):
+        super().__init__(); self.view = view
+    def paintEvent(self, event):
+        painter = QPainter(self); view = self.view; painter.setPen(QColor(160, 160, 160))
+        for page_number in view.pages_in(event.rect()):
+            top = view.tops[page_number]
+            painter.drawText(QRect(6, top, self.width() - 12, view.PAGE_HEADER), Qt.AlignLeft | Qt.AlignVCenter, f"Page {page_number + 1}")
+            if page_number not in view.editors:
+                painter.fillRect(QRect(0, top + view.PAGE_HEADER, self.width(), view.page_height(page_number)), QColor(60, 60, 60))
+
+class ContinuousTextView(QScrollArea):
+    """
+    The text of every page in one scrolling column. Only pages in or next to the viewport
+    get an InteractiveTextEdit, taken from a small pool and given back as they scroll out
+    (their edits are handed to store_page first); other pages are gaps of their last
+    measured height, or of the average so far until they have been shown. Heights that
+    change above the viewport are compensated, so the text being read does not jump.
+    """
+    PAGE_HEADER = 24; SPARE_EDITORS = 4; ESTIMATED_PAGE_HEIGHT = 600
+    elements_hovered = pyqtSignal(int, list, list)  # page, word box, char box
+    text_changed_by_user = pyqtSignal()
+    def __init__(self, load_page, store_page, parent=None):
+        """load_page(n) returns (text, word_data, alignment) or None; store_page(n, editor) keeps what was typed."""
+        super().__init__(parent); self.load_page = load_page; self.store_page = store_page
+        self.heights = []; self.tops = []; self.editors = {}; self.spare_editors = []; self.font_size = 14
+        self._measured_total = 0; self._measured_count = 0; self._binding = False; self._refreshing = False
+        self.column = ContinuousTextColumn(self); self.setWidget(self.column); self.setWidgetResizable(False)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff); self.verticalScrollBar().valueChanged.connect(self.refresh)
+    def set_page_count(self, count):
+        self.release_all(store=False); self.heights = [0] * count; self._measured_total = self._measured_count = 0; self.tops = []
+        self.relayout(); self.verticalScrollBar().setValue(0); self.refresh()
+    def page_height(self, page_number):
+        if self.heights[page_number]: return self.heights[page_number]
+        return self._measured_total // self._measured_count if self._measured_count else self.ESTIMATED_PAGE_HEIGHT
+    def set_height(self, page_number, height):
+        old = self.heights[page_number]
+        if old == height: return False
+        if old: self._measured_total -= old
+        else: self._measured_count += 1
+        self._measured_total += height; self.heights[page_number] = height; return True
+    def page_at(self, y):
+        return max(0, min(len(self.tops) - 1, bisect.bisect_right(self.tops, y) - 1))
+    def pages_in(self, rect):
+        if not self.tops: return range(0)
+        return range(self.page_at(rect.top()), self.page_at(rect.bottom()) + 1)
+    def is_page_visible(self, page_number):
+        top = self.verticalScrollBar().value(); return self.page_at(top) <= page_number <= self.page_at(top + self.viewport().height())
+    def relayout(self):
+        """Recomputes the slots, keeping the first visible page where it was on screen."""
+        bar = self.verticalScrollBar(); anchor = self.page_at(bar.value()) if self.tops else 0
+        offset = bar.value() - self.tops[anchor] if self.tops else 0
+        width = self.viewport().width(); self.tops = []; y = 0
+        for page_number in range(len(self.heights)): self.tops.append(y); y += self.PAGE_HEADER + self.page_height(page_number)
+        self.column.setFixedSize(width, max(y, 1))
+        for page_number, editor in self.editors.items(): editor.setGeometry(0, self.tops[page_number] + self.PAGE_HEADER, width, self.page_height(page_number))
+        if self.tops:
+            refreshing = self._refreshing; self._refreshing = True
+            try: bar.setValue(self.tops[anchor] + offset)
+            finally: self._refreshing = refreshing
+        self.column.update()
+    def refresh(self):
+        """Binds editors to the pages in or next to the viewport and releases the rest."""
+        if self._refreshing or not self.heights: return
+        self._refreshing = True
+        try:
+            # Measured heights can differ from the estimates, so repeat until the set of pages in view settles.
+            for _ in range(4):
+                top = self.verticalScrollBar().value(); first = max(0, self.page_at(top) - 1)
+                last = min(len(self.heights) - 1, self.page_at(top + self.viewport().height()) + 1)
+                for page_number in [n for n in self.editors if not first <= n <= last]: self.release(page_number)
+                new_pages = [n for n in range(first, last + 1) if n not in self.editors]
+                if not new_pages: break
+                for page_number in new_pages: self.bind(page_number)
+                self.relayout()
+        finally: self._refreshing = False
+    def new_editor(self):
+        editor = InteractiveTextEdit(self.column); editor.page_number = -1
+        editor.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff); editor.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        editor.elements_hovered.connect(lambda word_box, char_box, editor=editor: self._binding or self.elements_hovered.emit(editor.page_number, word_box, char_box))
+        editor.text_changed_by_user.connect(lambda: self._binding or self.text_changed_by_user.emit())
+        editor.cursorPositionChanged.connect(lambda editor=editor: not self._binding and editor.hasFocus() and self.ensure_cursor_visible(editor))
+        editor.document().documentLayout().documentSizeChanged.connect(lambda size, editor=editor: self.fit_editor(editor))
+        editor.viewport().installEventFilter(self)
+        return editor
+    def eventFilter(self, watched, event):
+        # Page editors never scroll themselves, so plain wheel turns scroll the column (Ctrl+wheel still zooms the text).
+        if event.type() == QEvent.Wheel and event.modifiers() != Qt.ControlModifier and isinstance(watched.parent(), InteractiveTextEdit):
+            QApplication.sendEvent(self.verticalScrollBar(), event); return True
+        return super().eventFilter(watched, event)
+    def bind(self, page_number):
+        editor = self.spare_editors.pop() if self.spare_editors else self.new_editor()
+        self.editors[page_number] = editor; editor.page_number = page_number; self.load_editor(editor)
+        editor.setGeometry(0, 0, self.viewport().width(), self.page_height(page_number)); editor.document().setTextWidth(self.viewport().width() - 2 * editor.frameWidth())
+        self.set_height(page_number, self.editor_height(editor)); editor.show()
+    def load_editor(self, editor):
+        page = self.load_page(editor.page_number); self._binding = True
+        try:
+            editor.setFontPointSize(self.font_size)
+            if page: editor.setText(page[0]); editor.set_word_data(page[1], page[2])
+            else: editor.setText(NO_OCR_TEXT); editor.set_word_data(PageWords())
+            editor.setReadOnly(page is None)
+        finally: self._binding = False
+    def editor_height(self, editor): return int(editor.document().size().height()) + 2 * editor.frameWidth() + 2
+    def fit_editor(self, editor):
+        if self._binding or self.editors.get(editor.page_number) is not editor: return
+        if self.set_height(editor.page_number, self.editor_height(editor)): self.relayout()
+    def release(self, page_number, store=True):
+        editor = self.editors.pop(page_number)
+        if store: self.store_page(page_number, editor)
+        editor.hide(); editor.page_number = -1
+        if len(self.spare_editors) < self.SPARE_EDITORS: self.spare_editors.append(editor)
+        else: editor.deleteLater()
+    def release_all(self, store=True):
+        for page_number in list(self.editors): self.release(page_number, store)
+    def commit_all(self):
+        for page_number, editor in self.editors.items(): self.store_page(page_number, editor)
+    def reload_page(self, page_number):
+        """Shows new page data (an OCR result) in the page's editor, if it has one; what was in it is dropped."""
+        editor = self.editors.get(page_number)
+        if editor is None: return
+        self.load_editor(editor)
+        if self.set_height(page_number, self.editor_height(editor)): self.relayout()
+    def scroll_to_page(self, page_number):
+        if not 0 <= page_number < len(self.tops): return None
+        self.verticalScrollBar().setValue(self.tops[page_number]); self.refresh()
+        return self.editors.get(page_number)
+    def ensure_cursor_visible(self, editor):
+        point = editor.viewport().mapTo(self.column, editor.cursorRect().center())
+        self.ensureVisible(point.x(), point.y(), 20, self.viewport().height() // 4)
+    def set_font_size(self, size):
+        self.font_size = size
+        for editor in self.editors.values(): editor.setFontPointSize(size)
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if not self.heights: return
+        for page_number, editor in self.editors.items():
+            editor.document().setTextWidth(self.viewport().width() - 2 * editor.frameWidth()); self.set_height(page_number, self.editor_height(editor))
+        self.relayout(); self.refresh()
+
 # =====================================================================
 #  Main Application Window (MODIFIED for final bug fixes)
 # =====================================================================
+LIVE_TIMING_STAGES = ('page_image', 'render', 'preprocess', 'tesseract', 'word_data', 'result_queue', 'signal', 'set_text', 'search')
+
 class MainWindow(QMainWindow):
+    prefetch_requested = pyqtSignal(list, float, int)
+    tiles_requested = pyqtSignal(int, float, list, int)
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Interactive Local PDF OCR Tool"); self.setGeometry(100, 100, 1200, 800)
         self.doc = None; self.current_pdf_path = None; self.current_page_number = 0
-        self.zoom_factor = 2.0; self.font_size = 14; self.ocr_data_cache = {}; self.is_dirty = False
+        self.zoom_factor = 2.0; self.font_size = 14; self.ocr_data_cache = OCRPageStore(); self.is_dirty = False
+        self.project_path = None
         self.ocr_thread = None; self.ocr_worker = None; self.ocr_all_thread = None; self.ocr_all_worker = None
+        self.export_thread = None; self.export_worker = None
+        self.ocr_worker_count = os.cpu_count() or 1
+        try: self.ocr_result_cache = OCRResultCache()
+        except OSError as e: self.ocr_result_cache = None; print(f"OCR result cache disabled: {e}")
+        self.use_ocr_result_cache = self.ocr_result_cache is not None
+        self.ocr_engine = DEFAULT_ENGINE; self.ocr_engine_pool = EnginePool(self.ocr_engine); self.use_text_layer = True
+        self.ocr_preprocess = set(); self.ocr_zoom_level = DEFAULT_OCR_ZOOM
+        self.page_render_cache = RenderedPageCache(); self.prefetch_radius = 2; self.prefetch_thread = None; self.prefetcher = None
+        self.use_tiled_rendering = True; self.tile_zoom_threshold = 3.0
+        self.displayed_zoom = None; self.pending_zoom_render = None
+        self.zoom_settle_timer = QTimer(self); self.zoom_settle_timer.setSingleShot(True); self.zoom_settle_timer.setInterval(200)
+        self.zoom_settle_timer.timeout.connect(self.finish_zoom)
+        self.syncing_from_image = False; self.continuous_mode = False; self.ocr_page_number = 0
+        self.journal = None; self.autosave_timer = QTimer(self); self.autosave_timer.setSingleShot(True); self.autosave_timer.setInterval(1000)
+        self.autosave_timer.timeout.connect(self.journal_current_text)
+        self.text_index = TextIndex(); self.search_query = None; self.search_hits = []; self.search_hit_index = -1
+        self.use_library = False; self.library = None; self.library_document_id = None
+        self.timing_timer = QTimer(self); self.timing_timer.setInterval(500); self.timing_timer.timeout.connect(self.update_timing_label)
         self.setup_ui(); self.setup_menu()
 
-    def set_dirty_flag(self): self.is_dirty = True
+    def set_dirty_flag(self): self.is_dirty = True; self.autosave_timer.start()
+
+    # --- autosave journal ---------------------------------------------
+    def session_journal_path(self, pdf_path):
+        # Work on a PDF that has no project file yet is journaled under the cache dir, keyed by the PDF path.
+        digest = hashlib.sha1(os.path.abspath(pdf_path).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(os.path.dirname(default_cache_dir()), 'autosave', digest + JOURNAL_SUFFIX)
+    def open_journal(self, path, replay=False):
+        """Starts autosaving to path; with replay, first applies what a crashed session left there. Returns the records replayed."""
+        self.close_journal(); recovered = 0
+        if replay and os.path.exists(path):
+            try: recovered = replay_journal(path, self.ocr_data_cache)
+            except Exception as e: print(f"Could not replay autosave journal {path}: {e}")
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True); self.journal = AutosaveJournal(path, truncate=not replay)
+        except OSError as e: self.journal = None; print(f"Autosave disabled: {e}")
+        return recovered
+    def close_journal(self, discard=False):
+        self.autosave_timer.stop()
+        if not self.journal: return
+        if discard: self.journal.discard()
+        else: self.journal.close()
+        self.journal = None
+    def journal_current_text(self):
+        """Stores the editor text of the current page (of every page with an editor in continuous mode) and journals what changed."""
+        self.autosave_timer.stop()
+        if self.continuous_mode: self.continuous_text.commit_all()
+        else: self.store_editor_text(self.current_page_number, self.text_editor)
+    def store_editor_text(self, page_number, editor):
+        page_key = str(page_number)
+        if page_key not in self.ocr_data_cache: return
+        text = editor.toPlainText()
+        if text == self.ocr_data_cache.peek(page_key)['edited_text']: return
+        page_data = self.ocr_data_cache[page_key]; alignment = editor.alignment
+        page_data['edited_text'] = text
+        if alignment.is_identity(len(page_data['word_data'])): page_data.pop('alignment', None)
+        else: page_data['alignment'] = alignment.to_json()
+        self.page_text_changed(page_key)
+        if self.journal: self.journal.record_text(page_key, text); self.journal.record_meta(page_key, {'alignment': page_data.get('alignment')})
+    def start_session_journal(self, pdf_path):
+        path = self.session_journal_path(pdf_path); replay = False
+        if os.path.exists(path) and os.path.getsize(path):
+            replay = QMessageBox.question(self, "Recover Unsaved Work", "This PDF has unsaved OCR results or edits from an earlier session. Recover them?",
+                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes) == QMessageBox.Yes
+        return self.open_journal(path, replay)
 
     def setup_ui(self):
         self.central_widget = QWidget(); self.setCentralWidget(self.central_widget)
@@ -276,9 +722,11 @@ class MainWindow(QMainWindow):
         load_project_button = QPushButton("Load Existing Project"); load_project_button.setObjectName("WelcomeButton"); load_project_button.clicked.connect(self.load_project)
         welcome_layout.addWidget(title_label); welcome_layout.addSpacing(20); welcome_layout.addWidget(open_pdf_button); welcome_layout.addWidget(load_project_button)
         pdf_viewer_container = QWidget(); pdf_viewer_layout = QVBoxLayout(pdf_viewer_container); pdf_viewer_layout.setContentsMargins(0, 0, 0, 0)
-        self.pdf_viewer = PdfViewerWidget(); self.pdf_viewer.setAlignment(Qt.AlignCenter)
-        self.scroll_area = PdfScrollArea(); self.scroll_area.setWidgetResizable(True); self.scroll_area.setWidget(self.pdf_viewer)
-        pdf_viewer_layout.addWidget(self.scroll_area)
+        self.pdf_viewer = PageCanvas()
+        self.continuous_view = ContinuousPageView(self.page_render_cache)
+        self.continuous_scroll_area = PdfScrollArea(); self.continuous_scroll_area.setAlignment(Qt.AlignHCenter); self.continuous_scroll_area.setWidget(self.continuous_view)
+        self.page_view_stack = QStackedWidget(); self.page_view_stack.addWidget(self.pdf_viewer); self.page_view_stack.addWidget(self.continuous_scroll_area)
+        pdf_viewer_layout.addWidget(self.page_view_stack)
         controls_layout = QHBoxLayout()
         zoom_out_button = QPushButton("-"); zoom_out_button.clicked.connect(self.zoom_out); controls_layout.addWidget(zoom_out_button)
         zoom_in_button = QPushButton("+"); zoom_in_button.clicked.connect(self.zoom_in); controls_layout.addWidget(zoom_in_button)
@@ -292,15 +740,28 @@ class MainWindow(QMainWindow):
         text_pane_container = QWidget(); text_pane_layout = QVBoxLayout(text_pane_container); text_pane_layout.setContentsMargins(0,0,0,0)
         self.text_editor = InteractiveTextEdit("Open a PDF or load a project to begin."); self.text_editor.setFontPointSize(self.font_size)
         self.text_editor.text_changed_by_user.connect(self.set_dirty_flag)
-        text_pane_layout.addWidget(self.text_editor)
+        search_layout = QHBoxLayout()
+        self.search_field = QLineEdit(); self.search_field.setPlaceholderText('Search all pages: words, prefix*, "a phrase"'); search_layout.addWidget(self.search_field)
+        search_previous_button = QPushButton("Previous"); search_previous_button.clicked.connect(self.find_previous); search_layout.addWidget(search_previous_button)
+        search_next_button = QPushButton("Next"); search_next_button.clicked.connect(self.find_next); search_layout.addWidget(search_next_button)
+        self.search_status_label = QLabel(""); search_layout.addWidget(self.search_status_label)
+        self.search_field.returnPressed.connect(self.find_next)
+        text_pane_layout.addLayout(search_layout)
+        self.continuous_text = ContinuousTextView(self.continuous_page_text, self.store_editor_text); self.continuous_text.font_size = self.font_size
+        self.continuous_text.text_changed_by_user.connect(self.set_dirty_flag)
+        self.text_stack = QStackedWidget(); self.text_stack.addWidget(self.text_editor); self.text_stack.addWidget(self.continuous_text)
+        text_pane_layout.addWidget(self.text_stack)
         ocr_controls_layout = QHBoxLayout()
         self.run_ocr_button = QPushButton("Run OCR on Current Page"); ocr_controls_layout.addWidget(self.run_ocr_button)
         self.run_ocr_all_button = QPushButton("Run OCR on All Pages"); ocr_controls_layout.addWidget(self.run_ocr_all_button)
         self.export_to_word_button = QPushButton("Export to Word"); ocr_controls_layout.addWidget(self.export_to_word_button)
         self.cancel_ocr_all_button = QPushButton("Cancel"); ocr_controls_layout.addWidget(self.cancel_ocr_all_button); self.cancel_ocr_all_button.hide()
+        self.cancel_export_button = QPushButton("Cancel Export"); ocr_controls_layout.addWidget(self.cancel_export_button); self.cancel_export_button.hide()
         text_pane_layout.addLayout(ocr_controls_layout)
         self.ocr_status_label = QLabel(""); self.ocr_status_label.setAlignment(Qt.AlignCenter); text_pane_layout.addWidget(self.ocr_status_label)
         self.ocr_progress_bar = QProgressBar(); text_pane_layout.addWidget(self.ocr_progress_bar); self.ocr_progress_bar.hide()
+        self.export_progress_bar = QProgressBar(); self.export_progress_bar.setFormat("Export %p%"); text_pane_layout.addWidget(self.export_progress_bar); self.export_progress_bar.hide()
+        self.timing_label = QLabel(""); self.timing_label.setAlignment(Qt.AlignCenter); text_pane_layout.addWidget(self.timing_label); self.timing_label.hide()
         font_controls_layout = QHBoxLayout(); font_controls_layout.addItem(QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum))
         font_decrease_button = QPushButton("A-"); font_decrease_button.clicked.connect(self.decrease_font_size); font_controls_layout.addWidget(font_decrease_button)
         font_increase_button = QPushButton("A+"); font_increase_button.clicked.connect(self.increase_font_size); font_controls_layout.addWidget(font_increase_button)
@@ -309,14 +770,21 @@ class MainWindow(QMainWindow):
         self.run_ocr_button.clicked.connect(self.start_ocr_process)
         self.run_ocr_all_button.clicked.connect(self.start_ocr_all_process)
         self.export_to_word_button.clicked.connect(self.export_to_word)
-        self.cancel_ocr_all_button.clicked.connect(self.cancel_ocr_all)
+        self.cancel_ocr_all_button.clicked.connect(self.cancel_ocr_all); self.cancel_export_button.clicked.connect(self.cancel_export)
         self.splitter.addWidget(self.pdf_stack); self.splitter.addWidget(text_pane_container); self.splitter.setSizes([700, 500])
         self.text_editor.elements_hovered.connect(self.handle_highlight_request)
-        self.pdf_viewer.request_scroll.connect(self.auto_scroll_pdf_view)
-        self.scroll_area.zoom_requested.connect(self.handle_scroll_zoom)
+        self.pdf_viewer.tiles_needed.connect(self.request_tiles)
+        self.pdf_viewer.page_point_hovered.connect(self.handle_image_hover); self.pdf_viewer.page_point_clicked.connect(self.handle_image_click)
+        self.pdf_viewer.zoom_requested.connect(self.handle_scroll_zoom)
+        self.continuous_text.elements_hovered.connect(self.handle_continuous_highlight)
+        self.continuous_view.pages_needed.connect(self.request_continuous_pages)
+        self.continuous_view.page_point_hovered.connect(self.handle_continuous_hover); self.continuous_view.page_point_clicked.connect(self.handle_continuous_click)
+        self.continuous_scroll_area.zoom_requested.connect(self.handle_scroll_zoom)
+        self.continuous_scroll_area.verticalScrollBar().valueChanged.connect(self.handle_continuous_scroll)
         self.update_navigation_controls()
     
     def closeEvent(self, event):
+        discard_journal = not self.is_dirty
         if self.is_dirty:
             reply = QMessageBox.question(self, 'Unsaved Changes',
                                            "You have unsaved changes. Do you want to save them before exiting?",
@@ -326,11 +794,15 @@ class MainWindow(QMainWindow):
                 self.save_project()
                 event.accept()
             elif reply == QMessageBox.Discard:
-                event.accept()
+                discard_journal = True; event.accept()
             else:
                 event.ignore()
         else:
             event.accept()
+        if event.isAccepted():
+            self.stop_prefetcher(); self.ocr_engine_pool.close(); self.close_journal(discard=discard_journal or not self.is_dirty)
+            if self.export_worker: self.export_worker.cancel(); self.export_thread.quit(); self.export_thread.wait()
+            if self.library: self.ocr_data_cache.clear(); self.library.close(); self.library = None
 
     def keyPressEvent(self, event):
         if event.modifiers() == Qt.ControlModifier:
@@ -345,9 +817,22 @@ class MainWindow(QMainWindow):
 
     @pyqtSlot(list, list)
     def handle_highlight_request(self, normalized_word_bbox, normalized_char_bbox):
-        scaled_word_bbox = [c * self.zoom_factor for c in normalized_word_bbox] if normalized_word_bbox else []
-        scaled_char_bbox = [c * self.zoom_factor for c in normalized_char_bbox] if normalized_char_bbox else []
-        self.pdf_viewer.highlight_elements(scaled_word_bbox, scaled_char_bbox)
+        # A click on the image already shows the spot; only cursor moves in the text scroll the page.
+        self.pdf_viewer.highlight_elements(normalized_word_bbox, normalized_char_bbox, scroll=not self.syncing_from_image)
+
+    def text_position_at(self, x, y, editor=None):
+        """Maps a point on the page (in page points) to a text position through the page's spatial index."""
+        if x < 0 or y < 0: return -1
+        editor = editor or self.text_editor; original_pos = editor.word_data.position_at(x, y)
+        return editor.alignment.to_edited(original_pos) if original_pos >= 0 else -1
+    def handle_image_hover(self, x, y): self.text_editor.show_hover_position(self.text_position_at(x, y))
+    def handle_image_click(self, x, y):
+        pos = self.text_position_at(x, y)
+        if pos < 0: return
+        cursor = self.text_editor.textCursor(); cursor.setPosition(pos)
+        self.syncing_from_image = True
+        try: self.text_editor.setTextCursor(cursor); self.text_editor.ensureCursorVisible()
+        finally: self.syncing_from_image = False
 
     def zoom_in(self):
         if not self.doc: return
@@ -356,14 +841,38 @@ class MainWindow(QMainWindow):
         if not self.doc: return
         self.perform_zoom(-0.2)
     def perform_zoom(self, delta):
-        saved_cursor_pos = self.text_editor.textCursor().position(); saved_scroll_val = self.text_editor.verticalScrollBar().value()
-        self.zoom_factor = max(0.2, self.zoom_factor + delta); print(f"Zoom changed. New factor: {self.zoom_factor:.1f}")
-        self.display_page(self.current_page_number)
-        cursor = self.text_editor.textCursor(); cursor.setPosition(saved_cursor_pos); self.text_editor.setTextCursor(cursor)
-        self.text_editor.verticalScrollBar().setValue(saved_scroll_val)
+        # Instant feedback: rescale what is on screen now, re-render sharply once the wheel/keys go idle.
+        self.zoom_factor = max(0.2, round(self.zoom_factor + delta, 2)); print(f"Zoom changed. New factor: {self.zoom_factor:.1f}")
+        if self.prefetcher: self.prefetcher.generation += 1; self.prefetcher.tile_generation += 1
+        self.pending_zoom_render = None
+        if self.continuous_mode: self.rescale_continuous_view(); self.zoom_settle_timer.start(); return
+        if self.displayed_zoom: self.pdf_viewer.preview_zoom(self.zoom_factor)
+        self.text_editor.update_highlight()
+        self.zoom_settle_timer.start()
+
+    def finish_zoom(self):
+        page_number, zoom = self.current_page_number, self.zoom_factor
+        if not self.doc: return
+        if self.continuous_mode: self.continuous_view.requests_paused = False; self.continuous_view.request_visible(); return
+        if self.is_tiled_zoom(zoom) or not self.prefetcher or (page_number, zoom) in self.page_render_cache:
+            self.show_page_image(page_number); self.text_editor.update_highlight(); self.schedule_prefetch(page_number)
+        else:
+            self.pending_zoom_render = (page_number, zoom); self.prefetcher.generation += 1
+            self.prefetch_requested.emit([page_number], zoom, self.prefetcher.generation)
+
+    @pyqtSlot(int, float)
+    def handle_page_rendered(self, page_number, zoom):
+        if self.continuous_mode:
+            grown = self.continuous_view.page_ready(page_number, zoom); bar = self.continuous_scroll_area.verticalScrollBar()
+            if grown and self.continuous_view.tops[page_number] < bar.value(): bar.setValue(bar.value() + grown)
+            return
+        if self.pending_zoom_render != (page_number, zoom) or (self.current_page_number, self.zoom_factor) != (page_number, zoom): return
+        self.pending_zoom_render = None
+        self.show_page_image(page_number); self.text_editor.update_highlight(); self.schedule_prefetch(page_number)
     
-    def increase_font_size(self): self.font_size += 1; self.text_editor.setFontPointSize(self.font_size)
-    def decrease_font_size(self): self.font_size = max(8, self.font_size - 1); self.text_editor.setFontPointSize(self.font_size)
+    def increase_font_size(self): self.font_size += 1; self.text_editor.setFontPointSize(self.font_size); self.continuous_text.set_font_size(self.font_size)
+    def decrease_font_size(self):
+        self.font_size = max(8, self.font_size - 1); self.text_editor.setFontPointSize(self.font_size); self.continuous_text.set_font_size(self.font_size)
 
     def toggle_layout(self):
         if self.splitter.orientation() == Qt.Horizontal:
@@ -371,30 +880,220 @@ class MainWindow(QMainWindow):
         else:
             self.splitter.setOrientation(Qt.Horizontal)
 
-    @pyqtSlot(QRect)
-    def auto_scroll_pdf_view(self, rect):
-        viewport_rect = self.scroll_area.viewport().rect(); viewport_center = viewport_rect.center()
-        new_x = rect.center().x() - viewport_center.x(); new_y = rect.center().y() - viewport_center.y()
-        self.scroll_area.horizontalScrollBar().setValue(new_x); self.scroll_area.verticalScrollBar().setValue(new_y)
-
     def display_page(self, page_number):
         if not self.doc or not (0 <= page_number < len(self.doc)): return
-        self.current_page_number = page_number; page = self.doc.load_page(page_number)
-        mat = fitz.Matrix(self.zoom_factor, self.zoom_factor); pix = page.get_pixmap(matrix=mat)
-        q_image = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888); q_pixmap = QPixmap.fromImage(q_image)
-        self.pdf_viewer.set_pixmap(q_pixmap)
+        if self.continuous_mode: return self.scroll_to_page(page_number)
+        self.current_page_number = page_number; self.pending_zoom_render = None
+        with TRACER.span('display_page', page=page_number):
+            with TRACER.span('page_image'): self.show_page_image(page_number)
+            with TRACER.span('set_text'): self.show_page_text(page_number)
+            self.update_navigation_controls()
+            self.schedule_prefetch(page_number)
+
+    def show_page_text(self, page_number):
+        """Puts the page's text and word boxes in the single-page editor and canvas; what the editor held is dropped."""
         if str(page_number) in self.ocr_data_cache:
             page_data = self.ocr_data_cache[str(page_number)]
-            self.text_editor.setText(page_data['edited_text']); self.text_editor.set_word_data(page_data['word_data'])
+            self.text_editor.setText(page_data['edited_text'])
+            self.text_editor.set_word_data(page_data['word_data'], TextAlignment.from_json(page_data.get('alignment'), len(page_data['word_data'])))
         else:
-            self.text_editor.setText("Click 'Run OCR' to extract text from this page."); self.text_editor.set_word_data([])
-        self.update_navigation_controls()
+            self.text_editor.setText(NO_OCR_TEXT); self.text_editor.set_word_data(PageWords())
+        self.pdf_viewer.set_word_boxes(self.text_editor.word_data)
+
+    def is_tiled_zoom(self, zoom):
+        return self.use_tiled_rendering and self.prefetcher is not None and zoom >= self.tile_zoom_threshold
+
+    def show_page_image(self, page_number):
+        zoom = self.zoom_factor
+        if self.is_tiled_zoom(zoom):
+            page_rect = self.doc.load_page(page_number).rect; self.prefetcher.tile_generation += 1
+            self.pdf_viewer.set_tiled_page(self.page_render_cache, page_number, zoom, QRectF(0, 0, page_rect.width, page_rect.height))
+        else:
+            q_image = self.page_render_cache.get(page_number, zoom)
+            if q_image is None:
+                q_image = render_page_image(self.doc, page_number, zoom); self.page_render_cache.put(page_number, zoom, q_image)
+            self.pdf_viewer.set_page_image(q_image, zoom)
+        self.displayed_zoom = zoom
+
+    def schedule_prefetch(self, page_number):
+        if not self.prefetcher or self.pdf_viewer.tile_source: return
+        neighbours = []
+        for distance in range(1, self.prefetch_radius + 1):
+            neighbours += [p for p in (page_number + distance, page_number - distance) if 0 <= p < len(self.doc)]
+        self.prefetcher.generation += 1
+        self.prefetch_requested.emit(neighbours, self.zoom_factor, self.prefetcher.generation)
+
+    def start_prefetcher(self):
+        self.stop_prefetcher(); self.page_render_cache.clear()
+        self.prefetch_thread = QThread(); self.prefetcher = PagePrefetcher(self.current_pdf_path, self.page_render_cache)
+        self.prefetcher.moveToThread(self.prefetch_thread); self.prefetch_requested.connect(self.prefetcher.prefetch)
+        self.tiles_requested.connect(self.prefetcher.render_tiles); self.prefetcher.tile_rendered.connect(self.handle_tile_rendered)
+        self.prefetcher.page_rendered.connect(self.handle_page_rendered)
+        self.prefetch_thread.start()
+
+    @pyqtSlot(list)
+    def request_tiles(self, tiles):
+        if self.prefetcher and self.pdf_viewer.tile_source:
+            _, page_number, zoom = self.pdf_viewer.tile_source
+            self.tiles_requested.emit(page_number, zoom, tiles, self.prefetcher.tile_generation)
+
+    @pyqtSlot(int, float, int, int)
+    def handle_tile_rendered(self, page_number, zoom, col, row):
+        if self.pdf_viewer.tile_source and self.pdf_viewer.tile_source[1:] == (page_number, zoom): self.pdf_viewer.tile_ready(col, row)
+
+    # --- continuous scroll --------------------------------------------------
+    def set_continuous_mode(self, enabled):
+        if enabled == self.continuous_mode: return
+        self.journal_current_text()
+        if not enabled: self.continuous_text.release_all(store=False); self.continuous_view.set_highlight(-1, [], [])
+        self.continuous_mode = enabled; self.page_view_stack.setCurrentIndex(int(enabled)); self.text_stack.setCurrentIndex(int(enabled))
+        if self.doc:
+            if enabled: self.reset_continuous_view()
+            self.display_page(self.current_page_number)
+    def reset_continuous_view(self):
+        self.continuous_view.set_document(self.doc, self.zoom_factor); self.continuous_text.set_page_count(len(self.doc))
+    def continuous_page_text(self, page_number):
+        """(text, word_data, alignment) for a page coming into view; peek() keeps library pages from piling up in memory."""
+        page_key = str(page_number)
+        if page_key not in self.ocr_data_cache: return None
+        page_data = self.ocr_data_cache.peek(page_key); word_data = page_data['word_data']
+        return page_data['edited_text'], word_data, TextAlignment.from_json(page_data.get('alignment'), len(word_data))
+    def current_editor(self):
+        return self.continuous_text.editors.get(self.current_page_number) if self.continuous_mode else self.text_editor
+    def reveal_cursor(self, editor):
+        if self.continuous_mode: self.continuous_text.ensure_cursor_visible(editor)
+        else: editor.ensureCursorVisible()
+    def scroll_to_page(self, page_number):
+        self.continuous_scroll_area.verticalScrollBar().setValue(self.continuous_view.tops[page_number] - PAGE_GAP)
+        self.continuous_text.scroll_to_page(page_number)
+        self.current_page_number = page_number; self.update_navigation_controls()
+    @pyqtSlot(int)
+    def handle_continuous_scroll(self, value):
+        """The page in the middle of the viewport is the current page; the text pane follows when that page is out of its view."""
+        if not self.continuous_mode or not self.doc: return
+        page_number = self.continuous_view.page_at(value + self.continuous_scroll_area.viewport().height() // 2)
+        if page_number == self.current_page_number: return
+        self.current_page_number = page_number; self.update_navigation_controls()
+        if not self.continuous_text.is_page_visible(page_number): self.continuous_text.scroll_to_page(page_number)
+    @pyqtSlot(list)
+    def request_continuous_pages(self, page_numbers):
+        if not self.prefetcher or not page_numbers: return
+        ahead = [p for distance in range(1, self.prefetch_radius + 1) for p in (page_numbers[-1] + distance, page_numbers[0] - distance) if 0 <= p < len(self.doc)]
+        self.prefetcher.generation += 1
+        self.prefetch_requested.emit(page_numbers + ahead, self.zoom_factor, self.prefetcher.generation)
+    def rescale_continuous_view(self):
+        # Keeps the point in the middle of the viewport on the same spot of the same page; renders wait until zooming goes idle.
+        view = self.continuous_view; bar = self.continuous_scroll_area.verticalScrollBar(); middle = bar.value() + self.continuous_scroll_area.viewport().height() // 2
+        page_number = view.page_at(middle); old_rect = view.page_rect(page_number); fraction = (middle - old_rect.top()) / max(1, old_rect.height())
+        view.requests_paused = True; view.set_zoom(self.zoom_factor); new_rect = view.page_rect(page_number)
+        bar.setValue(int(new_rect.top() + fraction * new_rect.height()) - self.continuous_scroll_area.viewport().height() // 2)
+    @pyqtSlot(int, list, list)
+    def handle_continuous_highlight(self, page_number, word_box, char_box):
+        rect = self.continuous_view.set_highlight(page_number, word_box, char_box)
+        if rect is None or self.syncing_from_image: return
+        self.continuous_scroll_area.ensureVisible(rect.center().x(), rect.center().y(), 50, self.continuous_scroll_area.viewport().height() // 3)
+    @pyqtSlot(int, float, float)
+    def handle_continuous_hover(self, page_number, x, y):
+        for editor_page, editor in self.continuous_text.editors.items():
+            editor.show_hover_position(self.text_position_at(x, y, editor) if editor_page == page_number else -1)
+    @pyqtSlot(int, float, float)
+    def handle_continuous_click(self, page_number, x, y):
+        editor = self.continuous_text.editors.get(page_number) or self.continuous_text.scroll_to_page(page_number)
+        pos = self.text_position_at(x, y, editor) if editor else -1
+        if pos < 0: return
+        cursor = editor.textCursor(); cursor.setPosition(pos)
+        self.syncing_from_image = True
+        try: editor.setTextCursor(cursor); self.continuous_text.ensure_cursor_visible(editor)
+        finally: self.syncing_from_image = False
+
+    # --- full-text search ---------------------------------------------------
+    def page_text_changed(self, page_key):
+        # Re-indexed lazily on the next search; hit offsets on that page may have moved.
+        self.text_index.invalidate(page_key); self.search_query = None
+
+    def focus_search(self): self.search_field.setFocus(); self.search_field.selectAll()
+    def find_next(self): self.step_search(1)
+    def find_previous(self): self.step_search(-1)
+
+    def run_search(self, query):
+        started = now()
+        with TRACER.span('search'): self.text_index.sync(self.ocr_data_cache); self.search_hits = self.text_index.search(query)
+        self.search_query = query; self.search_hit_index = -1; elapsed = now() - started
+        if not self.search_hits: self.search_status_label.setText(f"No matches ({elapsed * 1000:.0f} ms)")
+
+    def step_search(self, step):
+        query = self.search_field.text().strip()
+        if not query or not self.doc: return
+        self.journal_current_text()  # commits pending edits, which also invalidates that page's index entry
+        if query != self.search_query: self.run_search(query)
+        if not self.search_hits: return
+        if self.search_hit_index < 0:
+            # A new search starts from the cursor: the first hit at or after it (or the last one before it).
+            positions = [(int(hit.page_key), hit.start) for hit in self.search_hits]
+            editor = self.current_editor(); cursor_start = editor.textCursor().selectionStart() if editor else 0
+            index = bisect.bisect_left(positions, (self.current_page_number, cursor_start))
+            self.show_search_hit((index if step > 0 else index - 1) % len(self.search_hits))
+        else:
+            self.show_search_hit((self.search_hit_index + step) % len(self.search_hits))
+
+    def show_search_hit(self, index):
+        hit = self.search_hits[index]; page_number = int(hit.page_key); self.search_hit_index = index
+        if not 0 <= page_number < len(self.doc): return
+        if page_number != self.current_page_number or self.current_editor() is None: self.journal_current_text(); self.display_page(page_number)
+        # Anchor at the end and cursor at the start, so the highlight follows the hit's first character.
+        editor = self.current_editor(); cursor = editor.textCursor(); cursor.setPosition(hit.start + hit.length); cursor.setPosition(hit.start, QTextCursor.KeepAnchor)
+        editor.setTextCursor(cursor); self.reveal_cursor(editor)
+        self.search_status_label.setText(f"{index + 1} of {len(self.search_hits)} (page {page_number + 1})")
+
+    # --- performance instrumentation ------------------------------------
+    def set_show_timings(self, enabled):
+        self.timing_label.setVisible(enabled)
+        if enabled: self.update_timing_label(); self.timing_timer.start()
+        else: self.timing_timer.stop()
+
+    def update_timing_label(self):
+        summary = TRACER.summary(LIVE_TIMING_STAGES) or "No stages timed yet."
+        if TRACER.recording: summary += f" · recording ({TRACER.event_count} events)"
+        self.timing_label.setText(summary)
+
+    def set_trace_recording(self, enabled):
+        if enabled: TRACER.start_recording()
+        else: TRACER.stop_recording()
+
+    def save_performance_trace(self):
+        save_path, _ = QFileDialog.getSaveFileName(self, "Save Performance Trace", "", "Chrome Trace (*.json)")
+        if not save_path: return
+        try: count = TRACER.write_chrome_trace(save_path); self.ocr_status_label.setText(f"Saved {count} trace events (open in ui.perfetto.dev or chrome://tracing).")
+        except OSError as e: self.ocr_status_label.setText(f"Error saving trace: {e}")
+
+    def set_confidence_colours(self, enabled):
+        # Colours only mean something with the boxes on screen, so turning them on shows the boxes too.
+        self.pdf_viewer.set_colour_by_confidence(enabled)
+        if enabled: self.pdf_viewer.set_show_word_boxes(True)
+
+    def set_use_tiled_rendering(self, enabled):
+        self.use_tiled_rendering = enabled
+        if self.doc and not self.continuous_mode: self.show_page_image(self.current_page_number); self.text_editor.update_highlight()
+
+    def stop_prefetcher(self):
+        if not self.prefetcher: return
+        self.prefetch_requested.disconnect(self.prefetcher.prefetch); self.tiles_requested.disconnect(self.prefetcher.render_tiles); self.prefetcher.close()
+        self.prefetch_thread.quit(); self.prefetch_thread.wait()
+        self.prefetcher.deleteLater(); self.prefetch_thread.deleteLater(); self.prefetcher = None; self.prefetch_thread = None
     
     def start_ocr_process(self):
         if not self.doc: return
-        page = self.doc.load_page(self.current_page_number); ocr_zoom_level = 2.0; mat = fitz.Matrix(ocr_zoom_level, ocr_zoom_level); pix_for_ocr = page.get_pixmap(matrix=mat)
-        self.run_ocr_button.setEnabled(False); self.text_editor.setText("OCR in progress...")
-        self.ocr_thread = QThread(); self.ocr_worker = OCRWorker(pix_for_ocr, ocr_zoom_level); self.ocr_worker.moveToThread(self.ocr_thread)
+        self.ocr_page_number = self.current_page_number; page = self.doc.load_page(self.current_page_number)
+        native = native_page_data(page) if self.use_text_layer else None
+        if native:
+            self.handle_ocr_results({'text': native['edited_text'], 'word_data': native['word_data'], 'source': 'native'}); return
+        with TRACER.span('render', page=self.current_page_number):
+            ocr_zoom_level = resolve_ocr_zoom(page, self.ocr_zoom_level); mat = fitz.Matrix(ocr_zoom_level, ocr_zoom_level); pix_for_ocr = page.get_pixmap(matrix=mat)
+        # The placeholder goes in the status label: text put in the editor would be stored as the page's text on the next page flip.
+        self.journal_current_text(); self.run_ocr_button.setEnabled(False); self.ocr_status_label.setText(f"OCR in progress on page {self.ocr_page_number + 1}...")
+        self.ocr_thread = QThread(); self.ocr_worker = OCRWorker(pix_for_ocr, ocr_zoom_level, self.active_result_cache(), self.ocr_engine_pool,
+                                                                   self.enabled_preprocess_steps())
+        self.ocr_worker.moveToThread(self.ocr_thread)
         self.ocr_thread.started.connect(self.ocr_worker.run); self.ocr_worker.finished.connect(self.handle_ocr_results)
         self.ocr_worker.error.connect(self.handle_ocr_error); self.ocr_worker.finished.connect(self.ocr_thread.quit)
         self.ocr_worker.finished.connect(self.ocr_worker.deleteLater); self.ocr_thread.finished.connect(self.ocr_thread.deleteLater)
@@ -407,9 +1106,12 @@ class MainWindow(QMainWindow):
             return
 
         self.set_ocr_all_ui_state(is_running=True)
-        with open(self.current_pdf_path, 'rb') as f:
-            pdf_data = f.read()
-        self.ocr_all_thread = QThread(); self.ocr_all_worker = OCRAllWorker(pdf_data); self.ocr_all_worker.moveToThread(self.ocr_all_thread)
+        cache_dir = self.ocr_result_cache.directory if self.active_result_cache() else None
+        self.ocr_all_thread = QThread(); self.ocr_all_worker = OCRAllWorker(self.current_pdf_path, self.ocr_zoom_level, self.ocr_worker_count, cache_dir,
+                                                                       engine=self.ocr_engine, use_text_layer=self.use_text_layer,
+                                                                       preprocess=self.enabled_preprocess_steps(),
+                                                                       library_path=self.library.path if self.library_document_id is not None else None)
+        self.ocr_all_worker.moveToThread(self.ocr_all_thread)
         self.ocr_all_thread.started.connect(self.ocr_all_worker.run); self.ocr_all_worker.progress_updated.connect(self.handle_ocr_all_progress)
         self.ocr_all_worker.finished.connect(self.handle_ocr_all_finished); self.ocr_all_worker.error.connect(self.handle_ocr_error)
         self.ocr_all_thread.start()
@@ -417,14 +1119,26 @@ class MainWindow(QMainWindow):
     def cancel_ocr_all(self):
         if self.ocr_all_worker: self.ocr_all_worker.cancel(); self.ocr_status_label.setText("Canceling...")
 
-    @pyqtSlot(int, int, dict)
-    def handle_ocr_all_progress(self, page_num, total_pages, page_data):
-        self.ocr_progress_bar.setValue(page_num); self.ocr_progress_bar.setMaximum(total_pages); self.ocr_status_label.setText(f"Processing page {page_num} of {total_pages}...")
-        self.ocr_data_cache[str(page_num - 1)] = page_data
+    @pyqtSlot(int, int, int, dict, float)
+    def handle_ocr_all_progress(self, page_index, pages_done, total_pages, page_data, emitted_at):
+        TRACER.record('signal', emitted_at, now() - emitted_at, args={'page': page_index})
+        with TRACER.span('store_page', page=page_index):
+            self.ocr_progress_bar.setMaximum(total_pages); self.ocr_progress_bar.setValue(pages_done)
+            self.ocr_status_label.setText(f"Processed {pages_done} of {total_pages} pages ({self.ocr_worker_count} workers)...")
+            self.ocr_data_cache[str(page_index)] = page_data; self.page_text_changed(str(page_index))
+            if self.journal: self.journal.record_page(str(page_index), page_data)
+            # The page on screen shows the result at once, as in continuous mode; left showing NO_OCR_TEXT, the editor would
+            # store that placeholder over the result on the next page flip or save.
+            if self.continuous_mode: self.continuous_text.reload_page(page_index)
+            elif page_index == self.current_page_number: self.show_page_text(page_index)
 
     def handle_ocr_all_finished(self):
         self.set_ocr_all_ui_state(is_running=False)
         self.ocr_status_label.setText("Batch OCR finished.")
+        if self.ocr_all_worker:
+            worker = self.ocr_all_worker; details = [f"{worker.native_pages} from the text layer", f"{worker.ocr_pages} OCR'd"]
+            if worker.cache_hits: details.append(f"{worker.cache_hits} from the OCR cache")
+            self.ocr_status_label.setText(f"Batch OCR finished ({', '.join(details)}).")
         
         # Clean up the thread and worker
         if self.ocr_all_thread:
@@ -436,8 +1150,8 @@ class MainWindow(QMainWindow):
             self.ocr_all_worker.deleteLater()
             self.ocr_all_worker = None
 
-        # Refresh the display of the current page
-        self.display_page(self.current_page_number)
+        # Refresh the display of the current page (continuous mode reloaded each page's editor as it came in)
+        if not self.continuous_mode: self.display_page(self.current_page_number)
 
     def set_ocr_all_ui_state(self, is_running):
         self.run_ocr_button.setDisabled(is_running); self.run_ocr_all_button.setDisabled(is_running)
@@ -451,70 +1165,213 @@ class MainWindow(QMainWindow):
         open_action = QAction('&Open PDF', self); open_action.triggered.connect(self.open_pdf_file); file_menu.addAction(open_action)
         save_action = QAction('&Save Project', self); save_action.triggered.connect(self.save_project); file_menu.addAction(save_action)
         load_action = QAction('&Load Project', self); load_action.triggered.connect(self.load_project); file_menu.addAction(load_action)
+        file_menu.addSeparator()
+        library_action = QAction('Keep Pages in the OCR &Library', self, checkable=True); library_action.toggled.connect(self.set_use_library)
+        file_menu.addAction(library_action)
+        export_menu = file_menu.addMenu('&Export')
+        for export_format, name in EXPORT_FORMAT_NAMES.items():
+            export_action = QAction(f'{name}...', self); export_action.triggered.connect(lambda checked, export_format=export_format: self.start_export(export_format))
+            export_menu.addAction(export_action)
+        import_library_action = QAction('&Import Projects into Library...', self); import_library_action.triggered.connect(self.import_projects_into_library)
+        file_menu.addAction(import_library_action)
         file_menu.addSeparator(); exit_action = QAction('&Exit', self); exit_action.triggered.connect(self.close); file_menu.addAction(exit_action)
+        view_menu = menubar.addMenu('&View')
+        tiled_action = QAction('&Tiled Rendering at High Zoom', self, checkable=True); tiled_action.setChecked(self.use_tiled_rendering)
+        tiled_action.toggled.connect(self.set_use_tiled_rendering); view_menu.addAction(tiled_action)
+        continuous_action = QAction('&Continuous Scroll', self, checkable=True); continuous_action.toggled.connect(self.set_continuous_mode)
+        view_menu.addAction(continuous_action)
+        word_boxes_action = QAction('Show &Word Boxes', self, checkable=True); word_boxes_action.toggled.connect(self.pdf_viewer.set_show_word_boxes)
+        view_menu.addAction(word_boxes_action)
+        confidence_action = QAction('Colour Word Boxes by &Confidence', self, checkable=True); confidence_action.toggled.connect(self.set_confidence_colours)
+        view_menu.addAction(confidence_action)
+        find_action = QAction('&Find in All Pages', self); find_action.setShortcut(QKeySequence.Find); find_action.triggered.connect(self.focus_search)
+        view_menu.addAction(find_action)
+        view_menu.addSeparator()
+        timings_action = QAction('Stage &Timings', self, checkable=True); timings_action.toggled.connect(self.set_show_timings); view_menu.addAction(timings_action)
+        record_trace_action = QAction('&Record Performance Trace', self, checkable=True); record_trace_action.toggled.connect(self.set_trace_recording)
+        view_menu.addAction(record_trace_action)
+        save_trace_action = QAction('Save Performance Trace...', self); save_trace_action.triggered.connect(self.save_performance_trace); view_menu.addAction(save_trace_action)
+        ocr_menu = menubar.addMenu('&OCR')
+        workers_action = QAction('Batch &Worker Count...', self); workers_action.triggered.connect(self.set_ocr_worker_count); ocr_menu.addAction(workers_action)
+        engine_menu = ocr_menu.addMenu('&Engine'); engine_group = QActionGroup(self); engines = available_engines()
+        for name, label in (('pytesseract', 'tesseract &Executable (one process per page)'), ('tesserocr', '&In-Process Engine Pool (tesserocr)')):
+            engine_action = QAction(label, self, checkable=True); engine_action.setChecked(name == self.ocr_engine); engine_action.setEnabled(name in engines)
+            engine_action.triggered.connect(lambda checked, name=name: self.set_ocr_engine(name)); engine_group.addAction(engine_action); engine_menu.addAction(engine_action)
+        text_layer_action = QAction('Use PDF &Text Layer When Available', self, checkable=True); text_layer_action.setChecked(self.use_text_layer)
+        text_layer_action.toggled.connect(self.set_use_text_layer); ocr_menu.addAction(text_layer_action)
+        adaptive_zoom_action = QAction('&Adaptive Resolution (per-page zoom from text size)', self, checkable=True)
+        adaptive_zoom_action.setChecked(self.ocr_zoom_level == AUTO_ZOOM); adaptive_zoom_action.toggled.connect(self.set_adaptive_ocr_zoom); ocr_menu.addAction(adaptive_zoom_action)
+        preprocess_menu = ocr_menu.addMenu('&Preprocessing')
+        for step in PREPROCESS_STEPS:
+            step_action = QAction(step.capitalize(), self, checkable=True); step_action.setChecked(step in self.ocr_preprocess)
+            step_action.toggled.connect(lambda enabled, step=step: self.set_preprocess_step(step, enabled)); preprocess_menu.addAction(step_action)
+        ocr_menu.addSeparator()
+        cache_action = QAction('Use OCR Result &Cache', self, checkable=True); cache_action.setChecked(self.use_ocr_result_cache)
+        cache_action.setEnabled(self.ocr_result_cache is not None); cache_action.toggled.connect(self.set_use_ocr_result_cache); ocr_menu.addAction(cache_action)
+        cache_stats_action = QAction('OCR Cache &Statistics...', self); cache_stats_action.triggered.connect(self.show_ocr_cache_stats); ocr_menu.addAction(cache_stats_action)
+        cache_clear_action = QAction('C&lear OCR Cache', self); cache_clear_action.triggered.connect(self.clear_ocr_cache); ocr_menu.addAction(cache_clear_action)
+    def active_result_cache(self): return self.ocr_result_cache if self.use_ocr_result_cache else None
+    def set_use_ocr_result_cache(self, enabled): self.use_ocr_result_cache = enabled
+    def set_use_text_layer(self, enabled): self.use_text_layer = enabled
+    def set_adaptive_ocr_zoom(self, enabled): self.ocr_zoom_level = AUTO_ZOOM if enabled else DEFAULT_OCR_ZOOM
+    def set_preprocess_step(self, step, enabled):
+        if enabled: self.ocr_preprocess.add(step)
+        else: self.ocr_preprocess.discard(step)
+    def enabled_preprocess_steps(self): return [step for step in PREPROCESS_STEPS if step in self.ocr_preprocess]
+    def show_ocr_cache_stats(self):
+        if not self.ocr_result_cache: return
+        stats = self.ocr_result_cache.stats()
+        QMessageBox.information(self, "OCR Cache Statistics",
+                                f"Location: {self.ocr_result_cache.directory}\n"
+                                f"Entries: {stats['entries']} ({stats['bytes'] / 2**20:.1f} of {stats['max_bytes'] / 2**20:.0f} MB)\n"
+                                f"Single-page lookups this session: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+    def clear_ocr_cache(self):
+        if self.ocr_result_cache: self.ocr_result_cache.clear(); self.ocr_status_label.setText("OCR cache cleared.")
+    def set_ocr_engine(self, name):
+        if name == self.ocr_engine: return
+        self.ocr_engine_pool.close(); self.ocr_engine = name; self.ocr_engine_pool = EnginePool(name)
+    def set_ocr_worker_count(self):
+        count, ok = QInputDialog.getInt(self, "Batch Worker Count", "Number of OCR worker processes:", self.ocr_worker_count, 1, 256)
+        if ok: self.ocr_worker_count = count
+    def set_use_library(self, enabled):
+        """The library is used for PDFs opened from now on; the one that is open keeps its current storage."""
+        self.use_library = enabled
+        if enabled and not self.library:
+            try: self.library = OCRLibrary(default_library_path()); self.ocr_status_label.setText(f"OCR library: {self.library.path}")
+            except Exception as e: self.ocr_status_label.setText(f"Could not open the OCR library: {e}")
+        elif not enabled and self.library and self.library_document_id is None: self.library.close(); self.library = None
+    def import_projects_into_library(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "Import Projects into Library", "", f"OCR Projects (*{PROJECT_EXTENSION} *.json)")
+        if not paths: return
+        library = self.library or OCRLibrary(default_library_path()); imported = 0; failed = []
+        try:
+            for path in paths:
+                try: imported += library.import_project(path)[1]
+                except Exception as e: failed.append(f"{os.path.basename(path)}: {e}")
+        finally:
+            if library is not self.library: library.close()
+        self.ocr_status_label.setText(f"Imported {imported} pages into the OCR library." + (f" Skipped {'; '.join(failed)}" if failed else ""))
     def open_pdf_file(self):
         filepath, _ = QFileDialog.getOpenFileName(self, "Open PDF File", "", "PDF Files (*.pdf)");
         if filepath: self.load_pdf(filepath)
     def load_pdf(self, filepath, is_project_load=False):
         if self.doc: self.doc.close()
-        if not is_project_load: self.ocr_data_cache.clear()
+        if not is_project_load: self.ocr_data_cache.clear(); self.project_path = None
+        self.library_document_id = None
+        if self.library and not self.use_library: self.library.close(); self.library = None
+        self.text_index.clear(); self.search_query = None; self.search_hits = []; self.search_status_label.setText("")
         try:
             self.doc = fitz.open(filepath); self.current_pdf_path = filepath; self.current_page_number = 0
-            self.pdf_stack.setCurrentIndex(1); self.display_page(self.current_page_number)
+            if self.library and not is_project_load:
+                # Pages come from the library one at a time, as they are shown; the autosave journal below is replayed on top.
+                self.library_document_id = self.library.add_document(filepath)
+                self.ocr_data_cache = OCRPageStore(archive=self.library.document_view(self.library_document_id))
+            if not is_project_load and self.start_session_journal(filepath):
+                self.is_dirty = True; self.ocr_status_label.setText("Recovered unsaved work from the autosave journal.")
+            self.start_prefetcher(); self.pdf_stack.setCurrentIndex(1)
+            if self.continuous_mode: self.reset_continuous_view()
+            self.display_page(self.current_page_number)
         except Exception as e:
-            self.pdf_stack.setCurrentIndex(0); print(f"Failed to load PDF: {e}"); self.doc = None
+            self.pdf_stack.setCurrentIndex(0); print(f"Failed to load PDF: {e}"); self.doc = None; self.stop_prefetcher()
         finally: self.update_navigation_controls()
     @pyqtSlot(dict)
     def handle_ocr_results(self, result_dict):
-        self.text_editor.setText(result_dict['text']); self.text_editor.set_word_data(result_dict['word_data'])
-        self.ocr_data_cache[str(self.current_page_number)] = {'word_data': result_dict['word_data'], 'edited_text': result_dict['text']}
+        if 'emitted_at' in result_dict: TRACER.record('signal', result_dict['emitted_at'], now() - result_dict['emitted_at'])
+        page_data = {'word_data': result_dict['word_data'], 'edited_text': result_dict['text']}; page_key = str(self.ocr_page_number)
+        if result_dict.get('source') == 'native': page_data['source'] = 'native'
+        if result_dict.get('ocr_zoom'): page_data['ocr_zoom'] = result_dict['ocr_zoom']
+        self.ocr_data_cache[page_key] = page_data; self.page_text_changed(page_key)
+        if self.journal: self.journal.record_page(page_key, page_data)
+        with TRACER.span('set_text'):
+            if self.continuous_mode: self.continuous_text.reload_page(self.ocr_page_number)
+            elif self.ocr_page_number == self.current_page_number:
+                self.text_editor.setText(result_dict['text']); self.text_editor.set_word_data(result_dict['word_data']); self.pdf_viewer.set_word_boxes(result_dict['word_data'])
         self.run_ocr_button.setEnabled(True)
+        if result_dict.get('source') == 'native': self.ocr_status_label.setText("Text taken from the PDF's text layer (no OCR needed).")
+        elif result_dict.get('cache_hit'): self.ocr_status_label.setText("Loaded from the OCR cache.")
+        elif result_dict.get('preprocess_seconds') is not None: self.ocr_status_label.setText(f"Preprocessing took {result_dict['preprocess_seconds'] * 1000:.0f} ms.")
+        elif self.ocr_zoom_level == AUTO_ZOOM: self.ocr_status_label.setText(f"OCR'd at {result_dict['ocr_zoom']:g}x.")
+        else: self.ocr_status_label.setText("")
     def save_project(self):
         if not self.current_pdf_path: return
-        save_path, _ = QFileDialog.getSaveFileName(self, "Save Project", "", "JSON Files (*.json)")
+        if self.library_document_id is not None: return self.save_to_library()
+        save_path, selected_filter = QFileDialog.getSaveFileName(self, "Save Project", "", f"OCR Projects (*{PROJECT_EXTENSION});;JSON Files (*.json)")
         if save_path:
-            if str(self.current_page_number) in self.ocr_data_cache:
-                self.ocr_data_cache[str(self.current_page_number)]['edited_text'] = self.text_editor.toPlainText()
-            project_data = {'pdf_path': self.current_pdf_path, 'ocr_data': self.ocr_data_cache}
+            if not os.path.splitext(save_path)[1]: save_path += '.json' if selected_filter.startswith('JSON') else PROJECT_EXTENSION
+            archive = self.ocr_data_cache.archive
+            if self.export_thread and self.export_thread.isRunning() and archive and os.path.exists(save_path) and os.path.samefile(archive.path, save_path):
+                # The export reads a detached copy of the archive, which Windows will not let the save replace.
+                self.ocr_status_label.setText("Wait for the export to finish before saving over the project it is reading.")
+                return
+            self.journal_current_text()
             try:
-                with open(save_path, 'w', encoding='utf-8') as f: json.dump(project_data, f, ensure_ascii=False, indent=4)
+                with TRACER.span('save_project', pages=len(self.ocr_data_cache)):
+                    if save_path.lower().endswith('.json'): save_json_project(save_path, self.current_pdf_path, self.ocr_data_cache)
+                    else: save_project_archive(save_path, self.current_pdf_path, self.ocr_data_cache)
                 print(f"Project saved to {save_path}")
-                self.is_dirty = False
+                self.project_path = save_path; self.is_dirty = False
+                # Everything journaled so far is in the saved file now: start an empty journal next to it.
+                self.close_journal(discard=True); self.open_journal(journal_path_for(save_path))
             except Exception as e: print(f"Error saving project: {e}")
 
-    def export_to_word(self):
+    def save_to_library(self):
+        """Writes the pages that were OCR'd or edited back to the library (pages never opened are already there)."""
+        self.journal_current_text(); store = self.ocr_data_cache
+        try:
+            with TRACER.span('save_project', pages=len(store)):
+                count = self.library.put_pages(self.library_document_id, [(key, store[key]) for key in store if store.is_loaded(key)])
+            self.is_dirty = False; self.ocr_status_label.setText(f"Saved {count} pages to the OCR library.")
+            self.close_journal(discard=True); self.open_journal(self.session_journal_path(self.current_pdf_path))
+        except Exception as e: print(f"Error saving to the OCR library: {e}")
+
+    def export_to_word(self): self.start_export('docx')
+    def start_export(self, export_format):
+        """Exports every page in the background; pages are read from a detached copy of ocr_data_cache, so editing can go on."""
         if not self.ocr_data_cache:
             self.ocr_status_label.setText("No OCR data to export.")
             return
-
-        save_path, _ = QFileDialog.getSaveFileName(self, "Export to Word", "", "Word Documents (*.docx)")
-        if save_path:
-            try:
-                doc = docx.Document()
-                # Sort the pages by page number
-                sorted_pages = sorted(self.ocr_data_cache.items(), key=lambda item: int(item[0]))
-                for page_num, page_data in sorted_pages:
-                    doc.add_paragraph(page_data['edited_text'])
-                    doc.add_page_break()
-
-                doc.save(save_path)
-                self.ocr_status_label.setText(f"Exported to {save_path}")
-            except Exception as e:
-                self.ocr_status_label.setText(f"Error exporting to Word: {e}")
+        if self.export_thread and self.export_thread.isRunning():
+            self.ocr_status_label.setText("An export is already running.")
+            return
+        name = EXPORT_FORMAT_NAMES[export_format]; extension = EXPORT_FORMATS[export_format]
+        save_path, _ = QFileDialog.getSaveFileName(self, f"Export to {name}", "", f"{name} (*{extension})")
+        if not save_path: return
+        if not os.path.splitext(save_path)[1]: save_path += extension
+        self.journal_current_text(); store = self.ocr_data_cache.detached()
+        self.export_thread = QThread(); self.export_worker = ExportWorker(store, [(export_format, save_path)], self.current_pdf_path,
+                                                                         export_workers(len(store), self.ocr_worker_count))
+        self.export_worker.moveToThread(self.export_thread)
+        self.export_thread.started.connect(self.export_worker.run); self.export_worker.progress_updated.connect(self.handle_export_progress)
+        self.export_worker.finished.connect(self.handle_export_finished); self.export_worker.error.connect(self.ocr_status_label.setText)
+        self.export_progress_bar.setMaximum(len(store)); self.export_progress_bar.setValue(0); self.export_progress_bar.show(); self.cancel_export_button.show()
+        self.ocr_status_label.setText(f"Exporting to {save_path}..."); self.export_thread.start()
+    def cancel_export(self):
+        if self.export_worker: self.export_worker.cancel()
+    @pyqtSlot(int, int)
+    def handle_export_progress(self, pages_done, total_pages): self.export_progress_bar.setValue(pages_done)
+    def handle_export_finished(self, message):
+        self.export_progress_bar.hide(); self.cancel_export_button.hide()
+        if message: self.ocr_status_label.setText(message)
+        if self.export_thread: self.export_thread.quit(); self.export_thread.wait(); self.export_thread.deleteLater(); self.export_thread = None
+        if self.export_worker: self.export_worker.deleteLater(); self.export_worker = None
     def load_project(self):
-        load_path, _ = QFileDialog.getOpenFileName(self, "Load Project", "", "JSON Files (*.json)")
+        load_path, _ = QFileDialog.getOpenFileName(self, "Load Project", "", f"OCR Projects (*{PROJECT_EXTENSION} *.json)")
         if load_path:
             try:
-                with open(load_path, 'r', encoding='utf-8') as f: project_data = json.load(f)
-                self.ocr_data_cache = project_data['ocr_data']; self.load_pdf(project_data['pdf_path'], is_project_load=True)
+                with TRACER.span('load_project'):
+                    pdf_path, page_store = load_project_file(load_path)
+                    self.ocr_data_cache.clear(); self.ocr_data_cache = page_store; self.project_path = load_path
+                    recovered = self.open_journal(journal_path_for(load_path), replay=True)
+                self.load_pdf(pdf_path, is_project_load=True)
+                if recovered: self.is_dirty = True; self.ocr_status_label.setText(f"Recovered {recovered} unsaved changes from the autosave journal.")
                 print(f"Project loaded from {load_path}")
             except Exception as e: print(f"Error loading project: {e}")
     def go_to_next_page(self):
-        if str(self.current_page_number) in self.ocr_data_cache: self.ocr_data_cache[str(self.current_page_number)]['edited_text'] = self.text_editor.toPlainText()
+        self.journal_current_text()
         if self.doc and self.current_page_number < len(self.doc) - 1:
             self.current_page_number += 1; self.display_page(self.current_page_number)
     def go_to_previous_page(self):
-        if str(self.current_page_number) in self.ocr_data_cache: self.ocr_data_cache[str(self.current_page_number)]['edited_text'] = self.text_editor.toPlainText()
+        self.journal_current_text()
         if self.doc and self.current_page_number > 0:
             self.current_page_number -= 1; self.display_page(self.current_page_number)
     def handle_ocr_error(self, error_message):
@@ -529,6 +1386,7 @@ class MainWindow(QMainWindow):
         else: self.page_number_label.setText("Page: N/A")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setStyleSheet(DARK_STYLESHEET)
     window = MainWindow()
@@ -0,0 +1,207 @@
+"""
+Benchmark suite: per-stage timings of the OCR pipeline on synthetic PDFs.
+
+Generates Hebrew and mixed Hebrew/Latin/number PDFs with fitz (seeded, so every run
+gets byte-for-byte the same documents) at several page counts and text densities,
+then times each stage on its own:
+
+    render      rendering.render_page_image at the viewer zoom, what display_page draws
+    ocr         ocr_core.ocr_pixmap on the OCR render (first --ocr-pages pages; skipped without tesseract)
+    word_data   ocr_core.tesseract_data_to_page on a Tesseract-shaped DataFrame of each page
+    save, load  .ocrproj archives and JSON projects (load includes reading every page),
+                for the synthetic documents and for test.json
+    export      exporters.export_docx, what File > Export to Word writes, and hOCR + ALTO
+                in one pass formatted in this process (export_xml) and in 2 worker processes
+                (export_xml_2w), which is what decides exporters.PARALLEL_EXPORT_MIN_PAGES
+
+Every run is written to a JSON file (default benchmarks/results/<timestamp>.json)
+together with the environment it ran in; --compare prints two such files side by side.
+
+    python benchmarks/bench_pipeline.py [--quick] [--stages render,word_data] [--repeat N] [-o run.json]
+    python benchmarks/bench_pipeline.py --compare before.json after.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+import fitz
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ocr_core import ocr_pixmap, tesseract_data_to_page, tesseract_version, native_page_data, render_page_for_ocr, DEFAULT_OCR_ZOOM
+from project_io import OCRPageStore, save_project_archive, save_json_project, load_project_file
+from exporters import export_docx, export_pages
+from bench_word_data import page_to_dataframe
+
+STAGES = ('render', 'ocr', 'word_data', 'save', 'load', 'export')
+SCRIPTS = ('hebrew', 'mixed')
+DENSITIES = {'sparse': (14, 160), 'dense': (9, 520)}  # font size in pt, words per page
+PAGE_COUNTS = (1, 10, 50)
+QUICK_PAGE_COUNTS = (1, 5)
+VIEW_ZOOM = 2.0
+HEBREW_LETTERS = 'אבגדהוזחטיכלמנסעפצקרשת'
+FINAL_FORMS = {'כ': 'ך', 'מ': 'ם', 'נ': 'ן', 'פ': 'ף', 'צ': 'ץ'}
+LATIN_WORDS = ('PDF', 'Tesseract', 'OCR', 'page', 'index', 'Unicode', 'version', 'data', 'export', 'layout')
+
+# =====================================================================
+#  Synthetic documents
+# =====================================================================
+def hebrew_word(rng):
+    letters = [rng.choice(HEBREW_LETTERS) for _ in range(rng.randint(2, 7))]
+    letters[-1] = FINAL_FORMS.get(letters[-1], letters[-1])
+    return ''.join(letters)
+
+def synthetic_words(rng, script, count):
+    for _ in range(count):
+        roll = rng.random()
+        if script == 'mixed' and roll < 0.12: yield rng.choice(LATIN_WORDS)
+        elif script == 'mixed' and roll < 0.2: yield str(rng.randint(1, 2024))
+        else: yield hebrew_word(rng)
+
+def page_html(rng, script, font_size, word_count):
+    words = list(synthetic_words(rng, script, word_count)); paragraphs = []
+    while words:
+        size = rng.randint(25, 70); paragraphs.append(' '.join(words[:size])); words = words[size:]
+    body = ''.join(f'<p>{paragraph}</p>' for paragraph in paragraphs)
+    return f'<div dir="rtl" style="font-size:{font_size}pt; text-align:justify">{body}</div>'
+
+def make_pdf(path, script, density, pages, seed=0):
+    """Writes an A4 PDF of right-to-left paragraphs laid out by MuPDF's HTML engine (real Hebrew shaping and bidi)."""
+    rng = random.Random(f"{seed}-{script}-{density}"); font_size, word_count = DENSITIES[density]
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page(width=595, height=842)
+        page.insert_htmlbox(page.rect + (50, 50, -50, -50), page_html(rng, script, font_size, word_count), scale_low=0)
+    doc.save(path, deflate=True, no_new_id=True); doc.close()
+
+# =====================================================================
+#  Timing
+# =====================================================================
+def measure(function, repeat):
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter(); function(); runs.append(time.perf_counter() - started)
+    return {'min': min(runs), 'median': statistics.median(runs), 'mean': statistics.fmean(runs), 'runs': runs}
+
+def record(results, case, stage, pages, timing):
+    results.append({'case': case, 'stage': stage, 'pages': pages, 'seconds': timing,
+                    'ms_per_page': timing['min'] * 1000 / pages if pages else None})
+    print(f"{case:<22} {stage:<12} {pages:>5} {timing['min'] * 1000:>10.1f} {timing['median'] * 1000:>10.1f} "
+          f"{timing['min'] * 1000 / max(pages, 1):>10.2f}", flush=True)
+
+def bench_store(results, case, stages, pages, repeat, workdir):
+    """save / load / export timings for a dict of page_key -> page_data."""
+    archive_path = os.path.join(workdir, case + '.ocrproj'); json_path = os.path.join(workdir, case + '.json')
+    def load_all(path):
+        _, store = load_project_file(path)
+        for _ in store.iter_sorted(): pass
+        store.clear()
+    for kind, path, save in (('archive', archive_path, save_project_archive), ('json', json_path, save_json_project)):
+        if 'save' in stages or 'load' in stages: save(path, 'synthetic.pdf', OCRPageStore(dict(pages)))
+        if 'save' in stages: record(results, case, f'save_{kind}', len(pages), measure(lambda: save(path, 'synthetic.pdf', OCRPageStore(dict(pages))), repeat))
+        if 'load' in stages: record(results, case, f'load_{kind}', len(pages), measure(lambda: load_all(path), repeat))
+    if 'export' in stages:
+        docx_path = os.path.join(workdir, case + '.docx')
+        record(results, case, 'export', len(pages), measure(lambda: export_docx(OCRPageStore(dict(pages)).iter_sorted(), docx_path), repeat))
+        targets = [('hocr', os.path.join(workdir, case + '.hocr')), ('alto', os.path.join(workdir, case + '.xml'))]
+        for stage, workers in (('export_xml', 1), ('export_xml_2w', 2)):
+            record(results, case, stage, len(pages), measure(lambda: export_pages(OCRPageStore(dict(pages)).iter_sorted(), targets, page_sizes={}, workers=workers), repeat))
+
+def bench_document(results, case, pdf_path, stages, args, workdir):
+    doc = fitz.open(pdf_path); page_count = len(doc)
+    if 'render' in stages:
+        from rendering import render_page_image
+        record(results, case, 'render', page_count,
+               measure(lambda: [render_page_image(doc, n, VIEW_ZOOM) for n in range(page_count)], args.repeat))
+    # Ground truth from the text layer stands in for OCR output, so these stages need no tesseract.
+    pages = {str(n): native_page_data(doc.load_page(n)) for n in range(page_count)}
+    if 'word_data' in stages:
+        frames = [page_to_dataframe({'word_data': page_data['word_data'].to_json(), 'edited_text': page_data['edited_text']})
+                  for page_data in pages.values()]
+        record(results, case, 'word_data', page_count, measure(lambda: [tesseract_data_to_page(f, DEFAULT_OCR_ZOOM) for f in frames], args.repeat))
+    if 'ocr' in stages and args.tesseract:
+        ocr_count = min(page_count, args.ocr_pages); pixmaps = [render_page_for_ocr(doc, n, DEFAULT_OCR_ZOOM) for n in range(ocr_count)]
+        record(results, case, 'ocr', ocr_count, measure(lambda: [ocr_pixmap(pix, DEFAULT_OCR_ZOOM) for pix in pixmaps], args.ocr_repeat))
+    doc.close()
+    bench_store(results, case, stages, pages, args.repeat, workdir)
+
+def bench_project(results, project_path, scale, stages, args, workdir):
+    """save / load / export on an existing project (test.json) with its pages repeated scale times."""
+    _, store = load_project_file(project_path); originals = [page_data for _, page_data in store.iter_sorted()]
+    pages = {str(n): originals[n % len(originals)] for n in range(len(originals) * scale)}
+    bench_store(results, f"{os.path.splitext(os.path.basename(project_path))[0]}-x{scale}", stages, pages, args.repeat, workdir)
+
+# =====================================================================
+#  Run files
+# =====================================================================
+def environment():
+    try: commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError): commit = None
+    try: tesseract = tesseract_version()
+    except Exception: tesseract = None
+    return {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+            'pymupdf': fitz.VersionBind, 'tesseract': tesseract}
+
+def compare(old_path, new_path):
+    runs = []
+    for path in (old_path, new_path):
+        with open(path, 'r', encoding='utf-8') as f: runs.append(json.load(f))
+    old = {(r['case'], r['stage']): r['seconds']['min'] for r in runs[0]['results']}
+    print(f"{'case':<22} {'stage':<12} {'old ms':>10} {'new ms':>10} {'change':>8}")
+    for r in runs[1]['results']:
+        key = (r['case'], r['stage'])
+        if key not in old: continue
+        before, after = old[key] * 1000, r['seconds']['min'] * 1000
+        print(f"{key[0]:<22} {key[1]:<12} {before:>10.1f} {after:>10.1f} {(after / before - 1) * 100 if before else 0.0:>+7.1f}%")
+
+def parse_stages(value):
+    stages = tuple(stage.strip() for stage in value.split(',') if stage.strip())
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown: raise argparse.ArgumentTypeError(f"unknown stage(s): {', '.join(unknown)}")
+    return stages
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stages', type=parse_stages, default=STAGES, help=f"comma-separated subset of {','.join(STAGES)}")
+    parser.add_argument('--quick', action='store_true', help=f"page counts {QUICK_PAGE_COUNTS} instead of {PAGE_COUNTS}")
+    parser.add_argument('--pages', type=int, nargs='+', help="page counts of the synthetic documents")
+    parser.add_argument('--repeat', type=int, default=3, help="timing repetitions per stage")
+    parser.add_argument('--ocr-pages', type=int, default=2, help="pages per document that go through tesseract")
+    parser.add_argument('--ocr-repeat', type=int, default=1)
+    parser.add_argument('--project', default=os.path.join(ROOT, 'test.json'), help="existing project for the save/load/export stages")
+    parser.add_argument('--project-scale', type=int, nargs='+', default=[1, 20], help="repeat the project's pages K times")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="results file (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="compare two results files instead of running")
+    args = parser.parse_args()
+    if args.compare: compare(*args.compare); return
+    env = environment(); args.tesseract = env['tesseract'] is not None
+    if 'ocr' in args.stages and not args.tesseract: print("tesseract not found; skipping the ocr stage", file=sys.stderr)
+    page_counts = args.pages or (QUICK_PAGE_COUNTS if args.quick else PAGE_COUNTS); results = []
+    print(f"{'case':<22} {'stage':<12} {'pages':>5} {'min ms':>10} {'median ms':>10} {'ms/page':>10}")
+    with tempfile.TemporaryDirectory(prefix='ocr-bench-') as workdir:
+        for script in SCRIPTS:
+            for density in DENSITIES:
+                for pages in page_counts:
+                    case = f"{script}-{density}-{pages}p"; pdf_path = os.path.join(workdir, case + '.pdf')
+                    make_pdf(pdf_path, script, density, pages, args.seed); bench_document(results, case, pdf_path, args.stages, args, workdir)
+        if os.path.exists(args.project):
+            for scale in args.project_scale: bench_project(results, args.project, scale, args.stages, args, workdir)
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': env, 'settings': {'page_counts': list(page_counts), 'repeat': args.repeat, 'seed': args.seed,
+                                                    'ocr_pages': args.ocr_pages, 'stages': list(args.stages)},
+                   'results': results}, f, indent=2)
+    print(f"results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Microbenchmark: Tesseract DATAFRAME -> word_data conversion.
+
+Rebuilds a pytesseract-style DataFrame for every page of test.json (words, boxes at
+the OCR zoom, block/paragraph numbers recovered from the blank-line separators, plus
+the rejected low-confidence and empty rows Tesseract always emits) and times the old
+per-row iterrows() loop against ocr_core.tesseract_data_to_page. Both outputs are
+checked to give the same text and the same word/char box for every text position.
+
+    python benchmarks/bench_word_data.py [--repeat N] [--scale K]
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+
+import pandas
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ocr_core import tesseract_data_to_page, is_rtl_char, MIN_CONFIDENCE
+from page_words import PageWords
+
+OCR_ZOOM = 2.0
+
+def legacy_loop(data, zoom_factor):
+    # The loop OCRWorker.run and OCRAllWorker.run each carried before the shared conversion.
+    data = data.dropna(subset=['text']); data = data[data.conf > MIN_CONFIDENCE]
+    full_text = ""; word_data = []; last_block, last_par, last_line = -1, -1, -1
+    for index, row in data.iterrows():
+        if last_block != -1:
+            block, par, line = row['block_num'], row['par_num'], row['line_num']
+            separator = " ";
+            if block != last_block or par != last_par: separator = '\n\n'
+            full_text += separator
+            for _ in separator: word_data.append(None)
+        last_block, last_par, last_line = row['block_num'], row['par_num'], row['line_num']
+        word_text = str(row['text']); full_text += word_text
+        x, y, w, h = row['left'], row['top'], row['width'], row['height']
+        normalized_word_bbox = [c / zoom_factor for c in [x, y, x + w, y + h]]; char_bboxes = []
+        if len(word_text) > 0:
+            char_width = w / len(word_text)
+            for i, char in enumerate(word_text):
+                char_x = x + (i * char_width); char_bboxes.append([c / zoom_factor for c in [char_x, y, char_x + char_width, y + h]])
+        if any(is_rtl_char(c) for c in word_text): char_bboxes.reverse()
+        for char_bbox in char_bboxes: word_data.append({'word_bbox': normalized_word_bbox, 'char_bbox': char_bbox})
+    return full_text, word_data
+
+def page_to_dataframe(page_data, scale=1):
+    """A DataFrame shaped like pytesseract's image_to_data output for one stored page."""
+    words = PageWords.from_json(page_data['word_data']); text = page_data['edited_text']
+    rows = []; block = 1
+    for repeat in range(scale):
+        previous_end = None
+        for index, start, length, bbox, rtl in words.iter_words():
+            if previous_end is not None and text[previous_end:start] == '\n\n': block += 1
+            x0, y0, x1, y1 = [int(round(c * OCR_ZOOM)) for c in bbox]; previous_end = start + length
+            rows.append((5, 1, block, 1, 1, index, x0, y0 + repeat, x1 - x0, y1 - y0, 91.5, text[start:start + length]))
+            if index % 7 == 0: rows.append((5, 1, block, 1, 1, index, x0, y0, 3, 3, 12.0, '~'))
+        rows.append((4, 1, block, 1, 1, 0, 0, 0, 10, 10, -1.0, None)); block += 1
+    columns = ['level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num', 'left', 'top', 'width', 'height', 'conf', 'text']
+    return pandas.DataFrame(rows, columns=columns)
+
+def check_same(legacy, vectorized):
+    (legacy_text, legacy_words), (text, words) = legacy, vectorized
+    assert legacy_text == text, "text differs"
+    assert len(legacy_words) == len(words), "word_data length differs"
+    for pos, item in enumerate(legacy_words):
+        boxes = words.boxes_at(pos)
+        if item is None: assert boxes is None, f"position {pos}: expected separator"; continue
+        for expected, got in zip((item['word_bbox'], item['char_bbox']), boxes):
+            assert all(abs(a - b) < 1e-9 for a, b in zip(expected, got)), f"position {pos}: {expected} != {got}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--project', default=os.path.join(ROOT, 'test.json'))
+    parser.add_argument('--repeat', type=int, default=20, help="timing repetitions per page")
+    parser.add_argument('--scale', type=int, default=1, help="stack each page K times to simulate denser pages")
+    args = parser.parse_args()
+    with open(args.project, 'r', encoding='utf-8') as f: pages = json.load(f)['ocr_data']
+    total_legacy = total_vectorized = 0.0
+    print(f"{'page':>5} {'words':>6} {'legacy ms':>10} {'vector ms':>10} {'speedup':>8}")
+    for page_key in sorted(pages, key=int):
+        data = page_to_dataframe(pages[page_key], args.scale)
+        check_same(legacy_loop(data, OCR_ZOOM), tesseract_data_to_page(data, OCR_ZOOM))
+        legacy = min(timeit.repeat(lambda: legacy_loop(data, OCR_ZOOM), number=1, repeat=args.repeat))
+        vectorized = min(timeit.repeat(lambda: tesseract_data_to_page(data, OCR_ZOOM), number=1, repeat=args.repeat))
+        total_legacy += legacy; total_vectorized += vectorized
+        print(f"{page_key:>5} {len(data):>6} {legacy * 1000:>10.2f} {vectorized * 1000:>10.2f} {legacy / vectorized:>7.1f}x")
+    print(f"{'all':>5} {'':>6} {total_legacy * 1000:>10.2f} {total_vectorized * 1000:>10.2f} {total_legacy / total_vectorized:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+import os
+import re
+import shutil
+import itertools
+import zipfile
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape, quoteattr
+
+import fitz
+import docx
+
+from page_words import TextAlignment
+from project_io import encode_page, decode_page
+
+# =====================================================================
+#  Document exports (Qt-free, shared by the GUI and the command line)
+# =====================================================================
+# Every export streams: pages come from an iterator in page order, each page is turned
+# into an XML fragment for every requested format, and the fragments are appended to
+# the open output files, so memory stays at a few pages whatever the document size.
+EXPORT_FORMATS = {'docx': '.docx', 'hocr': '.hocr', 'alto': '.xml', 'pdf': '.pdf'}
+EXPORT_FORMAT_NAMES = {'docx': 'Word Document', 'hocr': 'hOCR', 'alto': 'ALTO XML', 'pdf': 'Searchable PDF'}
+HOCR_DPI = 300  # hOCR boxes are integer pixels; page coordinates are points at 72 dpi
+ALTO_UNITS_PER_POINT = 1200 / 72  # ALTO MeasurementUnit inch1200
+# None: export_workers() always formats in this process. In bench_pipeline's export_xml / export_xml_2w stages the pool
+# has never paid for spawning and pickling (402 pages of test.json: 1.5 s serial, 3.5 s with 2 workers).
+PARALLEL_EXPORT_MIN_PAGES = None
+EXPORT_CHUNK_PAGES = 16
+SEARCHABLE_PDF_BATCH_PAGES = 100  # pages changed between incremental saves (and reopening the PDF, which frees them)
+EXPORT_TEMP_SUFFIX = '.tmp'  # files are written next to their destination and renamed over it when complete
+SOFTWARE_NAME = 'python-pdf-ocr'
+
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+def _xml_text(text): return escape(_XML_INVALID.sub('', text))
+def _xml_attr(text): return quoteattr(_XML_INVALID.sub('', text))
+
+# --- page layout from word_data ---------------------------------------------
+def layout_words(page_data):
+    """
+    (text, bbox, confidence, rtl, starts_paragraph) for every OCR word that is still in the
+    edited text, with the word's text as edited; words the user deleted are dropped.
+    A separator of two or more characters between words marks a new paragraph.
+    """
+    words = page_data['word_data']; text = page_data['edited_text']; alignment = page_data.get('alignment')
+    if alignment is not None: alignment = TextAlignment.from_json(alignment, len(words))
+    previous_end = None; new_paragraph = False
+    for index, start, length, bbox, rtl in words.iter_words():
+        new_paragraph = new_paragraph or (previous_end is not None and start - previous_end >= 2); previous_end = start + length
+        if alignment is None: word = text[start:start + length]
+        else:
+            positions = [p for p in map(alignment.to_edited, range(start, start + length)) if p >= 0]
+            word = text[min(positions):max(positions) + 1] if positions else ''
+        word = word.strip()
+        if not word: continue
+        yield word, bbox, float(words.conf[index]), rtl, new_paragraph; new_paragraph = False
+
+def _union(boxes):
+    return [min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes)]
+
+def page_layout(page_data):
+    """
+    [(paragraph box, [(line box, [(text, bbox, confidence, rtl)])])]. A word starts a new
+    line when it overlaps less than half the height of the line so far.
+    """
+    paragraphs = []; line_box = None
+    for text, bbox, conf, rtl, new_paragraph in layout_words(page_data):
+        x0, y0, x1, y1 = bbox
+        if line_box is not None and not new_paragraph and min(line_box[3], y1) - max(line_box[1], y0) >= 0.5 * min(line_box[3] - line_box[1], y1 - y0):
+            line_words.append((text, bbox, conf, rtl))
+            if x0 < line_box[0]: line_box[0] = x0
+            if y0 < line_box[1]: line_box[1] = y0
+            if x1 > line_box[2]: line_box[2] = x1
+            if y1 > line_box[3]: line_box[3] = y1
+            continue
+        line_box = list(bbox); line_words = [(text, bbox, conf, rtl)]
+        if new_paragraph or not paragraphs: paragraphs.append([])
+        paragraphs[-1].append((line_box, line_words))
+    return [(_union([box for box, _ in lines]), lines) for lines in paragraphs]
+
+def pdf_page_sizes(pdf_path):
+    """page key -> (width, height) in points, for the hOCR / ALTO page boxes."""
+    with fitz.open(pdf_path) as doc: return {str(n): (page.rect.width, page.rect.height) for n, page in enumerate(doc)}
+
+def _page_size(layout, size):
+    # Without the PDF, the page is taken to end where its last word does.
+    if size: return size
+    return tuple(_union([box for box, _ in layout])[2:]) if layout else (0.0, 0.0)
+
+# --- DOCX ---------------------------------------------------------------------
+DOCX_TEMPLATE = os.path.join(os.path.dirname(docx.__file__), 'templates', 'default.docx')
+DOCX_BODY_PART = 'word/document.xml'
+DOCX_PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+def docx_page_xml(page_key, page_data, size=None):
+    """The paragraph and page break python-docx's add_paragraph / add_page_break write for a page."""
+    runs = []
+    for piece in re.split(r'([\t\n\r])', page_data['edited_text']):
+        if piece == '\t': runs.append('<w:tab/>')
+        elif piece in ('\n', '\r'): runs.append('<w:br/>')
+        elif piece: runs.append(f'<w:t xml:space="preserve">{_xml_text(piece)}</w:t>' if piece.strip() != piece else f'<w:t>{_xml_text(piece)}</w:t>')
+    return (f'<w:p><w:r>{"".join(runs)}</w:r></w:p>' if runs else '<w:p/>') + DOCX_PAGE_BREAK
+
+class _DocxWriter:
+    """Copies python-docx's default template and streams the body of word/document.xml into it."""
+    def __init__(self, path):
+        self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+        with zipfile.ZipFile(DOCX_TEMPLATE) as template:
+            for item in template.infolist():
+                if item.filename == DOCX_BODY_PART: document = template.read(item).decode('utf-8')
+                else: self._zip.writestr(item, template.read(item))
+        body = document.index('<w:body>') + len('<w:body>'); section = document.index('<w:sectPr', body)
+        self._tail = document[section:]
+        self._body = self._zip.open(DOCX_BODY_PART, 'w', force_zip64=True); self._body.write(document[:body].encode('utf-8'))
+    def write(self, fragment): self._body.write(fragment.encode('utf-8'))
+    def close(self): self._body.write(self._tail.encode('utf-8')); self._body.close(); self._zip.close()
+    def abort(self): self._body.close(); self._zip.close()
+
+# --- hOCR ---------------------------------------------------------------------
+HOCR_SCALE = HOCR_DPI / 72
+
+def _hocr_bbox(box):
+    x0, y0, x1, y1 = box
+    return f'bbox {round(x0 * HOCR_SCALE)} {round(y0 * HOCR_SCALE)} {round(x1 * HOCR_SCALE)} {round(y1 * HOCR_SCALE)}'
+
+def hocr_page_html(page_key, page_data, size=None):
+    number = int(page_key) + 1; layout = page_layout(page_data); width, height = _page_size(layout, size); parts = []
+    parts.append(f"  <div class='ocr_page' id='page_{number}' title='ppageno {number - 1}; {_hocr_bbox((0, 0, width, height))}; "
+                 f"scan_res {HOCR_DPI} {HOCR_DPI}'>\n")
+    word_number = line_number = 0
+    for par_number, (par_box, lines) in enumerate(layout, 1):
+        parts.append(f"   <p class='ocr_par' id='par_{number}_{par_number}' title='{_hocr_bbox(par_box)}'>\n")
+        for line_box, line in lines:
+            line_number += 1
+            parts.append(f"    <span class='ocr_line' id='line_{number}_{line_number}' title='{_hocr_bbox(line_box)}'>")
+            for text, bbox, conf, _ in line:
+                word_number += 1; wconf = f"; x_wconf {round(conf)}" if conf >= 0 else ''
+                parts.append(f"<span class='ocrx_word' id='word_{number}_{word_number}' title='{_hocr_bbox(bbox)}{wconf}'>{_xml_text(text)}</span> ")
+            parts.append("</span>\n")
+        parts.append("   </p>\n")
+    parts.append("  </div>\n")
+    return ''.join(parts)
+
+def _hocr_head(pdf_path):
+    title = _xml_text(os.path.basename(pdf_path)) if pdf_path else ''
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">\n'
+            '<html xmlns="http://www.w3.org/1999/xhtml">\n <head>\n'
+            f'  <title>{title}</title>\n  <meta http-equiv="Content-Type" content="text/html;charset=utf-8"/>\n'
+            f'  <meta name="ocr-system" content="{SOFTWARE_NAME}"/>\n'
+            '  <meta name="ocr-capabilities" content="ocr_page ocr_par ocr_line ocrx_word"/>\n </head>\n <body>\n')
+
+# --- ALTO ---------------------------------------------------------------------
+def _alto_box(box):
+    x0, y0, x1, y1 = round(box[0] * ALTO_UNITS_PER_POINT), round(box[1] * ALTO_UNITS_PER_POINT), round(box[2] * ALTO_UNITS_PER_POINT), round(box[3] * ALTO_UNITS_PER_POINT)
+    return f'HPOS="{x0}" VPOS="{y0}" WIDTH="{x1 - x0}" HEIGHT="{y1 - y0}"'
+
+def alto_page_xml(page_key, page_data, size=None):
+    number = int(page_key) + 1; layout = page_layout(page_data); width, height = _page_size(layout, size); parts = []
+    page_box = _alto_box((0, 0, width, height))
+    parts.append(f'    <Page ID="page_{number}" PHYSICAL_IMG_NR="{number}" {page_box[page_box.index("WIDTH"):]}>\n')
+    parts.append(f'      <PrintSpace {page_box}>\n')
+    line_number = word_number = 0
+    for block_number, (block_box, lines) in enumerate(layout, 1):
+        parts.append(f'        <TextBlock ID="block_{number}_{block_number}" {_alto_box(block_box)}>\n')
+        for line_box, line in lines:
+            line_number += 1
+            parts.append(f'          <TextLine ID="line_{number}_{line_number}" {_alto_box(line_box)}>')
+            for i, (text, bbox, conf, _) in enumerate(line):
+                word_number += 1; wc = f' WC="{min(max(conf, 0.0), 100.0) / 100:.2f}"' if conf >= 0 else ''
+                if i: parts.append('<SP/>')
+                parts.append(f'<String ID="string_{number}_{word_number}" CONTENT={_xml_attr(text)} {_alto_box(bbox)}{wc}/>')
+            parts.append('</TextLine>\n')
+        parts.append('        </TextBlock>\n')
+    parts.append('      </PrintSpace>\n    </Page>\n')
+    return ''.join(parts)
+
+def _alto_head(pdf_path):
+    file_name = f'    <sourceImageInformation><fileName>{_xml_text(os.path.basename(pdf_path))}</fileName></sourceImageInformation>\n' if pdf_path else ''
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<alto xmlns="http://www.loc.gov/standards/alto/ns-v4#" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+            'xsi:schemaLocation="http://www.loc.gov/standards/alto/ns-v4# http://www.loc.gov/standards/alto/v4/alto-4-2.xsd">\n'
+            f'  <Description>\n    <MeasurementUnit>inch1200</MeasurementUnit>\n{file_name}'
+            f'    <OCRProcessing ID="ocr_0"><ocrProcessingStep><processingSoftware><softwareName>{SOFTWARE_NAME}</softwareName>'
+            '</processingSoftware></ocrProcessingStep></OCRProcessing>\n  </Description>\n  <Layout>\n')
+
+class _TextWriter:
+    def __init__(self, path, head, tail):
+        self._file = open(path, 'w', encoding='utf-8'); self._file.write(head); self._tail = tail
+    def write(self, fragment): self._file.write(fragment)
+    def close(self): self._file.write(self._tail); self._file.close()
+    def abort(self): self._file.close()
+
+# --- searchable PDF -----------------------------------------------------------
+def pdf_page_lines(page_key, page_data, size=None):
+    """
+    (page number, [(line box, [(run box, text, rtl)])]) to lay over the page, one entry
+    per line of page_layout(). A run is a stretch of consecutive words written in the
+    same direction, joined by spaces in reading order, so a line that does not mix
+    Hebrew with Latin or digits is a single run. None instead of the list for pages
+    taken from the PDF's own text layer.
+    """
+    if page_data.get('source') == 'native': return int(page_key), None
+    lines = []
+    for _, paragraph in page_layout(page_data):
+        for line_box, words in paragraph:
+            runs = []
+            for rtl, run in itertools.groupby(words, key=lambda word: word[3]):
+                run = list(run); runs.append((tuple(_union([word[1] for word in run])), ' '.join(word[0] for word in run), rtl))
+            lines.append((tuple(line_box), runs))
+    return int(page_key), lines
+
+def _text_width(text, font, advances):
+    # Width at font size 1, from per-character advances cached in advances (asking MuPDF per word is a third of the export time).
+    width = 0.0
+    for char in text:
+        advance = advances.get(char)
+        if advance is None: advance = advances[char] = font.text_length(char, fontsize=1.0)
+        width += advance
+    return width
+
+def add_text_layer(page, lines, font, advances=None):
+    """
+    Writes lines as invisible text (render mode 3) over their boxes, which are in the
+    coordinates of the page as displayed. All the runs of a line share one baseline and
+    the font size that makes the line's text exactly as wide as its box, within reason,
+    so text extraction sees one line and a phrase search matches across words. Runs go
+    into the content stream in reading order; right-to-left ones are written with
+    right_to_left, which lays the glyphs out from the right edge of the run's box.
+    """
+    writer = fitz.TextWriter(page.rect); descender = font.descender; advances = {} if advances is None else advances
+    for (x0, y0, x1, y1), runs in lines:
+        height = y1 - y0; width = _text_width(' '.join(text for _, text, _ in runs), font, advances)
+        fontsize = height if width <= 0 else min(max((x1 - x0) / width, 0.5 * height), 2.0 * height)
+        if fontsize <= 0: continue
+        baseline = y1 + descender * fontsize
+        for (run_x0, _, run_x1, _), text, rtl in runs:
+            # The trailing space separates the run from the next one; in a right-to-left run it is on the left.
+            text += ' '; x = run_x1 - _text_width(text, font, advances) * fontsize if rtl else run_x0
+            writer.append((x, baseline), text, font=font, fontsize=fontsize, right_to_left=rtl)
+    writer.write_text(page, render_mode=3)  # write_text itself undoes the page's /Rotate
+
+class _SearchablePdfWriter:
+    """
+    Copies the source PDF and adds a text layer page by page, saving incrementally
+    every SEARCHABLE_PDF_BATCH_PAGES pages and reopening the file, so a long book is
+    never held in memory with all of its pages changed.
+    """
+    def __init__(self, path, pdf_path):
+        if not pdf_path: raise ValueError("A searchable PDF needs the original PDF.")
+        self.path = path; shutil.copyfile(pdf_path, path); self._doc = fitz.open(path); self._changed = 0
+        if self._doc.needs_pass: self._doc.close(); raise ValueError(f"{pdf_path} is encrypted.")
+        if not self._doc.can_save_incrementally():
+            # A damaged file is repaired on opening; write it out whole once so the later saves can be incremental.
+            repaired = path + EXPORT_TEMP_SUFFIX; self._doc.save(repaired, garbage=1); self._doc.close(); os.replace(repaired, path); self._doc = fitz.open(path)
+        # Noto Serif Hebrew is built into MuPDF; the text is never drawn, so for other scripts only its ToUnicode mapping matters.
+        self._font = fitz.Font(script=fitz.UCDN_SCRIPT_HEBREW); self._advances = {}
+    def write(self, fragment):
+        page_number, lines = fragment
+        if not lines or page_number >= len(self._doc): return
+        add_text_layer(self._doc[page_number], lines, self._font, self._advances); self._changed += 1
+        if self._changed >= SEARCHABLE_PDF_BATCH_PAGES: self._save(); self._doc.close(); self._doc = fitz.open(self.path)
+    def _save(self):
+        if self._changed: self._doc.save(self.path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP, deflate=True); self._changed = 0
+    def close(self): self._save(); self._doc.close()
+    def abort(self): self._doc.close()
+
+PAGE_FORMATTERS = {'docx': docx_page_xml, 'hocr': hocr_page_html, 'alto': alto_page_xml, 'pdf': pdf_page_lines}
+
+def _open_writer(export_format, path, pdf_path):
+    if export_format == 'docx': return _DocxWriter(path)
+    if export_format == 'pdf': return _SearchablePdfWriter(path, pdf_path)
+    if export_format == 'hocr': return _TextWriter(path, _hocr_head(pdf_path), ' </body>\n</html>\n')
+    return _TextWriter(path, _alto_head(pdf_path), '  </Layout>\n</alto>\n')
+
+# --- driver -------------------------------------------------------------------
+class ExportCanceled(Exception):
+    pass
+
+def format_page(page_key, page_data, size, formats):
+    """The fragment of one page for each of formats."""
+    return [PAGE_FORMATTERS[export_format](page_key, page_data, size) for export_format in formats]
+
+def _format_encoded_pages(chunk, formats):
+    # Worker-process side: pages travel as encode_page records, which are far cheaper to pickle than PageWords.
+    return [format_page(page_key, decode_page(record), size, formats) for page_key, record, size in chunk]
+
+def export_pages(pages, targets, pdf_path=None, page_sizes=None, total=None, workers=1, progress=None, is_canceled=None):
+    """
+    Writes pages (an iterator of (page_key, page_data) in page order) to every
+    (format, path) of targets in one pass. With workers > 1, pages are formatted in that
+    many processes while this thread reads the next pages and writes finished ones, in
+    order; pages go out in chunks of EXPORT_CHUNK_PAGES with at most 2 * workers chunks
+    in flight. progress(pages_done, total) is
+    called after each page; is_canceled() returning True stops the export, deletes the
+    unfinished files and raises ExportCanceled. Each file is written as path + .tmp and
+    only replaces path when complete. Returns the number of pages written.
+    """
+    formats = [export_format for export_format, _ in targets]; temp_paths = []; writers = []
+    if pdf_path and page_sizes is None and set(formats) & {'hocr', 'alto'}: page_sizes = pdf_page_sizes(pdf_path)
+    page_sizes = page_sizes or {}; executor = None; pages_done = 0
+    try:
+        for export_format, path in targets:
+            if pdf_path and os.path.abspath(path) == os.path.abspath(pdf_path): raise ValueError(f"{path} is the original PDF; choose another file.")
+            temp_path = path + EXPORT_TEMP_SUFFIX; temp_paths.append(temp_path); writers.append(_open_writer(export_format, temp_path, pdf_path))
+
+        def write(fragments):
+            nonlocal pages_done
+            for writer, fragment in zip(writers, fragments): writer.write(fragment)
+            pages_done += 1
+            if progress: progress(pages_done, total)
+            if is_canceled and is_canceled(): raise ExportCanceled()
+
+        if workers > 1:
+            executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')); in_flight = deque(); chunk = []
+            for page_key, page_data in pages:
+                chunk.append((page_key, encode_page(page_data), page_sizes.get(page_key)))
+                if len(chunk) < EXPORT_CHUNK_PAGES: continue
+                in_flight.append(executor.submit(_format_encoded_pages, chunk, formats)); chunk = []
+                if len(in_flight) >= 2 * workers:
+                    for fragments in in_flight.popleft().result(): write(fragments)
+            if chunk: in_flight.append(executor.submit(_format_encoded_pages, chunk, formats))
+            while in_flight:
+                for fragments in in_flight.popleft().result(): write(fragments)
+        else:
+            for page_key, page_data in pages: write(format_page(page_key, page_data, page_sizes.get(page_key), formats))
+        for writer in writers: writer.close()
+        for temp_path, (_, path) in zip(temp_paths, targets): os.replace(temp_path, path)
+        return pages_done
+    except BaseException:
+        for writer in writers: writer.abort()
+        for temp_path in temp_paths:
+            if os.path.exists(temp_path): os.remove(temp_path)
+        raise
+    finally:
+        if executor: executor.shutdown(wait=True, cancel_futures=True)
+
+def export_workers(page_count, max_workers=None):
+    """How many formatting processes are worth starting for page_count pages."""
+    if PARALLEL_EXPORT_MIN_PAGES is None or page_count < PARALLEL_EXPORT_MIN_PAGES: return 1
+    return max(1, min(max_workers or os.cpu_count() or 1, 4))
+
+def export_docx(pages, save_path):
+    """Writes one paragraph plus a page break per page. pages yields (page_key, page_data) in page order."""
+    export_pages(pages, [('docx', save_path)])
@@ -0,0 +1,253 @@
+"""
+Multi-document OCR library: one SQLite file holding the pages of every OCR'd PDF,
+keyed by the PDF's content hash instead of its path, so a book that was copied or
+renamed is still the same book and is never OCR'd twice.
+
+    python library.py import old.json projects/*.ocrproj
+    python library.py export scans/book.pdf book.ocrproj
+    python library.py list
+    python library.py search מרכז
+"""
+import os
+import sys
+import time
+import zlib
+import socket
+import sqlite3
+import hashlib
+import argparse
+
+import fitz
+
+from project_io import encode_page, decode_page, load_project_file, save_project_archive, save_json_project, OCRPageStore
+from page_words import TextAlignment
+from text_index import tokenize, normalize_word
+
+# =====================================================================
+#  SQLite store keyed by PDF content hash (Qt-free)
+# =====================================================================
+def default_library_path():
+    base = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'python-pdf-ocr', 'library.sqlite3')
+
+SCHEMA_VERSION = 1
+CLAIM_TIMEOUT = 3600
+LIBRARY_BATCH_PAGES = 32  # pages per bulk insert for batch runs
+HASH_CHUNK_BYTES = 1024 * 1024
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY, content_hash TEXT NOT NULL UNIQUE, page_count INTEGER NOT NULL, title TEXT, added_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS document_paths (
+    path TEXT PRIMARY KEY, document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    size INTEGER NOT NULL, mtime REAL NOT NULL, seen_at REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS document_paths_by_document ON document_paths(document_id, seen_at);
+CREATE TABLE IF NOT EXISTS pages (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE, page_number INTEGER NOT NULL,
+    edited_text TEXT NOT NULL, source TEXT, record BLOB NOT NULL, updated_at REAL NOT NULL, updated_by TEXT,
+    PRIMARY KEY (document_id, page_number)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS words (
+    document_id INTEGER NOT NULL, page_number INTEGER NOT NULL, word TEXT NOT NULL, position INTEGER NOT NULL, length INTEGER NOT NULL,
+    x0 REAL, y0 REAL, x1 REAL, y1 REAL,
+    FOREIGN KEY (document_id, page_number) REFERENCES pages(document_id, page_number) ON DELETE CASCADE);
+CREATE INDEX IF NOT EXISTS words_by_word ON words(word);
+CREATE INDEX IF NOT EXISTS words_by_page ON words(document_id, page_number);
+CREATE TABLE IF NOT EXISTS claims (
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE, page_number INTEGER NOT NULL,
+    owner TEXT NOT NULL, claimed_at REAL NOT NULL, PRIMARY KEY (document_id, page_number)) WITHOUT ROWID;
+"""
+
+def file_content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''): digest.update(chunk)
+    return digest.hexdigest()
+
+def default_owner(): return f"{socket.gethostname()}:{os.getpid()}"
+
+def page_word_rows(document_id, page_number, page_data):
+    """words rows for one page: every word of the edited text with the box of its first character's OCR word."""
+    words = page_data['word_data']; alignment = page_data.get('alignment'); rows = []
+    if alignment is not None: alignment = TextAlignment.from_json(alignment, len(words))
+    for word, start, length in tokenize(page_data['edited_text']):
+        boxes = words.boxes_at(alignment.to_original(start) if alignment is not None else start)
+        rows.append((document_id, page_number, word, start, length, *(boxes[0] if boxes else (None,) * 4)))
+    return rows
+
+class LibraryDocument:
+    """
+    One document of a library seen through the ProjectArchive interface (page_keys,
+    read_raw, read_page, close), so OCRPageStore(archive=...) reads it page by page.
+    """
+    def __init__(self, library, document_id, owns_library=False):
+        self.library = library; self.document_id = document_id; self.pdf_path = library.document_path(document_id)
+        self._owns_library = owns_library
+    def page_keys(self): return [str(n) for n in self.library.page_numbers(self.document_id)]
+    def read_raw(self, page_key): return self.library.read_raw(self.document_id, int(page_key))
+    def read_page(self, page_key): return decode_page(self.read_raw(page_key))
+    def reopen(self): return LibraryDocument(OCRLibrary(self.library.path), self.document_id, owns_library=True)
+    def close(self):
+        if self._owns_library: self.library.close()
+
+class OCRLibrary:
+    """
+    Documents (by SHA-256 of the PDF bytes) and the paths they were seen at; pages as
+    compressed page records plus their edited text; a words table with the normalized
+    form of every word and its box for queries across the whole archive; and claims, so
+    that two runs over the same book split the pages instead of both OCRing them.
+    A connection belongs to the thread that opened it; other threads open their own
+    OCRLibrary on the same path (WAL mode lets readers and one writer overlap).
+    """
+    def __init__(self, path=None):
+        self.path = path or default_library_path(); os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=30); self._db.execute('PRAGMA foreign_keys = ON')
+        self._db.execute('PRAGMA journal_mode = WAL'); self._db.execute('PRAGMA synchronous = NORMAL')
+        version = self._db.execute('PRAGMA user_version').fetchone()[0]
+        if version > SCHEMA_VERSION: raise ValueError(f"{self.path} was written by a newer version (schema {version}).")
+        with self._db: self._db.executescript(SCHEMA); self._db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def close(self): self._db.close()
+
+    # --- documents ----------------------------------------------------------
+    def add_document(self, pdf_path):
+        """Document id for the PDF at pdf_path, adding it if its content is new. Hashing is skipped while size and mtime are unchanged."""
+        pdf_path = os.path.abspath(pdf_path); stat = os.stat(pdf_path)
+        row = self._db.execute('SELECT document_id, size, mtime FROM document_paths WHERE path = ?', (pdf_path,)).fetchone()
+        with self._db:
+            if row and row[1] == stat.st_size and row[2] == stat.st_mtime:
+                self._db.execute('UPDATE document_paths SET seen_at = ? WHERE path = ?', (time.time(), pdf_path)); return row[0]
+            content_hash = file_content_hash(pdf_path)
+            found = self._db.execute('SELECT id FROM documents WHERE content_hash = ?', (content_hash,)).fetchone()
+            if found: document_id = found[0]
+            else:
+                with fitz.open(pdf_path) as doc: page_count = len(doc)
+                document_id = self._db.execute('INSERT INTO documents (content_hash, page_count, title, added_at) VALUES (?, ?, ?, ?)',
+                                               (content_hash, page_count, os.path.splitext(os.path.basename(pdf_path))[0], time.time())).lastrowid
+            self._db.execute('INSERT OR REPLACE INTO document_paths (path, document_id, size, mtime, seen_at) VALUES (?, ?, ?, ?, ?)',
+                             (pdf_path, document_id, stat.st_size, stat.st_mtime, time.time()))
+        return document_id
+
+    def find_document(self, content_hash):
+        row = self._db.execute('SELECT id FROM documents WHERE content_hash = ?', (content_hash,)).fetchone()
+        return row[0] if row else None
+
+    def document_path(self, document_id):
+        """The path the document was last seen at (it may have moved since)."""
+        row = self._db.execute('SELECT path FROM document_paths WHERE document_id = ? ORDER BY seen_at DESC LIMIT 1', (document_id,)).fetchone()
+        return row[0] if row else None
+
+    def documents(self):
+        """(id, content_hash, title, page_count, pages done) for every document."""
+        return self._db.execute('SELECT d.id, d.content_hash, d.title, d.page_count, COUNT(p.page_number) FROM documents d '
+                                'LEFT JOIN pages p ON p.document_id = d.id GROUP BY d.id ORDER BY d.title').fetchall()
+
+    def document_view(self, document_id): return LibraryDocument(self, document_id)
+
+    # --- pages --------------------------------------------------------------
+    def page_numbers(self, document_id):
+        return [row[0] for row in self._db.execute('SELECT page_number FROM pages WHERE document_id = ? ORDER BY page_number', (document_id,))]
+
+    def read_raw(self, document_id, page_number):
+        row = self._db.execute('SELECT record FROM pages WHERE document_id = ? AND page_number = ?', (document_id, page_number)).fetchone()
+        if row is None: raise KeyError(page_number)
+        return zlib.decompress(row[0])
+
+    def get_page(self, document_id, page_number):
+        try: return decode_page(self.read_raw(document_id, page_number))
+        except KeyError: return None
+
+    def put_pages(self, document_id, pages, owner=None):
+        """Writes (page_key, page_data) pairs and their words in one transaction; returns how many pages were written."""
+        owner = owner or default_owner(); now = time.time(); page_rows = []; word_rows = []
+        for page_key, page_data in pages:
+            page_number = int(page_key)
+            page_rows.append((document_id, page_number, page_data['edited_text'], page_data.get('source', 'ocr'),
+                              zlib.compress(encode_page(page_data)), now, owner))
+            word_rows.extend(page_word_rows(document_id, page_number, page_data))
+        if not page_rows: return 0
+        with self._db:
+            self._db.executemany('DELETE FROM words WHERE document_id = ? AND page_number = ?', [row[:2] for row in page_rows])
+            self._db.executemany('INSERT OR REPLACE INTO pages (document_id, page_number, edited_text, source, record, updated_at, updated_by) '
+                                 'VALUES (?, ?, ?, ?, ?, ?, ?)', page_rows)
+            self._db.executemany('INSERT INTO words (document_id, page_number, word, position, length, x0, y0, x1, y1) '
+                                 'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', word_rows)
+            self._db.executemany('DELETE FROM claims WHERE document_id = ? AND page_number = ?', [row[:2] for row in page_rows])
+        return len(page_rows)
+
+    def put_page(self, document_id, page_key, page_data, owner=None): self.put_pages(document_id, [(page_key, page_data)], owner)
+
+    # --- claims -------------------------------------------------------------
+    def claim_pages(self, document_id, page_numbers, owner=None, timeout=CLAIM_TIMEOUT):
+        """
+        Claims the pages that are neither stored nor claimed by someone else within the
+        last timeout seconds, and returns them; an interrupted run's claims simply expire.
+        """
+        owner = owner or default_owner(); now = time.time()
+        with self._db:
+            self._db.execute('BEGIN IMMEDIATE')
+            self._db.execute('DELETE FROM claims WHERE claimed_at < ?', (now - timeout,))
+            done = set(self.page_numbers(document_id))
+            taken = {row[0] for row in self._db.execute('SELECT page_number FROM claims WHERE document_id = ? AND owner != ?', (document_id, owner))}
+            claimed = [n for n in page_numbers if n not in done and n not in taken]
+            self._db.executemany('INSERT OR REPLACE INTO claims (document_id, page_number, owner, claimed_at) VALUES (?, ?, ?, ?)',
+                                 [(document_id, n, owner, now) for n in claimed])
+        return claimed
+
+    def release_claims(self, document_id, owner=None):
+        with self._db: self._db.execute('DELETE FROM claims WHERE document_id = ? AND owner = ?', (document_id, owner or default_owner()))
+
+    # --- queries ------------------------------------------------------------
+    def search_words(self, word, limit=100):
+        """(document_id, title, page_number, position, length, bbox) for a word, or a prefix ending in *, across all documents."""
+        prefix = word.endswith('*'); term = normalize_word(word.rstrip('*'))
+        if prefix: where, params = 'w.word >= ? AND w.word < ?', (term, term + '\U0010ffff')
+        else: where, params = 'w.word = ?', (term,)
+        rows = self._db.execute(f'SELECT w.document_id, d.title, w.page_number, w.position, w.length, w.x0, w.y0, w.x1, w.y1 FROM words w '
+                                f'JOIN documents d ON d.id = w.document_id WHERE {where} ORDER BY d.title, w.page_number, w.position LIMIT ?',
+                                (*params, limit)).fetchall()
+        return [(*row[:5], row[5:] if row[5] is not None else None) for row in rows]
+
+    # --- projects -----------------------------------------------------------
+    def import_project(self, project_path):
+        """Copies a JSON or .ocrproj project into the library; the PDF it names has to exist, since it is keyed by content."""
+        pdf_path, store = load_project_file(project_path)
+        try:
+            if not pdf_path or not os.path.exists(pdf_path): raise FileNotFoundError(f"{project_path}: its PDF {pdf_path!r} was not found.")
+            document_id = self.add_document(pdf_path); return document_id, self.put_pages(document_id, store.iter_sorted())
+        finally: store.clear()
+
+    def export_project(self, document_id, save_path, pdf_path=None):
+        """Writes a document as a project (JSON when save_path ends in .json, otherwise .ocrproj)."""
+        pdf_path = pdf_path or self.document_path(document_id); store = OCRPageStore(archive=self.document_view(document_id))
+        if save_path.lower().endswith('.json'): save_json_project(save_path, pdf_path, store)
+        else: save_project_archive(save_path, pdf_path, store)
+        store.clear()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the OCR library.")
+    parser.add_argument('--library', default=None, help=f"library file (default {default_library_path()})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help="add JSON / .ocrproj projects"); import_parser.add_argument('projects', nargs='+')
+    export_parser = commands.add_parser('export', help="write a document's pages as a project")
+    export_parser.add_argument('pdf', help="the PDF (found by content, wherever it is now)"); export_parser.add_argument('output')
+    commands.add_parser('list', help="documents and how many pages are done")
+    search_parser = commands.add_parser('search', help="find a word (or prefix*) in every document"); search_parser.add_argument('word')
+    args = parser.parse_args(argv); library = OCRLibrary(args.library)
+    try:
+        if args.command == 'import':
+            for project_path in args.projects:
+                try: document_id, count = library.import_project(project_path); print(f"{project_path}: {count} pages -> document {document_id}")
+                except (OSError, ValueError, KeyError) as e: print(f"skip {e}", file=sys.stderr)
+        elif args.command == 'export':
+            document_id = library.find_document(file_content_hash(args.pdf))
+            if document_id is None: print(f"{args.pdf} is not in the library.", file=sys.stderr); return 1
+            library.export_project(document_id, args.output, os.path.abspath(args.pdf)); print(f"Exported to {args.output}")
+        elif args.command == 'list':
+            for document_id, content_hash, title, page_count, done in library.documents(): print(f"{content_hash[:12]}  {done:>5}/{page_count:<5} {title}")
+        else:
+            for document_id, title, page_number, position, length, bbox in library.search_words(args.word): print(f"{title}  page {page_number + 1}  @{position}")
+    finally:
+        library.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import os
+import json
+import zlib
+import hashlib
+import tempfile
+
+from project_io import encode_page, decode_page
+
+# =====================================================================
+#  Persistent, content-addressed OCR result cache
+# =====================================================================
+def default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'python-pdf-ocr', 'ocr-results')
+
+DEFAULT_CACHE_LIMIT = 512 * 1024 * 1024
+
+def make_cache_key(pix, ocr_params):
+    """Hashes the rendered page image together with every parameter that changes Tesseract's output."""
+    digest = hashlib.sha256()
+    digest.update(f"{pix.width}x{pix.height}x{pix.n}:".encode('ascii')); digest.update(pix.samples)
+    digest.update(json.dumps(ocr_params, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+class OCRResultCache:
+    """
+    One compressed page record per file under directory/<key[:2]>/<key>. The file mtime
+    is the LRU clock: hits touch it, and put() evicts the oldest entries once the total
+    size passes max_bytes. Writes go through a temp file + rename, so several worker
+    processes can share one cache directory.
+    """
+    def __init__(self, directory=None, max_bytes=DEFAULT_CACHE_LIMIT):
+        self.directory = directory or default_cache_dir(); self.max_bytes = max_bytes
+        self.hits = 0; self.misses = 0; self._total_bytes = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key): return os.path.join(self.directory, key[:2], key)
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir(): continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and not entry.name.startswith('.'): yield entry
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f: page_data = decode_page(zlib.decompress(f.read()))
+            os.utime(path)
+        except (OSError, ValueError, zlib.error):
+            self.misses += 1; return None
+        self.hits += 1
+        return page_data
+
+    def put(self, key, page_data):
+        path = self._path(key); os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = zlib.compress(encode_page(page_data))
+        fd, temp_path = tempfile.mkstemp(prefix='.', dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f: f.write(record)
+        os.replace(temp_path, path)
+        if self._total_bytes is None: self._total_bytes = sum(entry.stat().st_size for entry in self._entries())
+        else: self._total_bytes += len(record)
+        if self._total_bytes > self.max_bytes: self.evict()
+
+    def evict(self):
+        """Deletes least recently used entries until the cache is back under max_bytes."""
+        entries = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in self._entries()))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes: break
+            try: os.remove(path); total -= size
+            except OSError: pass
+        self._total_bytes = total
+
+    def clear(self):
+        for entry in list(self._entries()):
+            try: os.remove(entry.path)
+            except OSError: pass
+        self._total_bytes = 0
+
+    def stats(self):
+        sizes = [entry.stat().st_size for entry in self._entries()]
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(sizes), 'bytes': sum(sizes), 'max_bytes': self.max_bytes}
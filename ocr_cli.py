@@ -0,0 +1,205 @@
+"""
+Headless batch OCR: the same pipeline as "Run OCR on All Pages", without Qt.
+
+    python ocr_cli.py scans/ more.pdf -o out/ -j 16 --format ocrproj --resume
+
+Every finished page is appended to <output>.partial as it arrives; a run that was
+cut short picks up from there with --resume, and the partial journal is replaced by
+the real output once all pages of a PDF are done.
+
+With --format library, pages go straight into the OCR library (library.py) in bulk
+transactions instead; pages the library already has, or that another run has
+claimed, are skipped.
+"""
+import os
+import sys
+import time
+import argparse
+
+import fitz
+
+from ocr_core import ParallelOCRBatch, OCRBatchError, ENGINES, DEFAULT_ENGINE, DEFAULT_OCR_ZOOM, AUTO_ZOOM
+from ocr_cache import default_cache_dir, DEFAULT_CACHE_LIMIT
+from project_io import (OCRPageStore, PageJournal, PROJECT_EXTENSION, read_journal, replay_journal,
+                        save_project_archive, save_json_project, JOURNAL_PAGE)
+from exporters import export_pages, EXPORT_FORMATS
+from preprocessing import PREPROCESS_STEPS
+from perf_trace import TRACER
+from library import OCRLibrary, default_library_path, LIBRARY_BATCH_PAGES
+
+OUTPUT_EXTENSIONS = {'ocrproj': PROJECT_EXTENSION, 'json': '.json', **EXPORT_FORMATS, 'pdf': '.searchable.pdf', 'library': None}
+
+def find_pdfs(inputs, recursive=False):
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith('.pdf'): yield os.path.join(root, name)
+                if not recursive: break
+                dirs.sort()
+        else:
+            yield path
+
+class DocumentJob:
+    """Per-PDF bookkeeping: which pages are still missing and where finished ones are journaled (or batched for the library)."""
+    def __init__(self, pdf_path, output_path, output_format, resume, library=None):
+        self.pdf_path = os.path.abspath(pdf_path); self.output_path = output_path; self.output_format = output_format
+        self.done_pages = set(); self.failed = None; self.library = library; self._pending = []
+        with fitz.open(self.pdf_path) as doc: self.page_count = len(doc)
+        if library is not None:
+            # Stored pages and pages another run is working on count as done for this run.
+            self.document_id = library.add_document(self.pdf_path); self.partial_path = None
+            self.done_pages = set(range(self.page_count)) - set(library.claim_pages(self.document_id, range(self.page_count)))
+        else:
+            self.partial_path = output_path + '.partial'
+            if resume and os.path.exists(self.partial_path):
+                self.done_pages = {int(page_key) for kind, page_key, _ in read_journal(self.partial_path) if kind == JOURNAL_PAGE}
+        self._journal = None; self._resume = resume; self.started = None; self.pages_this_run = 0
+
+    @property
+    def missing_pages(self): return [p for p in range(self.page_count) if p not in self.done_pages]
+
+    def record(self, page_number, page_data):
+        if self.library is not None:
+            self._pending.append((str(page_number), page_data))
+            if len(self._pending) >= LIBRARY_BATCH_PAGES: self.flush()
+        else:
+            if self._journal is None: self._journal = PageJournal(self.partial_path, truncate=not self._resume)
+            self._journal.append_page(str(page_number), page_data)
+        self.done_pages.add(page_number); self.pages_this_run += 1
+
+    def flush(self):
+        if self._pending: self.library.put_pages(self.document_id, self._pending); self._pending = []
+
+    def finish(self):
+        if self.library is not None:
+            self.flush(); self.library.release_claims(self.document_id)
+            return not self.failed
+        if self._journal: self._journal.close(); self._journal = None
+        if self.failed or len(self.done_pages) < self.page_count: return False
+        store = OCRPageStore()
+        if os.path.exists(self.partial_path): replay_journal(self.partial_path, store)
+        if self.output_format in EXPORT_FORMATS: export_pages(store.iter_sorted(), [(self.output_format, self.output_path)], self.pdf_path)
+        elif self.output_format == 'json': save_json_project(self.output_path, self.pdf_path, store)
+        else: save_project_archive(self.output_path, self.pdf_path, store); store.clear()
+        if os.path.exists(self.partial_path): os.remove(self.partial_path)
+        return True
+
+def output_path_for(pdf_path, output_dir, output_format):
+    if OUTPUT_EXTENSIONS[output_format] is None: return None
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(output_dir or os.path.dirname(os.path.abspath(pdf_path)), stem + OUTPUT_EXTENSIONS[output_format])
+
+def parse_steps(value):
+    steps = PREPROCESS_STEPS if value == 'all' else tuple(step.strip() for step in value.split(',') if step.strip())
+    unknown = [step for step in steps if step not in PREPROCESS_STEPS]
+    if unknown: raise argparse.ArgumentTypeError(f"unknown preprocessing step(s): {', '.join(unknown)}")
+    return steps
+
+def parse_zoom(value):
+    if value == AUTO_ZOOM: return value
+    try: zoom = float(value)
+    except ValueError: raise argparse.ArgumentTypeError(f"expected a number or '{AUTO_ZOOM}', got {value!r}")
+    if zoom <= 0: raise argparse.ArgumentTypeError("zoom must be positive")
+    return zoom
+
+def log(message): print(message, file=sys.stderr, flush=True)
+
+def run(args):
+    library = OCRLibrary(args.library) if args.format == 'library' else None
+    try: return run_jobs(args, library)
+    finally:
+        if library: library.close()
+
+def run_jobs(args, library):
+    jobs = []
+    for pdf_path in find_pdfs(args.inputs, args.recursive):
+        output_path = output_path_for(pdf_path, args.output_dir, args.format)
+        if args.resume and output_path and os.path.exists(output_path): log(f"skip {pdf_path}: {output_path} already exists"); continue
+        try: job = DocumentJob(pdf_path, output_path, args.format, args.resume, library)
+        except Exception as e: log(f"skip {pdf_path}: {e}"); continue
+        jobs.append(job)
+        if job.done_pages and library: log(f"library {pdf_path}: {len(job.done_pages)}/{job.page_count} pages stored or claimed by another run")
+        elif job.done_pages: log(f"resume {pdf_path}: {len(job.done_pages)}/{job.page_count} pages already done")
+    if not jobs: log("Nothing to do."); return 0
+    if args.output_dir: os.makedirs(args.output_dir, exist_ok=True)
+    by_path = {job.pdf_path: job for job in jobs}; remaining = {job.pdf_path: len(job.missing_pages) for job in jobs}
+    tasks = [(job.pdf_path, page_number) for job in jobs for page_number in job.missing_pages]
+    if not tasks:
+        for job in jobs: job.finish()
+        log("Nothing to do: every page is already done."); return 0
+    cache_dir = None if args.no_cache else (args.cache_dir or default_cache_dir())
+    batch = ParallelOCRBatch(tasks, args.zoom, args.jobs, cache_dir, args.cache_limit * 1024 * 1024,
+                             args.engine, not args.no_text_layer, args.preprocess)
+    log(f"{len(tasks)} pages in {len(jobs)} PDFs, {batch.max_workers} workers ({args.engine})")
+    if args.trace: TRACER.start_recording()
+    started = time.perf_counter(); pages_done = 0; failures = 0
+
+    def finish_job(job):
+        nonlocal failures
+        elapsed = time.perf_counter() - (job.started or started)
+        if job.finish():
+            rate = job.pages_this_run / elapsed if elapsed > 0 else 0.0
+            log(f"done {job.pdf_path} -> {job.output_path or library.path} ({job.pages_this_run} pages in {elapsed:.1f} s, {rate:.2f} pages/s)")
+        else:
+            failures += 1; log(f"FAILED {job.pdf_path}: {job.failed or 'incomplete'} (resume with --resume)")
+
+    for job in jobs:
+        if remaining[job.pdf_path] == 0: finish_job(job)
+    try:
+        for page_number, page_data, error, info in batch.results():
+            job = by_path[info['pdf_path']]; job.started = job.started or time.perf_counter() - info.get('seconds', 0.0)
+            if error: job.failed = job.failed or f"page {page_number + 1}: {error}"
+            else: job.record(page_number, page_data)
+            pages_done += 1; remaining[job.pdf_path] -= 1
+            if not args.quiet:
+                elapsed = time.perf_counter() - started; source = "cache" if info.get('cache_hit') else info.get('source', 'ocr')
+                status = f"error: {error}" if error else f"{info.get('seconds', 0.0):.2f} s ({source})"
+                if args.zoom == AUTO_ZOOM and 'ocr_zoom' in info: status += f" at {info['ocr_zoom']:g}x"
+                if 'preprocess_seconds' in info: status += f", preprocessing {info['preprocess_seconds'] * 1000:.0f} ms"
+                log(f"[{pages_done}/{len(tasks)}] {os.path.basename(job.pdf_path)} page {page_number + 1}: {status}; "
+                    f"overall {pages_done / elapsed:.2f} pages/s")
+            if remaining[job.pdf_path] == 0: finish_job(job)
+    except KeyboardInterrupt:
+        batch.cancel(); log("Interrupted; finished pages are kept, rerun with --resume to continue.")
+        for job in jobs:
+            if remaining[job.pdf_path]: job.finish()
+        return 130
+    except OCRBatchError as e:
+        log(str(e)); return 1
+    finally:
+        batch.close()
+        if args.trace: log(f"wrote {TRACER.write_chrome_trace(args.trace)} trace events to {args.trace}")
+    elapsed = time.perf_counter() - started
+    log(f"{pages_done} pages in {elapsed:.1f} s ({pages_done / elapsed if elapsed > 0 else 0.0:.2f} pages/s); "
+        f"{batch.native_pages} from the text layer, {batch.ocr_pages} OCR'd; OCR cache: {batch.cache_hits} hits, {batch.cache_misses} misses")
+    if args.trace:
+        log("mean per page: " + ', '.join(f"{name} {mean * 1000:.1f} ms" for name, (count, last, mean, worst) in TRACER.stats().items()))
+    return 1 if failures else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch OCR PDFs without the GUI.")
+    parser.add_argument('inputs', nargs='+', help="PDF files and/or directories containing PDFs")
+    parser.add_argument('-o', '--output-dir', help="where to write results (default: next to each PDF)")
+    parser.add_argument('-f', '--format', choices=sorted(OUTPUT_EXTENSIONS), default='ocrproj',
+                        help="'library' stores pages in the OCR library instead of writing files")
+    parser.add_argument('--library', help=f"library file for --format library (default {default_library_path()})")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="number of OCR worker processes")
+    parser.add_argument('-r', '--recursive', action='store_true', help="search directories recursively")
+    parser.add_argument('--zoom', type=parse_zoom, default=DEFAULT_OCR_ZOOM,
+                        help=f"render zoom used for OCR, or '{AUTO_ZOOM}' to pick it per page from the text size")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default=DEFAULT_ENGINE,
+                        help="tesserocr keeps one Tesseract instance per worker instead of a process per page")
+    parser.add_argument('--no-text-layer', action='store_true', help="OCR every page, even where the PDF has usable text")
+    parser.add_argument('--preprocess', type=parse_steps, default=(), metavar='STEPS',
+                        help=f"comma-separated image steps before OCR: {','.join(PREPROCESS_STEPS)} or 'all'")
+    parser.add_argument('--resume', action='store_true', help="skip finished PDFs and pages from an interrupted run")
+    parser.add_argument('--no-cache', action='store_true', help="do not use the OCR result cache")
+    parser.add_argument('--cache-dir', help="OCR result cache directory")
+    parser.add_argument('--cache-limit', type=int, default=DEFAULT_CACHE_LIMIT // (1024 * 1024), help="OCR cache size limit in MB")
+    parser.add_argument('--trace', metavar='FILE', help="write per-stage timings as a Chrome/Perfetto trace (JSON)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only report per-file summaries")
+    return run(parser.parse_args(argv))
+
+if __name__ == "__main__":
+    sys.exit(main())
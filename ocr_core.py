@@ -0,0 +1,419 @@
+import io
+import math
+import os
+import csv
+import queue
+import time
+import signal
+import threading
+import functools
+import contextlib
+import multiprocessing
+from array import array
+
+import fitz
+import numpy as np
+import pandas
+import pytesseract
+from PIL import Image
+
+from page_words import PageWords, is_rtl_char
+from ocr_cache import OCRResultCache, DEFAULT_CACHE_LIMIT, make_cache_key
+from preprocessing import PREPROCESS_STEPS, preprocess_pixmap
+from perf_trace import TRACER, timed, now
+
+# =====================================================================
+#  Qt-free OCR pipeline shared by the GUI workers and the batch pool
+# =====================================================================
+OCR_LANG = 'heb'
+MIN_CONFIDENCE = 30
+TESSERACT_TIMEOUT = 30
+RTL_PATTERN = '[\u0590-\u05FF]'
+
+def _to_array(typecode, values):
+    result = array(typecode); result.frombytes(np.ascontiguousarray(values, dtype=typecode).tobytes())
+    return result
+
+def tesseract_data_to_page(data, zoom_factor):
+    """
+    Turns a pytesseract DATAFRAME into (full_text, PageWords) in 1.0x page coordinates.
+    Words are joined with a space, or with a blank line when the block or paragraph
+    changes; offsets, boxes and the position-to-word map are computed column-wise.
+    """
+    data = data.dropna(subset=['text']); data = data[data.conf > MIN_CONFIDENCE]
+    texts = data['text'].astype(str); count = len(texts)
+    if count == 0: return "", PageWords()
+    words = texts.tolist(); lengths = texts.str.len().to_numpy(dtype=np.int64)
+    block = data['block_num'].to_numpy(); par = data['par_num'].to_numpy()
+    new_par = (block[1:] != block[:-1]) | (par[1:] != par[:-1])
+    separator_lengths = np.concatenate(([0], np.where(new_par, 2, 1)))
+    ends = np.cumsum(separator_lengths + lengths); starts = ends - lengths; text_length = int(ends[-1])
+    parts = [None] * (2 * count - 1); parts[0::2] = words; parts[1::2] = np.where(new_par, '\n\n', ' ').tolist()
+    full_text = ''.join(parts)
+    left = data['left'].to_numpy(dtype=np.float64); top = data['top'].to_numpy(dtype=np.float64)
+    right = left + data['width'].to_numpy(dtype=np.float64); bottom = top + data['height'].to_numpy(dtype=np.float64)
+    boxes = np.column_stack((left, top, right, bottom)) / zoom_factor
+    rtl = texts.str.contains(RTL_PATTERN, regex=True).to_numpy(dtype=np.int8)
+    word_ids = np.repeat(np.arange(count, dtype=np.int32), lengths)
+    offsets_in_word = np.arange(len(word_ids)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    pos_to_word = np.full(text_length, -1, dtype=np.int32); pos_to_word[np.repeat(starts, lengths) + offsets_in_word] = word_ids
+    word_data = PageWords.from_columns(_to_array('d', boxes.ravel()), _to_array('i', starts), _to_array('i', lengths), _to_array('b', rtl),
+                                       _to_array('f', data['conf'].to_numpy()), text_length, _to_array('i', pos_to_word))
+    return full_text, word_data
+
+# =====================================================================
+#  Tesseract engines: a subprocess per page, or a reusable in-process API
+# =====================================================================
+TSV_COLUMNS = ['level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num', 'left', 'top', 'width', 'height', 'conf', 'text']
+DEFAULT_ENGINE = 'pytesseract'
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+@functools.lru_cache(maxsize=None)
+def tesseract_version():
+    return str(pytesseract.get_tesseract_version())
+
+class PytesseractEngine:
+    """Starts the tesseract executable for every page (image goes through a temp file)."""
+    name = 'pytesseract'
+    def image_to_data(self, pix):
+        pil_image = Image.frombytes("L" if pix.n == 1 else "RGB", (pix.width, pix.height), pix.samples)
+        return pytesseract.image_to_data(pil_image, lang=OCR_LANG, output_type=pytesseract.Output.DATAFRAME, timeout=TESSERACT_TIMEOUT)
+
+    def version(self): return tesseract_version()
+    def close(self): pass
+
+class TesserocrEngine:
+    """
+    One initialized libtesseract instance (traineddata loaded once), fed the pixmap
+    buffer directly. Its TSV is parsed exactly like pytesseract's, so the DataFrame
+    and everything derived from it match the subprocess engine. Not thread-safe:
+    use one per thread or process, e.g. through EnginePool.
+    """
+    name = 'tesserocr'
+    def __init__(self, lang=OCR_LANG):
+        if tesserocr is None: raise RuntimeError("The tesserocr engine needs the 'tesserocr' package.")
+        self._api = tesserocr.PyTessBaseAPI(lang=lang)
+
+    def image_to_data(self, pix):
+        self._api.SetImageBytes(pix.samples, pix.width, pix.height, pix.n, pix.stride)
+        if not self._api.Recognize(TESSERACT_TIMEOUT * 1000): raise RuntimeError("Tesseract timed out or failed on this page.")
+        tsv = self._api.GetTSVText(0); self._api.Clear()
+        return pandas.read_csv(io.StringIO(tsv), sep='\t', quoting=csv.QUOTE_NONE, header=None, names=TSV_COLUMNS)
+
+    def version(self): return f"tesserocr {tesserocr.tesseract_version().split()[1]}"
+    def close(self): self._api.End()
+
+ENGINES = {'pytesseract': PytesseractEngine, 'tesserocr': TesserocrEngine}
+
+def available_engines():
+    return [name for name in ENGINES if name != 'tesserocr' or tesserocr is not None]
+
+def create_engine(name=DEFAULT_ENGINE):
+    if name not in ENGINES: raise ValueError(f"Unknown OCR engine: {name}")
+    return ENGINES[name]()
+
+class EnginePool:
+    """Keeps initialized engines alive between pages; each one is lent to a single thread at a time."""
+    def __init__(self, name=DEFAULT_ENGINE):
+        self.name = name; self._idle = queue.SimpleQueue()
+
+    @contextlib.contextmanager
+    def engine(self):
+        try: engine = self._idle.get_nowait()
+        except queue.Empty: engine = create_engine(self.name)
+        try: yield engine
+        finally: self._idle.put(engine)
+
+    def close(self):
+        while True:
+            try: self._idle.get_nowait().close()
+            except queue.Empty: break
+
+_default_engine = PytesseractEngine()
+
+def ocr_pixmap(pix, zoom_factor, engine=None, preprocess=(), info=None):
+    """
+    Runs Tesseract on a fitz.Pixmap rendered at zoom_factor and returns a page_data dict.
+    preprocess lists PREPROCESS_STEPS to apply first; their time goes to info['preprocess_seconds'].
+    The preprocess / tesseract / word_data stage timings are appended to info['stages'].
+    """
+    engine = engine or _default_engine; stages = [] if info is None else info.setdefault('stages', [])
+    if preprocess:
+        with timed(stages, 'preprocess'): prepared = preprocess_pixmap(pix, preprocess)
+        with timed(stages, 'tesseract'): data = prepared.restore_boxes(engine.image_to_data(prepared.image))
+        if info is not None: info['preprocess_seconds'] = prepared.seconds
+    else:
+        with timed(stages, 'tesseract'): data = engine.image_to_data(pix)
+    with timed(stages, 'word_data'): full_text, word_data = tesseract_data_to_page(data, zoom_factor)
+    return {'word_data': word_data, 'edited_text': full_text}
+
+def ocr_params(zoom_factor, engine=None, preprocess=()):
+    """Everything besides the image that goes into a result; part of the OCR cache key."""
+    params = {'lang': OCR_LANG, 'zoom': zoom_factor, 'min_conf': MIN_CONFIDENCE, 'tesseract': (engine or _default_engine).version()}
+    if preprocess: params['preprocess'] = [step for step in PREPROCESS_STEPS if step in preprocess]
+    return params
+
+def run_page_ocr(pix, zoom_factor, cache=None, engine=None, preprocess=()):
+    """OCRs a rendered page through the optional OCRResultCache. Returns (page_data, info); info['stages'] has the stage timings."""
+    info = {'cache_hit': False, 'stages': []}
+    if cache is None: return ocr_pixmap(pix, zoom_factor, engine, preprocess, info), info
+    with timed(info['stages'], 'cache_lookup'): key = make_cache_key(pix, ocr_params(zoom_factor, engine, preprocess)); page_data = cache.get(key)
+    if page_data is not None: info['cache_hit'] = True; return page_data, info
+    page_data = ocr_pixmap(pix, zoom_factor, engine, preprocess, info)
+    with timed(info['stages'], 'cache_store'): cache.put(key, page_data)
+    return page_data, info
+
+def render_page_for_ocr(doc, page_number, zoom_factor):
+    page = doc.load_page(page_number); mat = fitz.Matrix(zoom_factor, zoom_factor)
+    return page.get_pixmap(matrix=mat)
+
+# =====================================================================
+#  Adaptive OCR zoom: render each page just large enough for Tesseract
+# =====================================================================
+AUTO_ZOOM = 'auto'
+DEFAULT_OCR_ZOOM = 2.0
+TARGET_FONT_PIXELS = 36  # body text em size in rendered pixels; an x-height of roughly 20 px
+MIN_OCR_ZOOM = 1.0
+MAX_OCR_ZOOM = 4.0
+OCR_ZOOM_STEP = 0.25
+ESTIMATE_ZOOM = 1.0
+INK_HEIGHT_PER_EM = 0.6  # height of a printed line's ink band relative to its font size (Hebrew, few ascenders)
+
+def estimate_font_size(page):
+    """
+    Median body text size in points, or None for a page without text. Taken from the
+    text layer's spans when there are any (even a garbled layer sizes its glyphs right),
+    otherwise from the heights of the inked row bands in a grayscale render at ESTIMATE_ZOOM.
+    flags=0 keeps get_text from decoding the page images, which on a scan costs more than the render.
+    """
+    sizes = [span['size'] for block in page.get_text('dict', flags=0)['blocks'] if block.get('type') == 0
+             for line in block['lines'] for span in line['spans'] if span['text'].strip()]
+    if sizes: return float(np.median(sizes))
+    pix = page.get_pixmap(matrix=fitz.Matrix(ESTIMATE_ZOOM, ESTIMATE_ZOOM), colorspace=fitz.csGRAY)
+    gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    inked = np.concatenate(([False], (gray < 128).mean(axis=1) > 0.01, [False]))
+    edges = np.flatnonzero(inked[1:] != inked[:-1]); bands = edges[1::2] - edges[0::2]
+    # Drop specks and rules (too thin) and pictures (too tall to be a line of text).
+    bands = bands[(bands >= 3) & (bands < pix.height / 8)]
+    if not len(bands): return None
+    return float(np.median(bands)) / ESTIMATE_ZOOM / INK_HEIGHT_PER_EM
+
+def choose_ocr_zoom(page):
+    """The smallest zoom (in OCR_ZOOM_STEP steps) that renders the page's body text at TARGET_FONT_PIXELS."""
+    font_size = estimate_font_size(page)
+    if not font_size: return DEFAULT_OCR_ZOOM
+    zoom = math.ceil(TARGET_FONT_PIXELS / font_size / OCR_ZOOM_STEP - 1e-9) * OCR_ZOOM_STEP
+    return min(MAX_OCR_ZOOM, max(MIN_OCR_ZOOM, zoom))
+
+def resolve_ocr_zoom(page, ocr_zoom_level):
+    """ocr_zoom_level is a fixed zoom factor or AUTO_ZOOM for a per-page choice."""
+    return choose_ocr_zoom(page) if ocr_zoom_level == AUTO_ZOOM else ocr_zoom_level
+
+# =====================================================================
+#  Native text layer: born-digital pages skip rendering and Tesseract
+# =====================================================================
+NATIVE_MIN_CHARS = 20
+NATIVE_MAX_SUSPECT_WORDS = 0.02
+NATIVE_CONFIDENCE = 100.0
+
+def _is_good_char(char):
+    # Unmapped glyphs come out as U+FFFD, control codes or private-use code points.
+    return char.isprintable() and char != '\ufffd' and not '\ue000' <= char <= '\uf8ff'
+
+def _is_suspect_word(word):
+    # Broken font encodings also map glyphs to wrong letters; Latin-looking letters
+    # inside a Hebrew word (U+00F0 where a nun belongs) are the usual sign of that.
+    chars = [c for c, _ in word]
+    if not all(_is_good_char(c) for c in chars): return True
+    return any(is_rtl_char(c) for c in chars) and any(c.isalpha() and not is_rtl_char(c) for c in chars)
+
+def _line_words(line):
+    """Splits a rawdict line into words, each a list of (char, bbox), in reading order."""
+    words = []; current = []; previous = None
+    for span in line['spans']:
+        for char in span['chars']:
+            c, box = char['c'], tuple(char['bbox'])
+            if c.isspace():
+                if current: words.append(current); current = []
+                previous = None; continue
+            if current and previous and max(previous[0] - box[2], box[0] - previous[2]) > 0.3 * (box[3] - box[1]):
+                words.append(current); current = []
+            current.append((c, box)); previous = box
+    if current: words.append(current)
+    if any(is_rtl_char(c) for word in words for c, _ in word):
+        # Content streams often hold Hebrew in visual order: read words right to left and
+        # Hebrew letters right to left, but keep numbers and Latin words left to right.
+        words.sort(key=lambda word: -max(box[2] for _, box in word))
+        words = [sorted(word, key=lambda item, rtl=any(is_rtl_char(c) for c, _ in word): -item[1][0] if rtl else item[1][0])
+                 for word in words]
+    return words
+
+def native_page_data(page):
+    """
+    page_data built from the page's own text layer, with real per-character boxes in
+    1.0x page coordinates, or None when the page has too little usable text (scans,
+    broken font encodings) and has to be OCR'd.
+    """
+    entries = []; chars = suspect = 0
+    # Without TEXT_PRESERVE_IMAGES: decoding a scan's page image costs far more than reading its text.
+    for block_number, block in enumerate(page.get_text('rawdict', flags=fitz.TEXTFLAGS_RAWDICT & ~fitz.TEXT_PRESERVE_IMAGES)['blocks']):
+        if block.get('type') != 0: continue
+        for line in block['lines']:
+            for word in _line_words(line):
+                entries.append((block_number, word)); chars += len(word); suspect += _is_suspect_word(word)
+    if chars < NATIVE_MIN_CHARS or suspect > NATIVE_MAX_SUSPECT_WORDS * len(entries): return None
+    words = PageWords(); parts = []; last_block = None
+    for block_number, word in entries:
+        if last_block is not None:
+            separator = ' ' if block_number == last_block else '\n\n'; parts.append(separator); words.add_separator(len(separator))
+        last_block = block_number; text = ''.join(c for c, _ in word); boxes = [box for _, box in word]
+        bbox = (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+        words.add_word(bbox, len(text), any(is_rtl_char(c) for c in text), NATIVE_CONFIDENCE, boxes); parts.append(text)
+    return {'word_data': words, 'edited_text': ''.join(parts), 'source': 'native'}
+
+# =====================================================================
+#  Multi-process batch OCR
+# =====================================================================
+class OCRBatchError(Exception):
+    pass
+
+RENDER_AHEAD = 2
+
+def _render_stage(ocr_zoom_level, use_text_layer, task_queue, rendered):
+    # Thread in each worker: rasterizes the next pages while the main thread waits on
+    # Tesseract. rendered is bounded, so at most RENDER_AHEAD pixmaps sit in memory.
+    # Pages with a usable text layer are passed on as finished page_data instead.
+    doc = None; doc_path = None
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None: break
+            pdf_path, page_number = task; started = time.perf_counter(); stages = []
+            try:
+                if pdf_path != doc_path:
+                    if doc: doc.close()
+                    with timed(stages, 'open_pdf'): doc = fitz.open(pdf_path); doc_path = pdf_path
+                page = doc.load_page(page_number)
+                if use_text_layer:
+                    with timed(stages, 'text_layer'): native = native_page_data(page)
+                    if native: rendered.put((task, native, None, time.perf_counter() - started, None, stages)); continue
+                with timed(stages, 'choose_zoom'): zoom = resolve_ocr_zoom(page, ocr_zoom_level)
+                with timed(stages, 'render'): pix = render_page_for_ocr(doc, page_number, zoom)
+                rendered.put((task, pix, None, time.perf_counter() - started, zoom, stages))
+            except Exception as e:
+                rendered.put((task, None, str(e), 0.0, None, stages))
+    finally:
+        if doc: doc.close()
+        rendered.put(None)
+
+def _batch_worker_main(ocr_zoom_level, cache_dir, cache_limit, engine_name, use_text_layer, preprocess, task_queue, result_queue):
+    # Own process group, so cancel() also takes down the tesseract child in flight.
+    if hasattr(os, 'setpgrp'): os.setpgrp()
+    cache = OCRResultCache(cache_dir, cache_limit) if cache_dir else None; engine = create_engine(engine_name)
+    rendered = queue.Queue(maxsize=RENDER_AHEAD)
+    threading.Thread(target=_render_stage, args=(ocr_zoom_level, use_text_layer, task_queue, rendered), daemon=True).start()
+    try:
+        while True:
+            item = rendered.get()
+            if item is None: break
+            (pdf_path, page_number), pix, error, render_seconds, zoom, stages = item
+            info = {'pdf_path': pdf_path, 'render_seconds': render_seconds, 'pid': os.getpid(), 'stages': stages}
+            if error: result_queue.put((page_number, None, error, info)); continue
+            if isinstance(pix, dict):
+                info.update({'source': 'native', 'cache_hit': False, 'ocr_seconds': 0.0, 'seconds': render_seconds, 'sent_at': now()})
+                result_queue.put((page_number, pix, None, info)); continue
+            started = time.perf_counter()
+            try:
+                page_data, ocr_info = run_page_ocr(pix, zoom, cache, engine, preprocess); stages.extend(ocr_info.pop('stages'))
+                info.update(ocr_info); info['source'] = 'ocr'; page_data['ocr_zoom'] = info['ocr_zoom'] = zoom
+                info['ocr_seconds'] = time.perf_counter() - started; info['seconds'] = render_seconds + info['ocr_seconds']
+                info['sent_at'] = now(); result_queue.put((page_number, page_data, None, info))
+            except Exception as e:
+                result_queue.put((page_number, None, str(e), info))
+            del pix
+    finally:
+        engine.close()
+
+class ParallelOCRBatch:
+    """
+    OCRs a list of (pdf_path, page_number) tasks in a pool of worker processes. Every
+    worker opens the PDFs by path and keeps its last one open between pages. It is a
+    two-stage pipeline: a render thread stays up to RENDER_AHEAD pages ahead of Tesseract (through the on-disk result cache when cache_dir is given).
+    Results travel back through a queue bounded to a few pages per worker, so memory
+    does not grow with the document when the consumer is slower than the pool.
+    results() yields (page_number, page_data, error, info) tuples in completion order,
+    not page order. info carries 'pdf_path', 'source' ('native' for pages taken from
+    the PDF text layer, 'ocr' otherwise), 'cache_hit', 'render_seconds', 'ocr_seconds'
+    and their sum 'seconds', plus 'preprocess_seconds' (part of 'ocr_seconds') when
+    preprocess steps are enabled, and 'ocr_zoom' for OCR'd pages (also kept in their
+    page_data). ocr_zoom_level=AUTO_ZOOM picks the zoom per page from its text size.
+    The workers' per-stage timings ('stages', 'pid') and the time each result spent
+    in the queue are recorded into perf_trace.TRACER as the results arrive.
+    With engine='tesserocr' every worker keeps one Tesseract instance initialized
+    for its whole lifetime instead of starting tesseract per page.
+    """
+    def __init__(self, tasks, ocr_zoom_level=DEFAULT_OCR_ZOOM, max_workers=None, cache_dir=None, cache_limit=DEFAULT_CACHE_LIMIT,
+                 engine=DEFAULT_ENGINE, use_text_layer=True, preprocess=()):
+        self.tasks = list(tasks); self.ocr_zoom_level = ocr_zoom_level
+        self.cache_dir = cache_dir; self.cache_limit = cache_limit; self.cache_hits = 0; self.cache_misses = 0
+        self.engine = engine; self.use_text_layer = use_text_layer; self.preprocess = tuple(preprocess)
+        self.native_pages = 0; self.ocr_pages = 0
+        self.max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(self.tasks) or 1))
+        self._context = multiprocessing.get_context('spawn')
+        self._processes = []; self._task_queue = None; self._result_queue = None; self._is_canceled = False
+
+    def start(self):
+        if self._is_canceled: return
+        self._task_queue = self._context.Queue(); self._result_queue = self._context.Queue(maxsize=2 * self.max_workers)
+        for task in self.tasks: self._task_queue.put(task)
+        for _ in range(self.max_workers): self._task_queue.put(None)
+        for _ in range(self.max_workers):
+            process = self._context.Process(target=_batch_worker_main, daemon=True,
+                                            args=(self.ocr_zoom_level, self.cache_dir, self.cache_limit, self.engine, self.use_text_layer, self.preprocess, self._task_queue, self._result_queue))
+            process.start(); self._processes.append(process)
+        # cancel() from another thread while the pool was starting only saw the processes started before it.
+        if self._is_canceled: self.cancel()
+
+    def results(self):
+        if self._is_canceled: return  # canceled before the first result was asked for: never start the pool
+        if not self._processes: self.start()
+        remaining = len(self.tasks)
+        while remaining and not self._is_canceled:
+            try:
+                item = self._result_queue.get(timeout=0.2)
+            except queue.Empty:
+                if self._is_canceled or any(p.is_alive() for p in self._processes): continue
+                try: item = self._result_queue.get(timeout=0.5)
+                except queue.Empty: raise OCRBatchError("OCR worker processes exited unexpectedly.")
+            remaining -= 1; info = item[3]
+            if 'pid' in info: TRACER.name_process(info['pid'], f"OCR worker {info['pid']}"); TRACER.record_stages(info['stages'], info['pid'], page=item[0])
+            if 'sent_at' in info: TRACER.record('result_queue', info['sent_at'], now() - info['sent_at'], args={'page': item[0]})
+            if info.get('source') == 'native': self.native_pages += 1
+            elif info.get('source') == 'ocr': self.ocr_pages += 1
+            if info.get('cache_hit'): self.cache_hits += 1
+            elif info.get('source') == 'ocr' and self.cache_dir: self.cache_misses += 1
+            yield item
+
+    def cancel(self):
+        """Stops the batch immediately, killing the pages that are still being OCR'd."""
+        self._is_canceled = True
+        for process in self._processes:
+            if not process.is_alive(): continue
+            try:
+                if hasattr(os, 'killpg'): os.killpg(process.pid, signal.SIGKILL)
+                else: process.terminate()
+            except (ProcessLookupError, PermissionError):
+                process.kill()
+
+    def close(self):
+        if not self._is_canceled:
+            for process in self._processes: process.join(timeout=1)
+        self.cancel()
+        for process in self._processes: process.join(timeout=1)
+        for q in (self._task_queue, self._result_queue):
+            if q is not None: q.close(); q.cancel_join_thread()
+        self._processes = []
@@ -0,0 +1,358 @@
+import math
+import bisect
+import itertools
+from array import array
+
+# =====================================================================
+#  Compact word-level OCR storage
+# =====================================================================
+LEGACY_BOX_TOLERANCE = 1e-6  # old projects stored derived char boxes, which only match ours up to rounding
+
+def is_rtl_char(char):
+    return '\u0590' <= char <= '\u05FF'
+
+def _same_box(box, other):
+    return all(abs(a - b) < LEGACY_BOX_TOLERANCE for a, b in zip(box, other))
+
+class PageWords:
+    """
+    Array-backed word table for one OCR'd page. Each word keeps one box, its text
+    offset and length, an RTL flag and the Tesseract confidence; pos_to_word maps
+    every text position to its word (-1 for separators). Char boxes are normally not
+    stored: they are the word box split evenly, derived on demand in char_bbox().
+    Pages taken from a PDF text layer also carry char_boxes, 4 per text position
+    (all zero where there is no real box).
+    """
+    __slots__ = ('boxes', 'starts', 'lengths', 'rtl', 'conf', 'pos_to_word', 'char_boxes', '_spatial_index')
+
+    def __init__(self):
+        self.boxes = array('d'); self.starts = array('i'); self.lengths = array('i')
+        self.rtl = array('b'); self.conf = array('f'); self.pos_to_word = array('i'); self.char_boxes = array('d')
+        self._spatial_index = None
+
+    # --- building ---------------------------------------------------
+    def add_separator(self, length):
+        self.pos_to_word.extend(array('i', [-1]) * length)
+
+    def add_word(self, bbox, length, rtl=False, conf=-1.0, char_boxes=None):
+        index = len(self.starts); self._spatial_index = None
+        if char_boxes is not None:
+            self.char_boxes.extend(array('d', [0.0]) * (4 * len(self.pos_to_word) - len(self.char_boxes)))
+            for char_box in char_boxes: self.char_boxes.extend(char_box)
+        self.boxes.extend(bbox); self.starts.append(len(self.pos_to_word)); self.lengths.append(length)
+        self.rtl.append(1 if rtl else 0); self.conf.append(conf)
+        self.pos_to_word.extend(array('i', [index]) * length)
+        return index
+
+    # --- lookups ----------------------------------------------------
+    def __len__(self): return len(self.pos_to_word)
+
+    @property
+    def word_count(self): return len(self.starts)
+
+    def word_index(self, pos):
+        return self.pos_to_word[pos] if 0 <= pos < len(self.pos_to_word) else -1
+
+    def word_bbox(self, index):
+        return list(self.boxes[index * 4:index * 4 + 4])
+
+    def char_bbox(self, pos):
+        index = self.pos_to_word[pos]
+        if index < 0: return None
+        if len(self.char_boxes) > pos * 4:
+            box = self.char_boxes[pos * 4:pos * 4 + 4]
+            if box[2] > box[0]: return list(box)
+        x0, y0, x1, y1 = self.boxes[index * 4:index * 4 + 4]
+        length = self.lengths[index]; i = pos - self.starts[index]
+        if self.rtl[index]: i = length - 1 - i
+        char_width = (x1 - x0) / length
+        return [x0 + i * char_width, y0, x0 + (i + 1) * char_width, y1]
+
+    def boxes_at(self, pos):
+        """Returns (word_bbox, char_bbox) for a text position, or None for separators."""
+        index = self.word_index(pos)
+        if index < 0: return None
+        return self.word_bbox(index), self.char_bbox(pos)
+
+    def __getitem__(self, pos):
+        # Same shape as the old per-character dicts, for code that still indexes word_data.
+        if pos < 0: pos += len(self.pos_to_word)
+        boxes = self.boxes_at(pos)
+        return {'word_bbox': boxes[0], 'char_bbox': boxes[1]} if boxes else None
+
+    def spatial_index(self):
+        if self._spatial_index is None: self._spatial_index = WordBoxIndex(self)
+        return self._spatial_index
+
+    def position_at(self, x, y):
+        """The text position of the character under page point (x, y), or -1 if no word is hit."""
+        index = self.spatial_index().word_at(x, y)
+        if index < 0: return -1
+        start = self.starts[index]; length = self.lengths[index]
+        if len(self.char_boxes) >= (start + length) * 4:
+            best = -1; best_distance = None
+            for pos in range(start, start + length):
+                x0, _, x1, _ = self.char_boxes[pos * 4:pos * 4 + 4]
+                if x1 <= x0: continue
+                distance = 0.0 if x0 <= x <= x1 else min(abs(x - x0), abs(x - x1))
+                if best_distance is None or distance < best_distance: best = pos; best_distance = distance
+            if best >= 0: return best
+        x0, _, x1, _ = self.boxes[index * 4:index * 4 + 4]
+        i = min(length - 1, max(0, int((x - x0) / (x1 - x0) * length))) if x1 > x0 else 0
+        if self.rtl[index]: i = length - 1 - i
+        return start + i
+
+    def iter_words(self):
+        for index in range(len(self.starts)):
+            yield index, self.starts[index], self.lengths[index], self.word_bbox(index), bool(self.rtl[index])
+
+    # --- conversion -------------------------------------------------
+    def to_json(self):
+        words = [self.word_bbox(i) + [self.starts[i], self.lengths[i], self.rtl[i], round(self.conf[i], 2)] for i in range(len(self.starts))]
+        obj = {'length': len(self.pos_to_word), 'words': words}
+        if self.char_boxes: obj['chars'] = [round(c, 2) for c in self.char_boxes]
+        return obj
+
+    @classmethod
+    def from_json(cls, obj, text=None):
+        if isinstance(obj, list): return cls.from_legacy(obj, text)
+        page_words = cls(); position = 0
+        for x0, y0, x1, y1, start, length, rtl, conf in obj['words']:
+            page_words.add_separator(start - position)
+            page_words.add_word((x0, y0, x1, y1), length, rtl, conf); position = start + length
+        page_words.add_separator(obj['length'] - position)
+        if 'chars' in obj: page_words.char_boxes = array('d', obj['chars'])
+        return page_words
+
+    @classmethod
+    def from_columns(cls, boxes, starts, lengths, rtl, conf, text_length, pos_to_word=None, char_boxes=None):
+        page_words = cls()
+        if char_boxes is not None: page_words.char_boxes = char_boxes
+        page_words.boxes = boxes; page_words.starts = starts; page_words.lengths = lengths; page_words.rtl = rtl; page_words.conf = conf
+        if pos_to_word is None:
+            pos_to_word = array('i', [-1]) * text_length
+            for index in range(len(starts)):
+                pos_to_word[starts[index]:starts[index] + lengths[index]] = array('i', [index]) * lengths[index]
+        page_words.pos_to_word = pos_to_word
+        return page_words
+
+    @classmethod
+    def from_legacy(cls, word_data, text=None):
+        """
+        Rebuilds the table from the old list of per-character {'word_bbox', 'char_bbox'}
+        dicts. A word's direction comes from the order of its char boxes; a one-letter
+        word has no order, so it is right-to-left when its letter in text is.
+        """
+        page_words = cls(); pos = 0; total = len(word_data)
+        while pos < total:
+            item = word_data[pos]
+            if item is None: page_words.add_separator(1); pos += 1; continue
+            end = pos + 1
+            while end < total and word_data[end] is not None and word_data[end]['word_bbox'] == item['word_bbox']: end += 1
+            if end - pos > 1: rtl = word_data[pos]['char_bbox'][0] > word_data[end - 1]['char_bbox'][0]
+            else: rtl = text is not None and pos < len(text) and is_rtl_char(text[pos])
+            page_words.add_word(item['word_bbox'], end - pos, rtl); pos = end
+        # Char boxes that are not the word box split evenly (pages from a PDF text layer) are kept as they are.
+        if any(item is not None and not _same_box(item['char_bbox'], page_words.char_bbox(pos)) for pos, item in enumerate(word_data)):
+            page_words.char_boxes = array('d', [v for item in word_data for v in (item['char_bbox'] if item is not None else (0.0, 0.0, 0.0, 0.0))])
+        return page_words
+
+    def to_legacy(self):
+        return [self[pos] for pos in range(len(self.pos_to_word))]
+
+# =====================================================================
+#  Spatial index for image -> text hit-testing
+# =====================================================================
+class WordBoxIndex:
+    """
+    Static packed R-tree over a page's word boxes, bulk-loaded with Sort-Tile-Recursive.
+    Level 0 holds the words, each level above holds the bounding boxes of NODE_SIZE
+    consecutive entries of the level below, so a point query only descends into the
+    few nodes that contain the point: O(log n) for ordinary pages, however many words.
+    """
+    NODE_SIZE = 16
+
+    def __init__(self, page_words):
+        ids = [i for i in range(page_words.word_count) if page_words.lengths[i] > 0]
+        boxes = [tuple(page_words.boxes[i * 4:i * 4 + 4]) for i in ids]
+        self._levels = []  # (ids, boxes) bottom-up; above level 0 an id g stands for entries g*NODE_SIZE.. of the level below
+        while True:
+            order = self._str_order(boxes)
+            ids = array('i', [ids[k] for k in order]); boxes = [boxes[k] for k in order]
+            self._levels.append((ids, boxes))
+            if len(boxes) <= self.NODE_SIZE: break
+            boxes = [self._union(boxes[k:k + self.NODE_SIZE]) for k in range(0, len(boxes), self.NODE_SIZE)]
+            ids = list(range(len(boxes)))
+
+    @staticmethod
+    def _union(boxes):
+        return (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+    def _str_order(self, boxes):
+        # Vertical slices by x centre, each sorted by y centre, so consecutive runs of NODE_SIZE form compact tiles.
+        count = len(boxes)
+        if count <= self.NODE_SIZE: return list(range(count))
+        slice_size = self.NODE_SIZE * math.ceil(math.sqrt(math.ceil(count / self.NODE_SIZE)))
+        by_x = sorted(range(count), key=lambda k: boxes[k][0] + boxes[k][2]); order = []
+        for first in range(0, count, slice_size):
+            order.extend(sorted(by_x[first:first + slice_size], key=lambda k: boxes[k][1] + boxes[k][3]))
+        return order
+
+    def word_at(self, x, y):
+        """The word whose box contains (x, y); the smallest one where boxes overlap. -1 if none."""
+        level = len(self._levels) - 1; best = -1; best_area = None
+        stack = [(level, p) for p in range(len(self._levels[level][0]))]
+        while stack:
+            level, p = stack.pop(); ids, boxes = self._levels[level]; x0, y0, x1, y1 = boxes[p]
+            if not (x0 <= x <= x1 and y0 <= y <= y1): continue
+            if level == 0:
+                area = (x1 - x0) * (y1 - y0)
+                if best_area is None or area < best_area: best = ids[p]; best_area = area
+                continue
+            first = ids[p] * self.NODE_SIZE; below = len(self._levels[level - 1][0])
+            stack.extend((level - 1, q) for q in range(first, min(first + self.NODE_SIZE, below)))
+        return best
+
+    def words_in(self, x0, y0, x1, y1):
+        """The words whose boxes intersect the rectangle (x0, y0)-(x1, y1), in no particular order."""
+        level = len(self._levels) - 1; found = []
+        stack = [(level, p) for p in range(len(self._levels[level][0]))]
+        while stack:
+            level, p = stack.pop(); ids, boxes = self._levels[level]; bx0, by0, bx1, by1 = boxes[p]
+            if bx1 < x0 or bx0 > x1 or by1 < y0 or by0 > y1: continue
+            if level == 0: found.append(ids[p]); continue
+            first = ids[p] * self.NODE_SIZE; below = len(self._levels[level - 1][0])
+            stack.extend((level - 1, q) for q in range(first, min(first + self.NODE_SIZE, below)))
+        return found
+
+# =====================================================================
+#  Alignment of the edited text with the OCR text positions
+# =====================================================================
+class TextAlignment:
+    """
+    Piece table mapping positions in the edited text to positions in the OCR text the
+    word boxes were built for. Each piece is [ocr_start, length], with ocr_start -1 for
+    typed text. Pieces are kept in blocks of BLOCK_SIZE / 2 to 2 * BLOCK_SIZE with cached
+    lengths: an edit only rewrites, splits or merges the blocks it touched, and a lookup
+    bisects a prefix array of block lengths (rebuilt in one accumulate() pass after an
+    edit) and then walks a single block. OCR pieces stay in ascending order (edits only
+    cut them or insert between them), so to_edited() can bisect the blocks' OCR ranges.
+    """
+    BLOCK_SIZE = 64
+
+    def __init__(self, length=0, pieces=None):
+        if pieces is None: pieces = [[0, length]] if length else []
+        self._blocks = [pieces[i:i + self.BLOCK_SIZE] for i in range(0, len(pieces), self.BLOCK_SIZE)] or [[]]
+        self._lengths = [sum(piece[1] for piece in block) for block in self._blocks]; self._total = sum(self._lengths)
+        self._prefix = None; self._bounds = [None] * len(self._blocks); self._lows = None
+
+    def __len__(self): return self._total
+
+    def _locate(self, pos):
+        if self._prefix is None: self._prefix = list(itertools.accumulate(self._lengths, initial=0))
+        b = min(len(self._blocks) - 1, bisect.bisect_right(self._prefix, pos) - 1)
+        return b, pos - self._prefix[b]
+
+    def _split(self, pos):
+        """Makes pos a piece boundary; returns (block, index) of the piece that starts there."""
+        b, offset = self._locate(pos); block = self._blocks[b]
+        for i, (start, length) in enumerate(block):
+            if offset == 0: return b, i
+            if offset < length:
+                block[i:i + 1] = [[start, offset], [start + offset if start >= 0 else -1, length - offset]]
+                return b, i + 1
+            offset -= length
+        return b, len(block)
+
+    def _replace_blocks(self, first, end, blocks):
+        self._blocks[first:end] = blocks; self._lengths[first:end] = [sum(piece[1] for piece in block) for block in blocks]
+        self._bounds[first:end] = [None] * len(blocks)
+
+    def _halves(self, block):
+        if len(block) <= 2 * self.BLOCK_SIZE: return [block]
+        half = len(block) // 2; return [block[:half], block[half:]]
+
+    def _rebalance(self, first, last):
+        """Splits blocks first..last that grew past 2 * BLOCK_SIZE pieces and merges the ones that fell under BLOCK_SIZE / 2 into a neighbour."""
+        for b in range(min(last, len(self._blocks) - 1), first - 1, -1):
+            block = self._blocks[b]
+            if len(block) > 2 * self.BLOCK_SIZE: self._replace_blocks(b, b + 1, self._halves(block))
+            elif len(block) < self.BLOCK_SIZE // 2 and len(self._blocks) > 1:
+                left = b if b + 1 < len(self._blocks) else b - 1
+                self._replace_blocks(left, left + 2, self._halves(self._blocks[left] + self._blocks[left + 1]))
+
+    def apply_edit(self, position, removed, added):
+        """Follows one QTextDocument.contentsChange: removed chars at position replaced by added typed chars."""
+        removed = max(0, min(removed, self._total - position))
+        if not removed and not added: return
+        first = last = None
+        if removed:
+            self._split(position + removed); b, i = self._split(position); remaining = removed; first = b
+            while remaining > 0:
+                block = self._blocks[b]
+                if i >= len(block): b += 1; i = 0; continue
+                length = block.pop(i)[1]; self._lengths[b] -= length; remaining -= length
+            last = b; self._total -= removed; self._prefix = None
+        if added:
+            b, i = self._split(position); block = self._blocks[b]
+            if i > 0 and block[i - 1][0] < 0: block[i - 1][1] += added
+            elif i < len(block) and block[i][0] < 0: block[i][1] += added
+            else: block.insert(i, [-1, added])
+            self._lengths[b] += added; self._total += added
+            first = b if first is None else min(first, b); last = b if last is None else max(last, b)
+        self._bounds[first:last + 1] = [None] * (last + 1 - first)
+        self._rebalance(first, last); self._prefix = None; self._lows = None
+
+    def to_original(self, pos):
+        """The OCR text position shown at edited position pos, or -1 for typed text."""
+        if pos < 0: return -1
+        b, offset = self._locate(pos)
+        for start, length in self._blocks[b]:
+            if offset < length: return start + offset if start >= 0 else -1
+            offset -= length
+        return -1
+
+    def _block_bounds(self, b):
+        if self._bounds[b] is None:
+            starts = [start for start, _ in self._blocks[b] if start >= 0]
+            self._bounds[b] = (starts[0], max(start + length for start, length in self._blocks[b] if start >= 0)) if starts else ()
+        return self._bounds[b]
+
+    def to_edited(self, original_pos):
+        """Where OCR text position original_pos is now, or -1 if it was deleted."""
+        if self._lows is None: self._lows = [(bounds[0], b) for b in range(len(self._blocks)) for bounds in (self._block_bounds(b),) if bounds]
+        k = bisect.bisect_right(self._lows, (original_pos, len(self._blocks))) - 1
+        if k < 0: return -1
+        b = self._lows[k][1]
+        if original_pos >= self._bounds[b][1]: return -1
+        self._locate(0); edited = self._prefix[b]
+        for start, piece_length in self._blocks[b]:
+            if 0 <= start <= original_pos < start + piece_length: return edited + original_pos - start
+            edited += piece_length
+        return -1
+
+    def is_identity(self, length):
+        pieces = [piece for block in self._blocks for piece in block]
+        return pieces == ([[0, length]] if length else [])
+
+    def to_json(self): return [list(piece) for block in self._blocks for piece in block]
+
+    @classmethod
+    def from_json(cls, pieces, length):
+        return cls(length) if pieces is None else cls(pieces=[list(piece) for piece in pieces])
+
+def page_data_to_json(page_data, legacy=False):
+    """
+    JSON form of page_data. With legacy, word_data is the old per-character list that
+    earlier releases read, and the per-word RTL flags and confidences it has no room
+    for go in word_attrs, which those releases ignore.
+    """
+    words = page_data['word_data']
+    if not legacy: return {**page_data, 'word_data': words.to_json()}
+    return {**page_data, 'word_data': words.to_legacy(), 'word_attrs': {'rtl': list(words.rtl), 'conf': [round(c, 2) for c in words.conf]}}
+
+def page_data_from_json(obj):
+    page_data = {**obj, 'word_data': PageWords.from_json(obj['word_data'], obj.get('edited_text'))}
+    attrs = page_data.pop('word_attrs', None); words = page_data['word_data']
+    if attrs and len(attrs['rtl']) == words.word_count: words.rtl = array('b', attrs['rtl']); words.conf = array('f', attrs['conf'])
+    return page_data
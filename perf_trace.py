@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import threading
+import contextlib
+from collections import deque
+
+# =====================================================================
+#  Per-stage timing and Chrome / Perfetto trace export (Qt-free)
+# =====================================================================
+MAX_TRACE_EVENTS = 500000
+_WALL_ORIGIN = time.time(); _PERF_ORIGIN = time.perf_counter()
+
+def now():
+    """Wall-clock seconds at perf_counter resolution, so stage times from worker processes line up with ours."""
+    return _WALL_ORIGIN + time.perf_counter() - _PERF_ORIGIN
+
+@contextlib.contextmanager
+def timed(stages, name):
+    """Appends (name, start, seconds, thread id) to the list stages; worker processes send these lists back with their results."""
+    start = now()
+    try: yield
+    finally: stages.append((name, start, now() - start, threading.get_ident()))
+
+class StageStats:
+    __slots__ = ('count', 'total', 'last', 'max')
+    def __init__(self): self.count = 0; self.total = 0.0; self.last = 0.0; self.max = 0.0
+    def add(self, seconds): self.count += 1; self.total += seconds; self.last = seconds; self.max = max(self.max, seconds)
+    @property
+    def mean(self): return self.total / self.count if self.count else 0.0
+
+class Tracer:
+    """
+    Collects timed stages from every thread. Running statistics per stage name are always
+    kept (they are a few additions); individual events are only stored while recording is
+    on, in a ring of at most max_events, and write_chrome_trace() saves them in the Trace
+    Event format that chrome://tracing and ui.perfetto.dev open.
+    """
+    def __init__(self, max_events=MAX_TRACE_EVENTS):
+        self.recording = False; self._events = deque(maxlen=max_events); self._stats = {}; self._thread_names = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, start, seconds, pid=None, tid=None, args=None):
+        pid = pid or os.getpid()
+        if tid is None: tid = threading.get_ident(); self._thread_names.setdefault((pid, tid), threading.current_thread().name)
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None: stats = self._stats[name] = StageStats()
+            stats.add(seconds)
+            if self.recording: self._events.append((name, start, seconds, pid, tid, args))
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        start = now()
+        try: yield
+        finally: self.record(name, start, now() - start, args=args or None)
+
+    def record_stages(self, stages, pid, **args):
+        """Imports a list filled by timed() in another process."""
+        for name, start, seconds, tid in stages: self.record(name, start, seconds, pid, tid, args or None)
+
+    def name_process(self, pid, name):
+        with self._lock: self._thread_names[(pid, None)] = name
+
+    def stats(self):
+        with self._lock: return {name: (s.count, s.last, s.mean, s.max) for name, s in self._stats.items()}
+
+    def summary(self, names):
+        """'render 12 ms · tesseract 840 ms …' from the latest time of each stage that has run."""
+        stats = self.stats()
+        return ' · '.join(f"{name} {stats[name][1] * 1000:.0f} ms" for name in names if name in stats)
+
+    def start_recording(self):
+        with self._lock: self._events.clear(); self.recording = True
+
+    def stop_recording(self): self.recording = False
+
+    @property
+    def event_count(self): return len(self._events)
+
+    def reset(self):
+        with self._lock: self._events.clear(); self._stats.clear()
+
+    def write_chrome_trace(self, path):
+        with self._lock: events = list(self._events); thread_names = dict(self._thread_names)
+        origin = min((event[1] for event in events), default=now())
+        trace = [{'name': name, 'cat': 'stage', 'ph': 'X', 'ts': round((start - origin) * 1e6, 1), 'dur': round(seconds * 1e6, 1),
+                  'pid': pid, 'tid': tid, **({'args': args} if args else {})}
+                 for name, start, seconds, pid, tid, args in events]
+        for (pid, tid), name in thread_names.items():
+            if tid is None: trace.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': name}})
+            else: trace.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}})
+        with open(path, 'w', encoding='utf-8') as f: json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
+
+TRACER = Tracer()
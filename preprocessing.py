@@ -0,0 +1,125 @@
+import math
+import time
+
+import numpy as np
+from PIL import Image
+
+# =====================================================================
+#  Optional image preprocessing between rendering and Tesseract
+# =====================================================================
+PREPROCESS_STEPS = ('grayscale', 'deskew', 'threshold', 'despeckle', 'crop')
+THRESHOLD_WINDOW = 31
+THRESHOLD_OFFSET = 10
+MAX_SKEW_DEGREES = 5.0
+SKEW_STEP_DEGREES = 0.2
+CROP_PADDING = 12
+CROP_MIN_INK = 0.002
+CROP_MAX_INK = 0.6
+
+class ImageBuffer:
+    """A numpy image exposed like a fitz.Pixmap (width, height, n, stride, samples), which is what the OCR engines read."""
+    def __init__(self, array):
+        self.array = np.ascontiguousarray(array, dtype=np.uint8); self.height, self.width = self.array.shape[:2]
+        self.n = 1 if self.array.ndim == 2 else self.array.shape[2]; self.stride = self.width * self.n
+
+    @property
+    def samples(self): return self.array.tobytes()
+
+def pixmap_to_array(pix):
+    rows = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width * pix.n]
+    return rows.reshape(pix.height, pix.width, pix.n)
+
+def to_grayscale(image):
+    if image.ndim == 2: return image
+    # BT.601 weights in 8-bit fixed point; the sum fits in uint16.
+    red, green, blue = (image[..., channel].astype(np.uint16) for channel in range(3))
+    return ((red * 77 + green * 150 + blue * 29) >> 8).astype(np.uint8)
+
+def _ink(image): return to_grayscale(image) < 128
+
+def box_sum(gray, window=THRESHOLD_WINDOW):
+    """Sum over a window x window neighbourhood of every pixel, from one integral image."""
+    r = window // 2; dtype = np.int32 if (gray.size + window * (gray.shape[0] + gray.shape[1] + window)) * 255 < 2**31 else np.int64
+    integral = np.pad(gray, ((r + 1, r), (r + 1, r)), mode='edge').cumsum(axis=0, dtype=dtype).cumsum(axis=1, dtype=dtype)
+    return integral[window:, window:] - integral[:-window, window:] - integral[window:, :-window] + integral[:-window, :-window]
+
+def adaptive_threshold(gray):
+    """Black where a pixel is THRESHOLD_OFFSET darker than its neighbourhood, so uneven lighting does not matter."""
+    area = THRESHOLD_WINDOW * THRESHOLD_WINDOW; sums = box_sum(gray)
+    return np.where(gray.astype(sums.dtype) * area < sums - THRESHOLD_OFFSET * area, 0, 255).astype(np.uint8)
+
+def despeckle(image):
+    """Whitens dark pixels with at most one dark neighbour (scanner dust, JPEG noise)."""
+    dark = _ink(image); height, width = dark.shape; padded = np.pad(dark, 1).astype(np.uint8)
+    neighbours = sum(padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + width] for dy in (-1, 0, 1) for dx in (-1, 0, 1)) - dark
+    result = image.copy(); result[dark & (neighbours <= 1)] = 255
+    return result
+
+def estimate_skew(image):
+    """Skew angle in degrees (positive: lines run down to the right), from projection profiles of a subsample."""
+    ys, xs = np.nonzero(_ink(image[::4, ::4]))
+    if len(ys) < 200: return 0.0
+    if len(ys) > 40000: step = len(ys) // 40000 + 1; ys = ys[::step]; xs = xs[::step]
+    best_angle = 0.0; best_score = -1.0
+    for angle in np.arange(-MAX_SKEW_DEGREES, MAX_SKEW_DEGREES + SKEW_STEP_DEGREES / 2, SKEW_STEP_DEGREES):
+        rows = np.round(ys - xs * math.tan(math.radians(angle))).astype(np.int64)
+        profile = np.bincount(rows - rows.min()).astype(np.float64); score = float(np.dot(profile, profile))
+        if score > best_score: best_angle = round(float(angle), 3); best_score = score
+    return best_angle
+
+def rotate(image, angle):
+    fill = 255 if image.ndim == 2 else (255,) * image.shape[2]
+    return np.asarray(Image.fromarray(image).rotate(angle, resample=Image.BILINEAR, fillcolor=fill))
+
+def content_box(image):
+    """(x0, y0, x1, y1) of the printed area: trims empty margins and mostly-black scanner borders."""
+    dark = _ink(image)
+    def span(fractions):
+        found = np.flatnonzero((fractions > CROP_MIN_INK) & (fractions < CROP_MAX_INK))
+        return (int(found[0]), int(found[-1]) + 1) if len(found) else None
+    columns = span(dark.mean(axis=0))
+    if columns is None: return None
+    rows = span(dark[:, columns[0]:columns[1]].mean(axis=1))
+    if rows is None: return None
+    height, width = dark.shape
+    return (max(0, columns[0] - CROP_PADDING), max(0, rows[0] - CROP_PADDING),
+            min(width, columns[1] + CROP_PADDING), min(height, rows[1] + CROP_PADDING))
+
+class PreprocessedPage:
+    """
+    The image handed to Tesseract plus what it takes to map its boxes back onto the
+    rendered page: the crop offset and the deskew rotation about the image centre.
+    """
+    def __init__(self, image, angle, offset, size, seconds):
+        self.image = ImageBuffer(image); self.angle = angle; self.offset = offset; self.size = size; self.seconds = seconds
+
+    def restore_boxes(self, data):
+        """Returns a copy of a Tesseract DataFrame with left/top/width/height in rendered-page pixels."""
+        if not self.angle and self.offset == (0, 0): return data
+        data = data.copy()
+        x0 = data['left'].to_numpy(dtype=np.float64) + self.offset[0]; y0 = data['top'].to_numpy(dtype=np.float64) + self.offset[1]
+        x1 = x0 + data['width'].to_numpy(dtype=np.float64); y1 = y0 + data['height'].to_numpy(dtype=np.float64)
+        if self.angle:
+            # PIL rotated the page counter-clockwise about its centre; undo that on all four corners.
+            cx, cy = self.size[0] / 2, self.size[1] / 2; cos, sin = math.cos(math.radians(self.angle)), math.sin(math.radians(self.angle))
+            xs = np.stack([x0, x1, x0, x1]) - cx; ys = np.stack([y0, y0, y1, y1]) - cy
+            xs, ys = cx + xs * cos - ys * sin, cy + xs * sin + ys * cos
+            x0, x1, y0, y1 = xs.min(axis=0), xs.max(axis=0), ys.min(axis=0), ys.max(axis=0)
+        data['left'] = x0; data['top'] = y0; data['width'] = x1 - x0; data['height'] = y1 - y0
+        return data
+
+def preprocess_pixmap(pix, steps):
+    """Runs the enabled steps, always in PREPROCESS_STEPS order; thresholding implies grayscale."""
+    started = time.perf_counter(); steps = set(steps); image = pixmap_to_array(pix)
+    if image.shape[2] == 1: image = image[..., 0]
+    if steps & {'grayscale', 'threshold'}: image = to_grayscale(image)
+    angle = 0.0; offset = (0, 0)
+    if 'deskew' in steps:
+        angle = estimate_skew(image)
+        if angle: image = rotate(image, angle)
+    if 'threshold' in steps: image = adaptive_threshold(image)
+    if 'despeckle' in steps: image = despeckle(image)
+    if 'crop' in steps:
+        box = content_box(image)
+        if box: image = image[box[1]:box[3], box[0]:box[2]]; offset = box[:2]
+    return PreprocessedPage(image, angle, offset, (pix.width, pix.height), time.perf_counter() - started)
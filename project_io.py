@@ -0,0 +1,294 @@
+import os
+import sys
+import json
+import zlib
+import struct
+import zipfile
+import tempfile
+import threading
+import queue
+from array import array
+from collections.abc import MutableMapping
+
+from page_words import PageWords, page_data_to_json, page_data_from_json
+
+# =====================================================================
+#  Binary page records
+# =====================================================================
+PROJECT_FORMAT = 'python-pdf-ocr'
+PROJECT_VERSION = 1
+PROJECT_EXTENSION = '.ocrproj'
+PAGE_MAGIC = b'PGW1'
+PAGE_MAGIC_CHAR_BOXES = b'PGW2'  # same record followed by a uint32 count and that many char boxes
+PAGE_HEADER = struct.Struct('<4sIIII')  # magic, text bytes, word table length, word count, meta bytes
+CHAR_BOX_COUNT = struct.Struct('<I')
+
+def _le_bytes(values):
+    if sys.byteorder == 'big': values = array(values.typecode, values); values.byteswap()
+    return values.tobytes()
+
+def _le_array(typecode, data, offset, count):
+    values = array(typecode); size = values.itemsize * count
+    values.frombytes(data[offset:offset + size])
+    if sys.byteorder == 'big': values.byteswap()
+    return values, offset + size
+
+def encode_page(page_data):
+    """Packs one page_data dict into a flat little-endian record (arrays stored raw, not as text)."""
+    words = page_data['word_data']
+    text = page_data['edited_text'].encode('utf-8')
+    meta = {key: value for key, value in page_data.items() if key not in ('word_data', 'edited_text')}
+    meta = json.dumps(meta, ensure_ascii=False).encode('utf-8') if meta else b''
+    magic = PAGE_MAGIC_CHAR_BOXES if words.char_boxes else PAGE_MAGIC
+    header = PAGE_HEADER.pack(magic, len(text), len(words), words.word_count, len(meta))
+    parts = [header, text, meta, _le_bytes(words.boxes), _le_bytes(words.starts),
+             _le_bytes(words.lengths), _le_bytes(words.rtl), _le_bytes(words.conf)]
+    if words.char_boxes: parts += [CHAR_BOX_COUNT.pack(len(words.char_boxes) // 4), _le_bytes(words.char_boxes)]
+    return b''.join(parts)
+
+def decode_page(data):
+    magic, text_size, text_length, word_count, meta_size = PAGE_HEADER.unpack_from(data)
+    if magic not in (PAGE_MAGIC, PAGE_MAGIC_CHAR_BOXES): raise ValueError("Not an OCR page record.")
+    offset = PAGE_HEADER.size
+    page_data = {'edited_text': data[offset:offset + text_size].decode('utf-8')}; offset += text_size
+    if meta_size: page_data.update(json.loads(data[offset:offset + meta_size].decode('utf-8')))
+    offset += meta_size
+    boxes, offset = _le_array('d', data, offset, word_count * 4)
+    starts, offset = _le_array('i', data, offset, word_count)
+    lengths, offset = _le_array('i', data, offset, word_count)
+    rtl, offset = _le_array('b', data, offset, word_count)
+    conf, offset = _le_array('f', data, offset, word_count); char_boxes = None
+    if magic == PAGE_MAGIC_CHAR_BOXES:
+        char_box_count, = CHAR_BOX_COUNT.unpack_from(data, offset)
+        char_boxes, offset = _le_array('d', data, offset + CHAR_BOX_COUNT.size, char_box_count * 4)
+    page_data['word_data'] = PageWords.from_columns(boxes, starts, lengths, rtl, conf, text_length, char_boxes=char_boxes)
+    return page_data
+
+# =====================================================================
+#  Project container: a zip with a JSON manifest and one compressed record per page
+# =====================================================================
+class ProjectArchive:
+    """Read side of a .ocrproj file. Pages are only decompressed when read_page() asks for them."""
+    def __init__(self, path):
+        self.path = path; self._zip = zipfile.ZipFile(path, 'r')
+        self.manifest = json.loads(self._zip.read('project.json').decode('utf-8'))
+        if self.manifest.get('format') != PROJECT_FORMAT: raise ValueError(f"{path} is not an OCR project.")
+        self.pdf_path = self.manifest['pdf_path']
+    def page_keys(self): return list(self.manifest['pages'])
+    def read_raw(self, page_key): return self._zip.read(f"pages/{page_key}.bin")
+    def read_page(self, page_key): return decode_page(self.read_raw(page_key))
+    def reopen(self): return ProjectArchive(self.path)
+    def close(self): self._zip.close()
+
+class OCRPageStore(MutableMapping):
+    """
+    The ocr_data_cache mapping (page key -> page_data). Pages backed by an open
+    ProjectArchive are decoded on first access; everything else is a plain dict entry.
+    """
+    def __init__(self, pages=None, archive=None):
+        self._pages = dict(pages or {}); self._archive = archive
+        self._archived_keys = set(archive.page_keys()) if archive else set()
+
+    @property
+    def archive(self): return self._archive
+
+    def __getitem__(self, page_key):
+        if page_key not in self._pages:
+            if page_key not in self._archived_keys: raise KeyError(page_key)
+            self._pages[page_key] = self._archive.read_page(page_key)
+        return self._pages[page_key]
+    def __setitem__(self, page_key, page_data): self._pages[page_key] = page_data
+    def __delitem__(self, page_key):
+        found = page_key in self._pages or page_key in self._archived_keys
+        self._pages.pop(page_key, None); self._archived_keys.discard(page_key)
+        if not found: raise KeyError(page_key)
+    def __contains__(self, page_key): return page_key in self._pages or page_key in self._archived_keys
+    def __iter__(self): return iter(self._archived_keys.union(self._pages))
+    def __len__(self): return len(self._archived_keys.union(self._pages))
+
+    def is_loaded(self, page_key): return page_key in self._pages
+    def sorted_keys(self): return sorted(self, key=int)
+    def peek(self, page_key):
+        """page_data without keeping an archived page in memory (for one-off reads like indexing)."""
+        if page_key in self._pages: return self._pages[page_key]
+        if page_key not in self._archived_keys: raise KeyError(page_key)
+        return self._archive.read_page(page_key)
+    def iter_sorted(self):
+        """Yields (page_key, page_data) in page order without keeping archived pages in memory."""
+        for page_key in self.sorted_keys(): yield page_key, self.peek(page_key)
+
+    def detached(self):
+        """
+        A copy for another thread: the same page dicts for loaded pages and the archive
+        opened again for the rest, so reading it never touches this store's file handle.
+        The caller clear()s it when done.
+        """
+        copy = OCRPageStore(self._pages, self._archive.reopen() if self._archive else None)
+        copy._archived_keys = set(self._archived_keys); return copy
+
+    def clear(self):
+        self._pages.clear(); self._archived_keys.clear()
+        if self._archive: self._archive.close(); self._archive = None
+
+    def attach_archive(self, archive):
+        """Points not-yet-loaded pages at a freshly written archive (used after a save)."""
+        if self._archive: self._archive.close()
+        self._archive = archive; self._archived_keys = set(archive.page_keys())
+
+def save_project_archive(save_path, pdf_path, store):
+    """
+    Writes store to a .ocrproj file through a temp file, so saving over the archive the
+    store is currently reading from is safe: its handle is closed just for the rename
+    (Windows cannot replace an open file) and the store then reads the new archive.
+    Detached copies must be closed first. Pages that were never loaded are copied as
+    raw records without being decoded.
+    """
+    page_keys = store.sorted_keys()
+    directory = os.path.dirname(os.path.abspath(save_path))
+    fd, temp_path = tempfile.mkstemp(suffix=PROJECT_EXTENSION, dir=directory); os.close(fd)
+    try:
+        with zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            manifest = {'format': PROJECT_FORMAT, 'version': PROJECT_VERSION, 'pdf_path': pdf_path, 'pages': page_keys}
+            zf.writestr('project.json', json.dumps(manifest, ensure_ascii=False))
+            for page_key in page_keys:
+                if store.is_loaded(page_key): record = encode_page(store[page_key])
+                else: record = store.archive.read_raw(page_key)
+                zf.writestr(f"pages/{page_key}.bin", record)
+        archive = store.archive
+        reading_target = archive is not None and os.path.exists(save_path) and os.path.samefile(archive.path, save_path)
+        if reading_target: archive.close()
+        try: os.replace(temp_path, save_path)
+        except BaseException:
+            if reading_target: store.attach_archive(archive.reopen())
+            raise
+    except BaseException:
+        os.remove(temp_path); raise
+    store.attach_archive(ProjectArchive(save_path))
+
+# =====================================================================
+#  Append-only page journal
+# =====================================================================
+JOURNAL_RECORD = struct.Struct('<cIII')  # kind, page number, payload bytes, crc32 of payload
+JOURNAL_PAGE = b'P'; JOURNAL_TEXT = b'T'; JOURNAL_META = b'M'
+
+class PageJournal:
+    """
+    Append-only log of page results: full page records (JOURNAL_PAGE), edited-text
+    updates (JOURNAL_TEXT) and page metadata updates such as the edit alignment
+    (JOURNAL_META, a JSON dict; None values delete the key). Every record carries a CRC, so a record torn by a crash or a
+    kill is detected on replay and everything before it is still recovered.
+    """
+    def __init__(self, path, truncate=False):
+        self.path = path; self._file = open(path, 'wb' if truncate else 'ab')
+
+    def _append(self, kind, page_key, payload):
+        self._file.write(JOURNAL_RECORD.pack(kind, int(page_key), len(payload), zlib.crc32(payload)) + payload)
+        self._file.flush()
+
+    def append_page(self, page_key, page_data): self._append(JOURNAL_PAGE, page_key, zlib.compress(encode_page(page_data)))
+    def append_text(self, page_key, text): self._append(JOURNAL_TEXT, page_key, text.encode('utf-8'))
+    def append_meta(self, page_key, meta): self._append(JOURNAL_META, page_key, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+    def sync(self): self._file.flush(); os.fsync(self._file.fileno())
+    def close(self): self._file.close()
+
+JOURNAL_SUFFIX = '.journal'
+
+def journal_path_for(project_path): return project_path + JOURNAL_SUFFIX
+
+class AutosaveJournal:
+    """
+    A PageJournal written from a background thread: record_page() and record_text() only
+    queue the change, so compressing and fsyncing never block the GUI. Each burst of
+    records is fsynced once the queue runs dry; flush() waits until all queued records
+    are on disk.
+    """
+    def __init__(self, path, truncate=False):
+        self.path = path; self.error = None; self._queue = queue.SimpleQueue(); self._journal = PageJournal(path, truncate)
+        self._thread = threading.Thread(target=self._run, daemon=True); self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None: break
+            kind, page_key, value = item
+            try:
+                if kind == JOURNAL_PAGE: self._journal.append_page(page_key, value)
+                elif kind == JOURNAL_TEXT: self._journal.append_text(page_key, value)
+                elif kind == JOURNAL_META: self._journal.append_meta(page_key, value)
+                if kind is None or self._queue.empty(): self._journal.sync()
+            except (OSError, ValueError) as e:
+                self.error = e; print(f"Autosave journal {self.path}: {e}")
+            finally:
+                if kind is None: value.set()
+        self._journal.close()
+
+    def record_page(self, page_key, page_data): self._queue.put((JOURNAL_PAGE, page_key, dict(page_data)))
+    def record_text(self, page_key, text): self._queue.put((JOURNAL_TEXT, page_key, text))
+    def record_meta(self, page_key, meta): self._queue.put((JOURNAL_META, page_key, dict(meta)))
+
+    def flush(self):
+        done = threading.Event(); self._queue.put((None, None, done)); done.wait()
+
+    def close(self):
+        if self._thread.is_alive(): self._queue.put(None); self._thread.join()
+
+    def discard(self):
+        """Closes and deletes the journal, e.g. after its changes were compacted into a saved project."""
+        self.close()
+        try: os.remove(self.path)
+        except OSError: pass
+
+def read_journal(path):
+    """Yields (kind, page_key, value) for every intact record; value is a page_data dict, a text or a meta dict."""
+    with open(path, 'rb') as f: data = f.read()
+    offset = 0
+    while offset + JOURNAL_RECORD.size <= len(data):
+        kind, page_number, size, crc = JOURNAL_RECORD.unpack_from(data, offset); offset += JOURNAL_RECORD.size
+        payload = data[offset:offset + size]; offset += size
+        if len(payload) != size or zlib.crc32(payload) != crc: break
+        if kind == JOURNAL_PAGE: yield kind, str(page_number), decode_page(zlib.decompress(payload))
+        elif kind == JOURNAL_TEXT: yield kind, str(page_number), payload.decode('utf-8')
+        elif kind == JOURNAL_META: yield kind, str(page_number), json.loads(payload.decode('utf-8'))
+
+def replay_journal(path, store):
+    """Applies a journal to an OCRPageStore and returns the number of records replayed."""
+    count = 0
+    for kind, page_key, value in read_journal(path):
+        if kind == JOURNAL_PAGE: store[page_key] = value
+        elif page_key not in store: pass
+        elif kind == JOURNAL_TEXT: store[page_key]['edited_text'] = value
+        else:
+            for key, meta_value in value.items():
+                if meta_value is None: store[page_key].pop(key, None)
+                else: store[page_key][key] = meta_value
+        count += 1
+    return count
+
+# =====================================================================
+#  Legacy JSON projects and conversion
+# =====================================================================
+def save_json_project(save_path, pdf_path, store):
+    """Writes the old JSON project layout, per-character word_data included, so releases before .ocrproj can still open it."""
+    ocr_data = {page_key: page_data_to_json(page_data, legacy=True) for page_key, page_data in store.iter_sorted()}
+    with open(save_path, 'w', encoding='utf-8') as f:
+        json.dump({'pdf_path': pdf_path, 'ocr_data': ocr_data}, f, ensure_ascii=False, indent=4)
+
+def load_project_file(load_path):
+    """Returns (pdf_path, OCRPageStore) for either a .ocrproj archive or an old JSON project."""
+    if zipfile.is_zipfile(load_path):
+        archive = ProjectArchive(load_path)
+        return archive.pdf_path, OCRPageStore(archive=archive)
+    with open(load_path, 'r', encoding='utf-8') as f: project_data = json.load(f)
+    pages = {page_key: page_data_from_json(page_data) for page_key, page_data in project_data['ocr_data'].items()}
+    return project_data['pdf_path'], OCRPageStore(pages)
+
+def convert_json_project(json_path, out_path=None):
+    out_path = out_path or os.path.splitext(json_path)[0] + PROJECT_EXTENSION
+    pdf_path, store = load_project_file(json_path)
+    save_project_archive(out_path, pdf_path, store); store.clear()
+    return out_path
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print(f"usage: {os.path.basename(sys.argv[0])} OLD_PROJECT.json [NEW_PROJECT{PROJECT_EXTENSION}]"); sys.exit(2)
+    print(f"Converted to {convert_json_project(*sys.argv[1:])}")
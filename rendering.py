@@ -0,0 +1,137 @@
+import threading
+import multiprocessing
+from collections import OrderedDict
+
+import fitz
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+# =====================================================================
+#  Rendered page cache and background prefetch
+# =====================================================================
+DEFAULT_RENDER_CACHE_BYTES = 256 * 1024 * 1024
+TILE_SIZE = 512
+
+def samples_to_qimage(width, height, stride, samples):
+    # copy() so the QImage owns its pixels instead of pointing into a Python bytes object.
+    return QImage(samples, width, height, stride, QImage.Format_RGB888).copy()
+
+def pixmap_to_qimage(pix):
+    return samples_to_qimage(pix.width, pix.height, pix.stride, pix.samples)
+
+def tile_clip(page, zoom, tile):
+    """The page-space rectangle covered by tile (col, row) of a page rendered at zoom."""
+    col, row = tile; span = TILE_SIZE / zoom
+    return fitz.Rect(col * span, row * span, (col + 1) * span, (row + 1) * span) & page.rect
+
+def render_pixmap(doc, page_number, zoom, tile=None):
+    page = doc.load_page(page_number); mat = fitz.Matrix(zoom, zoom)
+    if tile is None: return page.get_pixmap(matrix=mat)
+    return page.get_pixmap(matrix=mat, clip=tile_clip(page, zoom, tile))
+
+def render_page_image(doc, page_number, zoom, tile=None):
+    return pixmap_to_qimage(render_pixmap(doc, page_number, zoom, tile))
+
+class RenderedPageCache:
+    """
+    Thread-safe LRU of rendered QImages keyed by (page, zoom) for whole pages and by
+    (page, zoom, (col, row)) for high-zoom tiles, bounded by a byte budget.
+    """
+    def __init__(self, max_bytes=DEFAULT_RENDER_CACHE_BYTES):
+        self.max_bytes = max_bytes; self._images = OrderedDict(); self._bytes = 0; self._lock = threading.Lock()
+
+    @staticmethod
+    def key(page_number, zoom, tile=None): return (page_number, round(zoom, 3), tile)
+
+    def get(self, page_number, zoom, tile=None):
+        key = self.key(page_number, zoom, tile)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None: self._images.move_to_end(key)
+            return image
+
+    def __contains__(self, key):
+        with self._lock: return self.key(*key) in self._images
+
+    def put(self, page_number, zoom, image, tile=None):
+        key = self.key(page_number, zoom, tile)
+        with self._lock:
+            old = self._images.pop(key, None)
+            if old is not None: self._bytes -= old.sizeInBytes()
+            self._images[key] = image; self._bytes += image.sizeInBytes()
+            while self._bytes > self.max_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False); self._bytes -= evicted.sizeInBytes()
+
+    def clear(self):
+        with self._lock: self._images.clear(); self._bytes = 0
+
+def _render_server_main(pdf_path, conn):
+    # Runs in its own process: PyMuPDF holds the GIL while rasterizing, so rendering in a
+    # thread of the GUI process would still freeze the UI.
+    doc = fitz.open(pdf_path)
+    try:
+        while True:
+            request = conn.recv()
+            if request is None: break
+            page_number, zoom, tile = request
+            pix = render_pixmap(doc, page_number, zoom, tile)
+            conn.send((pix.width, pix.height, pix.stride, pix.samples))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        doc.close()
+
+class PagePrefetcher(QObject):
+    """
+    Lives on a QThread and fills a RenderedPageCache with pages near the one on screen
+    and with the tiles the viewer is missing at high zoom. Rasterizing happens in a
+    helper process; a request whose generation is older than the latest one is dropped,
+    so fast page flipping or zooming never builds up a backlog.
+    """
+    page_rendered = pyqtSignal(int, float)
+    tile_rendered = pyqtSignal(int, float, int, int)
+    def __init__(self, pdf_path, cache):
+        super().__init__(); self.pdf_path = pdf_path; self.cache = cache; self.generation = 0; self.tile_generation = 0
+        self._process = None; self._conn = None; self._closed = False; self._server_lock = threading.Lock()
+
+    def _ensure_server(self):
+        # Under the lock, so close() never sees a helper that is only half started.
+        with self._server_lock:
+            if self._closed: raise EOFError
+            if self._process is None or not self._process.is_alive():
+                context = multiprocessing.get_context('spawn'); self._conn, child_conn = context.Pipe()
+                self._process = context.Process(target=_render_server_main, args=(self.pdf_path, child_conn), daemon=True)
+                self._process.start(); child_conn.close()
+
+    def _render(self, page_number, zoom, tile=None):
+        try:
+            self._ensure_server(); self._conn.send((page_number, zoom, tile))
+            width, height, stride, samples = self._conn.recv()
+        except (EOFError, OSError):
+            return None
+        image = samples_to_qimage(width, height, stride, samples); self.cache.put(page_number, zoom, image, tile)
+        return image
+
+    @pyqtSlot(list, float, int)
+    def prefetch(self, page_numbers, zoom, generation):
+        for page_number in page_numbers:
+            if self._closed or generation != self.generation: return
+            if (page_number, zoom) in self.cache: continue
+            if self._render(page_number, zoom) is None: return
+            self.page_rendered.emit(page_number, zoom)
+
+    @pyqtSlot(int, float, list, int)
+    def render_tiles(self, page_number, zoom, tiles, generation):
+        for tile in tiles:
+            if self._closed or generation != self.tile_generation: return
+            if (page_number, zoom, tile) in self.cache: continue
+            if self._render(page_number, zoom, tile) is None: return
+            self.tile_rendered.emit(page_number, zoom, tile[0], tile[1])
+
+    def close(self):
+        """Called from the GUI thread; kills the helper so a render in flight is abandoned."""
+        with self._server_lock:
+            self._closed = True; self.generation += 1
+            if self._process is not None:
+                self._process.kill(); self._process.join(timeout=1)
+            if self._conn is not None: self._conn.close()
@@ -0,0 +1,43 @@
+import os
+import sys
+import random
+
+import pytest
+
+# The modules live at the top of the repository rather than in a package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_words import PageWords
+
+HEBREW = 'אבגדהוזחטיכלמנסעפצקרשת'
+
+def build_page(seed=0, word_count=40, char_boxes=False):
+    """A page_data dict of word_count OCR words (about a third of them Latin), one space or a blank line between them."""
+    rng = random.Random(seed); words = PageWords(); text = []; x = 500.0; y = 60.0
+    for index in range(word_count):
+        if index:
+            separator = '\n\n' if rng.random() < 0.1 else ' '; text.append(separator); words.add_separator(len(separator))
+        rtl = rng.random() < 0.7; length = rng.randint(1, 8)
+        word = ''.join(rng.choice(HEBREW if rtl else 'abcdefghij0123') for _ in range(length))
+        width = 6.0 * length; bbox = (x - width, y, x, y + 14.0)
+        boxes = None
+        if char_boxes: boxes = [(bbox[0] + i * 6.0, y, bbox[0] + (i + 1) * 6.0 - 0.5, y + 14.0) for i in range(length)]
+        words.add_word(bbox, length, rtl, float(rng.randint(30, 99)), char_boxes=boxes); text.append(word)
+        x -= width + 5.0
+        if x < 80.0: x = 500.0; y += 18.0
+    return {'word_data': words, 'edited_text': ''.join(text), 'source': 'native' if char_boxes else 'ocr'}
+
+@pytest.fixture
+def make_page(): return build_page
+
+def same_page(page, other):
+    assert page['edited_text'] == other['edited_text']
+    assert {k: v for k, v in page.items() if k not in ('word_data', 'edited_text')} == {k: v for k, v in other.items() if k not in ('word_data', 'edited_text')}
+    words, other_words = page['word_data'], other['word_data']
+    assert list(words.boxes) == list(other_words.boxes) and list(words.starts) == list(other_words.starts)
+    assert list(words.lengths) == list(other_words.lengths) and list(words.rtl) == list(other_words.rtl)
+    assert [round(c, 2) for c in words.conf] == [round(c, 2) for c in other_words.conf]
+    assert [words.char_bbox(pos) for pos in range(len(words))] == [other_words.char_bbox(pos) for pos in range(len(other_words))]
+
+@pytest.fixture
+def assert_same_page(): return same_page
@@ -0,0 +1,119 @@
+import os
+import zipfile
+import xml.etree.ElementTree as ElementTree
+
+import docx
+import fitz
+import pytest
+from lxml import etree
+
+from project_io import OCRPageStore, load_project_file
+from exporters import (HOCR_SCALE, ALTO_UNITS_PER_POINT, EXPORT_TEMP_SUFFIX, ExportCanceled, export_pages, export_docx, layout_words,
+                       page_layout, pdf_page_sizes)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_PROJECT = os.path.join(ROOT, 'test.json'); TEST_PDF = os.path.join(ROOT, 'test pages.pdf')
+HOCR = '{http://www.w3.org/1999/xhtml}'; ALTO = '{http://www.loc.gov/standards/alto/ns-v4#}'
+
+@pytest.fixture
+def store():
+    _, store = load_project_file(TEST_PROJECT)
+    yield store
+    store.clear()
+
+def repeated(store, count):
+    # test.json's pages over and over, enough for several EXPORT_CHUNK_PAGES chunks.
+    originals = [page_data for _, page_data in store.iter_sorted()]
+    return [(str(n), originals[n % len(originals)]) for n in range(count)]
+
+# --- page layout --------------------------------------------------------------------
+def test_page_layout(store):
+    for page_key, page_data in store.iter_sorted():
+        layout = page_layout(page_data)
+        words = [word for _, lines in layout for _, line in lines for word in line]
+        assert [word[0] for word in words] == [word[0] for word in layout_words(page_data)] == page_data['edited_text'].split()
+        for paragraph_box, lines in layout:
+            for line_box, line in lines:
+                assert all(paragraph_box[0] <= bbox[0] and bbox[2] <= paragraph_box[2] for _, bbox, _, _ in line)
+                assert [min(b[0] for _, b, _, _ in line), min(b[1] for _, b, _, _ in line), max(b[2] for _, b, _, _ in line), max(b[3] for _, b, _, _ in line)] == line_box
+
+def test_deleted_words_are_dropped(store):
+    page_data = dict(store['0']); first = page_data['edited_text'].split()[0]
+    page_data['edited_text'] = ' ' * len(first) + page_data['edited_text'][len(first):]
+    assert [word[0] for word in layout_words(page_data)] == page_data['edited_text'].split()
+
+# --- hOCR / ALTO ----------------------------------------------------------------------
+def test_hocr_and_alto_round_trip(tmp_path, store):
+    hocr_path = str(tmp_path / 'book.hocr'); alto_path = str(tmp_path / 'book.xml')
+    assert export_pages(store.iter_sorted(), [('hocr', hocr_path), ('alto', alto_path)], TEST_PDF) == 3
+    sizes = pdf_page_sizes(TEST_PDF); pages = list(store.iter_sorted())
+    hocr_pages = [div for div in ElementTree.parse(hocr_path).iter(HOCR + 'div') if div.get('class') == 'ocr_page']
+    alto_pages = list(ElementTree.parse(alto_path).iter(ALTO + 'Page'))
+    assert len(hocr_pages) == len(alto_pages) == len(pages)
+    for (page_key, page_data), hocr_page, alto_page in zip(pages, hocr_pages, alto_pages):
+        width, height = sizes[page_key]; words = list(layout_words(page_data))
+        assert f'bbox 0 0 {round(width * HOCR_SCALE)} {round(height * HOCR_SCALE)}' in hocr_page.get('title')
+        assert (alto_page.get('WIDTH'), alto_page.get('HEIGHT')) == (str(round(width * ALTO_UNITS_PER_POINT)), str(round(height * ALTO_UNITS_PER_POINT)))
+        hocr_words = [span for span in hocr_page.iter(HOCR + 'span') if span.get('class') == 'ocrx_word']
+        assert [span.text for span in hocr_words] == [word[0] for word in words]
+        x0, y0, x1, y1 = words[0][1]
+        assert hocr_words[0].get('title').startswith(f'bbox {round(x0 * HOCR_SCALE)} {round(y0 * HOCR_SCALE)} {round(x1 * HOCR_SCALE)} {round(y1 * HOCR_SCALE)}')
+        strings = list(alto_page.iter(ALTO + 'String'))
+        assert [string.get('CONTENT') for string in strings] == [word[0] for word in words]
+        assert strings[0].get('HPOS') == str(round(x0 * ALTO_UNITS_PER_POINT))
+    assert sorted(os.listdir(tmp_path)) == ['book.hocr', 'book.xml']
+
+def test_xml_is_escaped(tmp_path, store):
+    page_data = dict(store['0']); page_data['edited_text'] = '<&>"\x01' + page_data['edited_text'][5:]
+    path = str(tmp_path / 'book.xml'); hocr_path = str(tmp_path / 'book.hocr')
+    export_pages(iter([('0', page_data)]), [('alto', path), ('hocr', hocr_path)])
+    ElementTree.parse(path); ElementTree.parse(hocr_path)
+
+# --- DOCX -----------------------------------------------------------------------------------
+def test_docx_matches_add_paragraph(tmp_path, store):
+    path = str(tmp_path / 'book.docx'); baseline_path = str(tmp_path / 'baseline.docx')
+    pages = list(store.iter_sorted()); word_data = pages[0][1]['word_data']
+    pages.append(('3', {'word_data': word_data, 'edited_text': 'tab\there\r\n  indented, trailing space \nand an empty page next'}))
+    pages.append(('4', {'word_data': word_data, 'edited_text': ''}))
+    export_docx(iter(pages), path)
+    baseline = docx.Document()
+    for _, page_data in pages: baseline.add_paragraph(page_data['edited_text']); baseline.add_page_break()
+    baseline.save(baseline_path)
+    exported = docx.Document(path); baseline = docx.Document(baseline_path)
+    assert [p.text for p in exported.paragraphs] == [p.text for p in baseline.paragraphs]
+    assert [etree.tostring(p._p) for p in exported.paragraphs] == [etree.tostring(p._p) for p in baseline.paragraphs]
+
+# --- the driver -----------------------------------------------------------------------------
+def read_outputs(paths):
+    outputs = []
+    for path in paths:
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as zf: outputs.append({name: zf.read(name) for name in zf.namelist()})
+        else:
+            with open(path, 'rb') as f: outputs.append(f.read())
+    return outputs
+
+def test_parallel_output_is_identical(tmp_path, store):
+    pages = repeated(store, 40); outputs = []
+    for workers in (1, 2):
+        targets = [(export_format, str(tmp_path / f'{workers}.{export_format}')) for export_format in ('hocr', 'alto', 'docx')]
+        assert export_pages(iter(pages), targets, TEST_PDF, page_sizes=pdf_page_sizes(TEST_PDF), workers=workers) == len(pages)
+        outputs.append(read_outputs([path for _, path in targets]))
+    assert outputs[0] == outputs[1]
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_cancel_removes_unfinished_files(tmp_path, store, workers):
+    previous = tmp_path / 'book.xml'; previous.write_text('previous export', encoding='utf-8')
+    targets = [('alto', str(previous)), ('hocr', str(tmp_path / 'book.hocr')), ('docx', str(tmp_path / 'book.docx'))]
+    progress = []
+    with pytest.raises(ExportCanceled):
+        export_pages(iter(repeated(store, 40)), targets, workers=workers, progress=lambda done, total: progress.append(done), is_canceled=lambda: len(progress) >= 5)
+    assert progress == [1, 2, 3, 4, 5]
+    assert sorted(os.listdir(tmp_path)) == ['book.xml'] and previous.read_text(encoding='utf-8') == 'previous export'
+    assert not any(name.endswith(EXPORT_TEMP_SUFFIX) for name in os.listdir(tmp_path))
+
+def test_refuses_to_overwrite_the_pdf(tmp_path, store):
+    pdf_path = str(tmp_path / 'book.pdf')
+    with fitz.open(TEST_PDF) as doc: doc.save(pdf_path)
+    with pytest.raises(ValueError): export_pages(store.iter_sorted(), [('pdf', pdf_path)], pdf_path)
+    with fitz.open(pdf_path) as doc: assert len(doc) == 3
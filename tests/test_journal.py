@@ -0,0 +1,55 @@
+import os
+
+from project_io import (JOURNAL_RECORD, JOURNAL_PAGE, JOURNAL_TEXT, JOURNAL_META, OCRPageStore, PageJournal, AutosaveJournal,
+                        read_journal, replay_journal)
+
+def write_journal(path, make_page):
+    journal = PageJournal(path, truncate=True); offsets = []
+    for record in (lambda: journal.append_page('0', make_page(seed=0)), lambda: journal.append_page('1', make_page(seed=1)),
+                   lambda: journal.append_text('0', 'first edit'), lambda: journal.append_meta('1', {'ocr_zoom': 3.0}),
+                   lambda: journal.append_text('1', 'second edit')):
+        record(); offsets.append(os.path.getsize(path))
+    journal.close()
+    return offsets
+
+def test_replay(tmp_path, make_page, assert_same_page):
+    path = str(tmp_path / 'book.journal'); write_journal(path, make_page)
+    assert [kind for kind, _, _ in read_journal(path)] == [JOURNAL_PAGE, JOURNAL_PAGE, JOURNAL_TEXT, JOURNAL_META, JOURNAL_TEXT]
+    store = OCRPageStore()
+    assert replay_journal(path, store) == 5
+    assert store['0']['edited_text'] == 'first edit' and store['1']['edited_text'] == 'second edit'
+    assert store['1']['ocr_zoom'] == 3.0
+    expected = make_page(seed=1); expected['edited_text'] = 'second edit'; expected['ocr_zoom'] = 3.0
+    assert_same_page(expected, store['1'])
+
+def test_meta_none_deletes_key(tmp_path, make_page):
+    path = str(tmp_path / 'book.journal'); journal = PageJournal(path)
+    page = make_page(); page['alignment'] = [[0, 3]]
+    journal.append_page('0', page); journal.append_meta('0', {'alignment': None}); journal.close()
+    store = OCRPageStore(); replay_journal(path, store)
+    assert 'alignment' not in store['0']
+
+def test_truncated_tail_keeps_earlier_records(tmp_path, make_page):
+    path = str(tmp_path / 'book.journal'); offsets = write_journal(path, make_page)
+    for cut in (offsets[3] + JOURNAL_RECORD.size // 2, offsets[3] + JOURNAL_RECORD.size + 3, offsets[4] - 1):
+        with open(path, 'r+b') as f: f.truncate(cut)
+        store = OCRPageStore()
+        assert replay_journal(path, store) == 4
+        assert store['0']['edited_text'] == 'first edit' and store['1']['ocr_zoom'] == 3.0
+        assert store['1']['edited_text'] == make_page(seed=1)['edited_text']
+
+def test_crc_mismatch_stops_replay(tmp_path, make_page):
+    path = str(tmp_path / 'book.journal'); offsets = write_journal(path, make_page)
+    with open(path, 'r+b') as f:
+        f.seek(offsets[2] - 1); last = f.read(1); f.seek(offsets[2] - 1); f.write(bytes([last[0] ^ 0xff]))  # last byte of the first text record
+    store = OCRPageStore()
+    assert replay_journal(path, store) == 2
+    assert store['0']['edited_text'] == make_page(seed=0)['edited_text'] and 'ocr_zoom' not in store['1']
+
+def test_autosave_journal(tmp_path, make_page):
+    path = str(tmp_path / 'book.journal'); journal = AutosaveJournal(path, truncate=True)
+    journal.record_page('4', make_page(seed=4)); journal.record_text('4', 'typed'); journal.flush()
+    store = OCRPageStore()
+    assert replay_journal(path, store) == 2 and store['4']['edited_text'] == 'typed'
+    journal.discard()
+    assert not os.path.exists(path)
@@ -0,0 +1,46 @@
+import fitz
+import pytest
+
+from library import OCRLibrary
+
+@pytest.fixture
+def library(tmp_path):
+    library = OCRLibrary(str(tmp_path / 'library.sqlite'))
+    yield library
+    library.close()
+
+@pytest.fixture
+def document_id(tmp_path, library):
+    pdf_path = str(tmp_path / 'book.pdf')
+    with fitz.open() as doc:
+        for _ in range(6): doc.new_page()
+        doc.save(pdf_path)
+    return library.add_document(pdf_path)
+
+def test_claims_are_exclusive(library, document_id):
+    assert library.claim_pages(document_id, [0, 1, 2], owner='a') == [0, 1, 2]
+    assert library.claim_pages(document_id, range(6), owner='b') == [3, 4, 5]
+    assert library.claim_pages(document_id, range(6), owner='c') == []
+
+def test_owner_can_claim_again(library, document_id):
+    library.claim_pages(document_id, [0, 1], owner='a')
+    assert library.claim_pages(document_id, [0, 1, 2], owner='a') == [0, 1, 2]
+
+def test_stored_pages_are_not_claimed(library, document_id, make_page):
+    library.claim_pages(document_id, [0, 1], owner='a')
+    library.put_page(document_id, '0', make_page(), owner='a')
+    library.release_claims(document_id, owner='a')
+    assert library.claim_pages(document_id, range(3), owner='b') == [1, 2]
+
+def test_expired_and_released_claims(library, document_id):
+    library.claim_pages(document_id, [0, 1], owner='a')
+    assert library.claim_pages(document_id, [0, 1], owner='b', timeout=-1) == [0, 1]  # a's claims are stale
+    library.release_claims(document_id, owner='b')
+    assert library.claim_pages(document_id, [0, 1], owner='c') == [0, 1]
+
+def test_claims_across_connections(library, document_id):
+    other = OCRLibrary(library.path)
+    try:
+        assert library.claim_pages(document_id, range(4), owner='a') == [0, 1, 2, 3]
+        assert other.claim_pages(document_id, range(6), owner='b') == [4, 5]
+    finally: other.close()
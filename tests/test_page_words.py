@@ -0,0 +1,74 @@
+import os
+import json
+
+from page_words import PageWords, TextAlignment
+from project_io import OCRPageStore, save_json_project, load_project_file
+
+TEST_PROJECT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test.json')
+
+# --- the word table -------------------------------------------------------------
+def test_lookups(make_page):
+    page = make_page(seed=2); words = page['word_data']
+    for index, start, length, bbox, rtl in words.iter_words():
+        assert all(words.word_index(pos) == index for pos in range(start, start + length))
+        boxes = [words.char_bbox(pos) for pos in range(start, start + length)]
+        if rtl: boxes.reverse()
+        assert boxes[0][0] == bbox[0] and abs(boxes[-1][2] - bbox[2]) < 1e-9  # the word box split evenly, right to left for RTL words
+        assert words[start] == {'word_bbox': bbox, 'char_bbox': words.char_bbox(start)}
+    assert words.word_index(-1) == -1 and words.word_index(len(words)) == -1
+
+def test_position_at(make_page):
+    words = make_page(seed=4)['word_data']
+    for index, start, length, (x0, y0, x1, y1), rtl in words.iter_words():
+        first = words.position_at(x0 + 0.1, (y0 + y1) / 2)
+        assert first == (start + length - 1 if rtl else start)
+    assert words.position_at(-50, -50) == -1
+
+# --- JSON projects ------------------------------------------------------------------
+def test_json_round_trip(tmp_path, make_page, assert_same_page):
+    pages = {str(n): make_page(seed=n, char_boxes=n == 0) for n in range(3)}
+    alignment = TextAlignment(len(pages['2']['word_data'])); alignment.apply_edit(0, 1, 2)
+    pages['2']['alignment'] = alignment.to_json(); pages['2']['edited_text'] = 'xy' + pages['2']['edited_text'][1:]
+    path = str(tmp_path / 'book.json')
+    save_json_project(path, 'book.pdf', OCRPageStore(pages))
+    pdf_path, store = load_project_file(path)
+    assert pdf_path == 'book.pdf'
+    for key, page in pages.items(): assert_same_page(page, store[key])
+
+def test_json_is_written_in_the_legacy_layout(tmp_path, make_page):
+    page = make_page(seed=5)
+    path = str(tmp_path / 'book.json')
+    save_json_project(path, 'book.pdf', OCRPageStore({'0': page}))
+    with open(path, encoding='utf-8') as f: saved = json.load(f)['ocr_data']['0']
+    words = page['word_data']
+    assert isinstance(saved['word_data'], list) and len(saved['word_data']) == len(page['edited_text'])
+    for pos, item in enumerate(saved['word_data']):
+        if words.word_index(pos) < 0: assert item is None
+        else: assert item == {'word_bbox': words.word_bbox(words.word_index(pos)), 'char_bbox': words.char_bbox(pos)}
+
+def test_legacy_json_loads(tmp_path):
+    # Two words, "אב cd": the first right-to-left, so its first character is the rightmost box.
+    word_data = [{'word_bbox': [10, 0, 30, 10], 'char_bbox': [20, 0, 30, 10]}, {'word_bbox': [10, 0, 30, 10], 'char_bbox': [10, 0, 20, 10]}, None,
+                 {'word_bbox': [40, 0, 60, 10], 'char_bbox': [40, 0, 50, 10]}, {'word_bbox': [40, 0, 60, 10], 'char_bbox': [50, 0, 60, 10]}]
+    path = tmp_path / 'old.json'
+    path.write_text(json.dumps({'pdf_path': 'old.pdf', 'ocr_data': {'0': {'word_data': word_data, 'edited_text': 'אב cd'}}}), encoding='utf-8')
+    _, store = load_project_file(str(path))
+    words = store['0']['word_data']
+    assert isinstance(words, PageWords) and words.word_count == 2 and list(words.rtl) == [1, 0]
+    assert [words[pos] for pos in range(5)] == word_data and not words.char_boxes
+
+def test_legacy_project_keeps_no_char_boxes():
+    # test.json was saved by the old release with the word box split evenly into char boxes.
+    _, store = load_project_file(TEST_PROJECT)
+    for page_key in store:
+        words = store[page_key]['word_data']
+        assert not words.char_boxes
+        with open(TEST_PROJECT, encoding='utf-8') as f: legacy = json.load(f)['ocr_data'][page_key]['word_data']
+        assert all(item is None or all(abs(a - b) < 1e-6 for a, b in zip(item['char_bbox'], words.char_bbox(pos))) for pos, item in enumerate(legacy))
+
+def test_legacy_one_letter_words_take_their_direction_from_the_text():
+    word_data = [{'word_bbox': [50, 0, 60, 10], 'char_bbox': [50, 0, 60, 10]}, None, {'word_bbox': [30, 0, 45, 10], 'char_bbox': [38, 0, 45, 10]},
+                 {'word_bbox': [30, 0, 45, 10], 'char_bbox': [30, 0, 38, 10]}, None, {'word_bbox': [10, 0, 20, 10], 'char_bbox': [10, 0, 20, 10]}]
+    words = PageWords.from_legacy(word_data, 'ו אב 7')
+    assert list(words.rtl) == [1, 1, 0]
+    assert list(PageWords.from_legacy(word_data).rtl) == [0, 1, 0]  # without the text there is nothing to go by
@@ -0,0 +1,51 @@
+import pytest
+
+from project_io import (PAGE_MAGIC, PAGE_MAGIC_CHAR_BOXES, OCRPageStore, encode_page, decode_page, save_project_archive,
+                        save_json_project, load_project_file, convert_json_project)
+
+# --- page records --------------------------------------------------------------
+@pytest.mark.parametrize('char_boxes, magic', [(False, PAGE_MAGIC), (True, PAGE_MAGIC_CHAR_BOXES)])
+def test_page_record_round_trip(make_page, assert_same_page, char_boxes, magic):
+    page = make_page(seed=3, char_boxes=char_boxes); page['ocr_zoom'] = 2.5
+    record = encode_page(page)
+    assert record[:4] == magic
+    assert_same_page(page, decode_page(record))
+
+def test_page_record_rejects_other_data():
+    with pytest.raises(ValueError): decode_page(b'PK\x03\x04' + bytes(32))
+
+# --- .ocrproj archives -----------------------------------------------------------
+def test_archive_round_trip(tmp_path, make_page, assert_same_page):
+    pages = {str(n): make_page(seed=n, char_boxes=n == 1) for n in range(4)}
+    path = str(tmp_path / 'book.ocrproj')
+    save_project_archive(path, 'book.pdf', OCRPageStore(pages))
+    pdf_path, store = load_project_file(path)
+    assert pdf_path == 'book.pdf' and store.sorted_keys() == ['0', '1', '2', '3']
+    assert not any(store.is_loaded(key) for key in store)
+    for key, page in pages.items(): assert_same_page(page, store.peek(key))
+    assert not store.is_loaded('2')
+    store.clear()
+
+def test_archive_save_over_itself(tmp_path, make_page, assert_same_page):
+    pages = {str(n): make_page(seed=n) for n in range(3)}
+    path = str(tmp_path / 'book.ocrproj')
+    save_project_archive(path, 'book.pdf', OCRPageStore(pages))
+    _, store = load_project_file(path)
+    store['1']['edited_text'] = 'edited'
+    save_project_archive(path, 'book.pdf', store)
+    assert store.archive.path == path
+    assert store.peek('2')['edited_text'] == pages['2']['edited_text']  # still readable from the new archive
+    _, reloaded = load_project_file(path)
+    assert reloaded['1']['edited_text'] == 'edited'
+    assert_same_page(pages['0'], reloaded['0']); assert_same_page(pages['2'], reloaded['2'])
+    store.clear(); reloaded.clear()
+    assert [p.name for p in tmp_path.iterdir()] == ['book.ocrproj']
+
+# --- conversion -------------------------------------------------------------------
+def test_convert_json_project(tmp_path, make_page, assert_same_page):
+    page = make_page(seed=9); json_path = str(tmp_path / 'book.json')
+    save_json_project(json_path, 'book.pdf', OCRPageStore({'0': page}))
+    out_path = convert_json_project(json_path)
+    assert out_path == str(tmp_path / 'book.ocrproj')
+    _, store = load_project_file(out_path)
+    assert_same_page(page, store['0']); store.clear()
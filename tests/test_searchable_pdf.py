@@ -0,0 +1,74 @@
+import os
+import difflib
+
+import fitz
+import pytest
+
+import exporters
+from project_io import load_project_file
+from exporters import export_pages, layout_words, page_layout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_PROJECT = os.path.join(ROOT, 'test.json'); TEST_PDF = os.path.join(ROOT, 'test pages.pdf')
+
+@pytest.fixture
+def store():
+    _, store = load_project_file(TEST_PROJECT)
+    yield store
+    store.clear()
+
+@pytest.fixture
+def scan_path(tmp_path):
+    # "test pages.pdf" has a text layer of its own; a scan of it has none, so every hit comes from the exported layer.
+    path = str(tmp_path / 'scan.pdf')
+    with fitz.open(TEST_PDF) as source, fitz.open() as scan:
+        for page in source:
+            scan.new_page(width=page.rect.width, height=page.rect.height).insert_image(page.rect, pixmap=page.get_pixmap(dpi=50))
+        scan.save(path)
+    return path
+
+def export(store, scan_path, out_path, pages=None):
+    assert export_pages(pages or store.iter_sorted(), [('pdf', out_path)], scan_path) == len(store)
+    return fitz.open(out_path)
+
+def test_text_comes_out_in_logical_order(tmp_path, store, scan_path):
+    with export(store, scan_path, str(tmp_path / 'out.pdf')) as doc:
+        assert doc[0].get_text().split() == store['0']['edited_text'].split()
+        for page_key, page_data in store.iter_sorted():
+            ratio = difflib.SequenceMatcher(None, page_data['edited_text'].split(), doc[int(page_key)].get_text().split()).ratio()
+            assert ratio > 0.95, (page_key, ratio)
+
+def test_phrases_across_words_are_found(tmp_path, store, scan_path):
+    with export(store, scan_path, str(tmp_path / 'out.pdf')) as doc:
+        page = doc[0]
+        for _, paragraph in page_layout(store['0']):
+            for line_box, words in paragraph:
+                for (first, *_), (second, *_) in zip(words, words[1:]):
+                    hits = page.search_for(f'{first} {second}')
+                    assert hits, (first, second)
+                    # A line is one run scaled to the line's box, so the hit is on the scan's line.
+                    assert any(fitz.Rect(line_box).intersects(hit) for hit in hits), (first, second)
+        assert page.search_for('כתב לו הרבי')
+
+def test_incremental_saves(tmp_path, store, scan_path, monkeypatch):
+    with export(store, scan_path, str(tmp_path / 'whole.pdf')) as doc: expected = [page.get_text() for page in doc]
+    monkeypatch.setattr(exporters, 'SEARCHABLE_PDF_BATCH_PAGES', 1)
+    with export(store, scan_path, str(tmp_path / 'batched.pdf')) as doc:
+        assert doc.version_count == 1 + len(store)  # one incremental save per page, each followed by reopening the file
+        assert [page.get_text() for page in doc] == expected
+    assert sorted(os.listdir(tmp_path)) == ['batched.pdf', 'scan.pdf', 'whole.pdf']
+
+def test_native_pages_are_left_alone(tmp_path, store, scan_path):
+    store['1']['source'] = 'native'
+    with export(store, scan_path, str(tmp_path / 'out.pdf')) as doc:
+        assert doc[1].get_text() == '' and doc[0].get_text() and doc[2].get_text()
+
+def test_rotated_page(tmp_path, store, scan_path):
+    with fitz.open(scan_path) as doc: doc[0].set_rotation(90); doc.saveIncr()
+    # Word boxes are in the coordinates of the page as displayed, so the OCR of a rotated page is in its rotated frame.
+    with fitz.open(scan_path) as doc: width, height = doc[0].rect.width, doc[0].rect.height
+    words = list(layout_words(store['0']))
+    with export(store, scan_path, str(tmp_path / 'out.pdf')) as doc:
+        page = doc[0]; hits = page.search_for(f'{words[10][0]} {words[11][0]}')
+        assert hits and all(fitz.Rect(0, 0, width, height).contains(hit) for hit in hits)
+        assert fitz.Rect(hits[0]).intersects(fitz.Rect(words[10][1]) | fitz.Rect(words[11][1]))
@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+from page_words import TextAlignment
+
+def random_edits(alignment, model, rng, count):
+    # model[i] is the OCR position edited position i came from, -1 for typed text.
+    for _ in range(count):
+        position = rng.randint(0, len(model)); removed = rng.randint(0, min(len(model) - position, rng.choice([0, 1, 2, 5, 50])))
+        added = rng.choice([0, 0, 1, 3, 10])
+        model[position:position + removed] = [-1] * added; alignment.apply_edit(position, removed, added)
+        assert len(alignment) == len(model)
+
+@pytest.mark.parametrize('seed', range(40))
+def test_random_edits_match_a_list_model(monkeypatch, seed):
+    monkeypatch.setattr(TextAlignment, 'BLOCK_SIZE', 8)  # small blocks, so splits and merges happen on short texts
+    rng = random.Random(seed); length = rng.randint(0, 1500)
+    alignment = TextAlignment(length); model = list(range(length))
+    random_edits(alignment, model, rng, rng.randint(1, 300))
+    assert [alignment.to_original(pos) for pos in range(len(model))] == model
+    edited = {original: pos for pos, original in enumerate(model) if original >= 0}
+    assert [alignment.to_edited(original) for original in range(length)] == [edited.get(original, -1) for original in range(length)]
+    assert all(len(block) <= 2 * TextAlignment.BLOCK_SIZE for block in alignment._blocks)
+    restored = TextAlignment.from_json(alignment.to_json(), length)
+    assert [restored.to_original(pos) for pos in range(len(model))] == model
+
+def test_identity():
+    alignment = TextAlignment(10)
+    assert alignment.is_identity(10) and TextAlignment.from_json(None, 10).is_identity(10)
+    alignment.apply_edit(3, 0, 1)
+    assert not alignment.is_identity(10) and alignment.to_original(3) == -1 and alignment.to_edited(3) == 4
+    alignment.apply_edit(3, 1, 0)
+    assert [alignment.to_original(pos) for pos in range(10)] == list(range(10))
@@ -0,0 +1,65 @@
+from project_io import OCRPageStore
+from text_index import SearchHit, TextIndex, normalize_word, tokenize, parse_query
+
+def store_of(*texts):
+    return OCRPageStore({str(n): {'word_data': None, 'edited_text': text} for n, text in enumerate(texts)})
+
+def hit_texts(store, hits):
+    return [store[hit.page_key]['edited_text'][hit.start:hit.start + hit.length] for hit in hits]
+
+# --- normalization -------------------------------------------------------------------
+def test_hebrew_normalization():
+    assert normalize_word('שָׁלוֹם') == normalize_word('שלום') == normalize_word('שלומ')  # niqqud dropped, final mem folded
+    assert normalize_word('צה"ל') == normalize_word('צה״ל') == normalize_word('צהל')  # gershayim, ASCII or Hebrew
+    assert normalize_word('ז\'בוטינסקי') == normalize_word('ז׳בוטינסקי')
+    assert normalize_word('שׁ') == normalize_word('ש')  # presentation form of shin with its dot
+    assert normalize_word('Tesseract') == 'tesseract'
+
+def test_tokenize():
+    text = 'ספר־התורה, צה"ל (2024) hello_world'
+    assert [(word, text[start:start + length]) for word, start, length in tokenize(text)] == \
+           [('ספר', 'ספר'), ('התורה', 'התורה'), ('צהל', 'צה"ל'), ('2024', '2024'), ('hello_world', 'hello_world')]
+
+def test_parse_query():
+    assert parse_query('שלום "ספר  התורה" דב*') == [(('שלומ',), False), (('ספר', 'התורה'), False), (('דב',), True)]
+    assert parse_query('""  *') == []
+
+# --- search ---------------------------------------------------------------------------
+def test_words_and_all_terms():
+    store = store_of('שלום עולם ושלום', 'עולם הבא', 'שָׁלוֹם לכם'); index = TextIndex()
+    assert index.sync(store) == 3 and len(index) == 3
+    assert index.search('שלום') == [SearchHit('0', 0, 4), SearchHit('2', 0, 7)]
+    assert hit_texts(store, index.search('שלום עולם')) == ['שלום', 'עולם']  # every term on a page that has them all
+    assert index.search('שלום הבא') == [] and index.search('') == []
+
+def test_prefix_search():
+    store = store_of('ספר ספרים ספרייה', 'סופר', 'מספר'); index = TextIndex(); index.sync(store)
+    assert hit_texts(store, index.search('ספר*')) == ['ספר', 'ספרים', 'ספרייה']
+    assert index.search('ספרי*', limit=1) == [SearchHit('0', 4, 5)]
+    assert index.search('ס*') == index.search('ס*')  # the vocabulary is reused
+    assert [hit.page_key for hit in index.search('ס*')] == ['0', '0', '0', '1']
+
+def test_phrase_search():
+    store = store_of('כתב לו הרבי, וכתב לו שוב', 'לו כתב', 'כתב\n\nלו'); index = TextIndex(); index.sync(store)
+    hits = index.search('"כתב לו"')
+    assert [hit.page_key for hit in hits] == ['0', '2'] and hit_texts(store, hits) == ['כתב לו', 'כתב\n\nלו']
+    assert hit_texts(store, index.search('"לו הרבי" שוב')) == ['לו הרבי', 'שוב']
+    assert index.search('"הרבי כתב"') == []
+
+def test_edit_then_sync():
+    store = store_of('ישן', 'אחר'); index = TextIndex(); index.sync(store)
+    store['0']['edited_text'] = 'חדש'
+    assert index.search('ישן') and '0' in index  # not seen until the page is invalidated
+    index.invalidate('0')
+    assert '0' not in index
+    assert index.sync(store) == 1
+    assert index.search('ישן') == [] and index.search('חדש') == [SearchHit('0', 0, 3)]
+    assert index.search('ישן*') == []  # the vocabulary was rebuilt without the old word
+    store['2'] = {'word_data': None, 'edited_text': 'חדש גם כאן'}; del store['1']
+    assert index.sync(store) == 1
+    assert [hit.page_key for hit in index.search('חדש')] == ['0', '2'] and index.search('אחר') == [] and len(index) == 2
+    assert index.sync(store) == 0
+
+def test_page_order_is_numeric():
+    store = store_of(*['מילה'] * 12); index = TextIndex(); index.sync(store)
+    assert [hit.page_key for hit in index.search('מילה')] == [str(n) for n in range(12)]
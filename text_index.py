@@ -0,0 +1,132 @@
+import re
+import bisect
+import functools
+import unicodedata
+from array import array
+from collections import namedtuple
+
+# =====================================================================
+#  Full-text index over every page's edited_text (Qt-free)
+# =====================================================================
+# Combining marks kept inside a word: Latin accents and the Hebrew niqqud and cantillation
+# points (but not maqaf, paseq, sof pasuq or nun hafukha, which separate words).
+_MARKS = '\u0300-\u036f\u0591-\u05bd\u05bf\u05c1\u05c2\u05c4\u05c5\u05c7'
+# A word may carry geresh / gershayim between letters (צה"ל, ז'בוטינסקי), typed as ASCII quotes or U+05F3 / U+05F4.
+WORD_RE = re.compile(rf"[^\W_][\w{_MARKS}]*(?:[\"'\u05f3\u05f4][^\W_][\w{_MARKS}]*)*")
+FINAL_LETTERS = {'\u05da': '\u05db', '\u05dd': '\u05de', '\u05df': '\u05e0', '\u05e3': '\u05e4', '\u05e5': '\u05e6'}  # ך ם ן ף ץ
+_FOLD = str.maketrans({**{chr(c): None for c in range(0x0300, 0x0370)}, **{chr(c): None for c in range(0x0591, 0x05c8) if unicodedata.category(chr(c)) == 'Mn'},
+                       **FINAL_LETTERS, '"': None, "'": None, '\u05f3': None, '\u05f4': None})
+
+SearchHit = namedtuple('SearchHit', 'page_key start length')
+
+@functools.lru_cache(maxsize=65536)
+def normalize_word(word):
+    """Search form of a word: presentation forms decomposed, niqqud and quote marks dropped, final letters folded, case folded."""
+    return unicodedata.normalize('NFKD', word).translate(_FOLD).casefold()
+
+def tokenize(text):
+    """Yields (normalized word, start, length) for every word of text, offsets in text's own characters."""
+    for match in WORD_RE.finditer(text):
+        word = normalize_word(match.group())
+        if word: yield word, match.start(), match.end() - match.start()
+
+def parse_query(query):
+    """
+    Terms are words, a word ending in * (prefix match) or a "quoted phrase"; a page has
+    to contain all of them. Returns a list of (words, is_prefix) with words normalized.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        if phrase:
+            words = tuple(token for token, _, _ in tokenize(phrase))
+            if words: terms.append((words, False))
+            continue
+        prefix = word.endswith('*')
+        for token, _, _ in tokenize(word.rstrip('*')): terms.append(((token,), False))
+        if prefix and terms and len(terms[-1][0]) == 1: terms[-1] = (terms[-1][0], True)
+    return terms
+
+class _IndexedPage:
+    __slots__ = ('words', 'starts', 'lengths')
+    def __init__(self, text):
+        self.words = []; self.starts = array('I'); self.lengths = array('I')
+        for word, start, length in tokenize(text): self.words.append(word); self.starts.append(start); self.lengths.append(length)
+
+class TextIndex:
+    """
+    Inverted index: normalized word -> page key -> word ordinals on that page. Pages are
+    re-indexed one at a time; invalidate() marks a page whose text changed and sync()
+    brings the index up to date with an OCRPageStore before searching, touching only
+    pages that are new or marked. Prefix terms are resolved against a sorted vocabulary
+    that is rebuilt only after the set of words changed.
+    """
+    def __init__(self):
+        self._postings = {}; self._pages = {}; self._stale = set(); self._vocabulary = None
+
+    def __len__(self): return len(self._pages)
+    def __contains__(self, page_key): return page_key in self._pages and page_key not in self._stale
+
+    def clear(self): self._postings.clear(); self._pages.clear(); self._stale.clear(); self._vocabulary = None
+    def invalidate(self, page_key): self._stale.add(page_key)
+
+    def remove_page(self, page_key):
+        page = self._pages.pop(page_key, None); self._stale.discard(page_key)
+        if page is None: return
+        for word in set(page.words):
+            pages = self._postings[word]; del pages[page_key]
+            if not pages: del self._postings[word]; self._vocabulary = None
+
+    def update_page(self, page_key, text):
+        self.remove_page(page_key); page = _IndexedPage(text); self._pages[page_key] = page
+        for ordinal, word in enumerate(page.words):
+            pages = self._postings.get(word)
+            if pages is None: pages = self._postings[word] = {}; self._vocabulary = None
+            ordinals = pages.get(page_key)
+            if ordinals is None: ordinals = pages[page_key] = array('I')
+            ordinals.append(ordinal)
+
+    def sync(self, store):
+        """Indexes pages of store that are new or invalidated and drops pages that are gone. Returns how many were (re)indexed."""
+        for page_key in [key for key in self._pages if key not in store]: self.remove_page(page_key)
+        pending = [key for key in store if key not in self]
+        for page_key in pending: self.update_page(page_key, store.peek(page_key)['edited_text'])
+        return len(pending)
+
+    def _words_with_prefix(self, prefix):
+        if self._vocabulary is None: self._vocabulary = sorted(self._postings)
+        start = bisect.bisect_left(self._vocabulary, prefix); words = []
+        for word in self._vocabulary[start:]:
+            if not word.startswith(prefix): break
+            words.append(word)
+        return words
+
+    def _term_hits(self, words, is_prefix):
+        """page key -> list of (start ordinal, word count) for one query term."""
+        if is_prefix:
+            hits = {}
+            for word in self._words_with_prefix(words[0]):
+                for page_key, ordinals in self._postings[word].items(): hits.setdefault(page_key, []).extend((o, 1) for o in ordinals)
+            return hits
+        first = self._postings.get(words[0])
+        if not first: return {}
+        if len(words) == 1: return {page_key: [(o, 1) for o in ordinals] for page_key, ordinals in first.items()}
+        hits = {}
+        for page_key, ordinals in first.items():
+            page_words = self._pages[page_key].words; count = len(words)
+            found = [(o, count) for o in ordinals if tuple(page_words[o:o + count]) == words]
+            if found: hits[page_key] = found
+        return hits
+
+    def search(self, query, limit=None):
+        """SearchHits for every occurrence of every term on pages that contain all terms, in page and text order."""
+        terms = parse_query(query)
+        if not terms: return []
+        per_term = [self._term_hits(words, is_prefix) for words, is_prefix in terms]
+        page_keys = set(per_term[0]).intersection(*per_term[1:]); results = []
+        for page_key in sorted(page_keys, key=int):
+            page = self._pages[page_key]; spans = sorted({span for hits in per_term for span in hits[page_key]})
+            for ordinal, count in spans:
+                start = page.starts[ordinal]; end = page.starts[ordinal + count - 1] + page.lengths[ordinal + count - 1]
+                results.append(SearchHit(page_key, start, end - start))
+                if limit and len(results) >= limit: return results
+        return results